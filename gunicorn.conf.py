@@ -0,0 +1,24 @@
+import os
+
+# ─────────────────────────────────────────
+# gunicorn (läses automatiskt från projektroten, se Procfile)
+# ─────────────────────────────────────────
+#
+# preload_app: Django, vyer och ramverksdata importeras en gång i mastern
+# och delas copy-on-write av alla workers (se reports/preload.py). Tunga
+# beroenden som bara vissa requests behöver (playwright, pandas, reportlab,
+# pypdf) importeras först vid användning och hamnar inte här.
+
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    # Körs i mastern efter att appen laddats (preload) men innan workers forkas
+    if preload_app:
+        from reports.preload import preload
+
+        preload()
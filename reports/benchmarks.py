@@ -0,0 +1,234 @@
+import io
+import json
+import math
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# ─────────────────────────────────────────
+# Benchmarks (manage.py bench)
+# ─────────────────────────────────────────
+#
+# Syntetiska Excel-filer i samma format som leverantörsexporten, och
+# tidtagning av varje steg: inläsning, poängsättning, template och PDF.
+# Allt körs lokalt utan nätverk. Resultaten sparas som JSON och kan jämföras
+# mot en tidigare körning (baseline) för att hitta regressioner.
+
+# Kompetenskolumner som de ser ut i exporten. Några skrivs med de stavningar
+# aliasen i ramverksfilen (reports/frameworks/*.yaml) finns till för, så att alias-vägen också mäts.
+BENCH_COMPETENCIES = (
+    "Developing relationship",
+    "Result orientation",
+    "Adaptability",
+    "Reliability",
+    "Written communication",
+    "Engaging others",
+    "Delegating",
+    "Customerfocus",
+    "Resilience",
+    "Supporting others",
+    "Managing conflict",
+    "Directing others",
+    "Organisational awareness",
+    "Interpersonal communication",
+    "Dealing with ambiguity",
+    "Embracing diversity",
+    "Optimising processes",
+    "Networking",
+    "Driving vision & purpose",
+    "Organising and prioritising",
+    "Drive",
+)
+
+BENCH_ITEM_COLUMNS = 120  # item-nivåkolumner som inläsningen ska hoppa över
+BENCH_MISSING_RATE = 0.03  # andel tomma kompetensceller
+
+
+def synthetic_workbook(candidates: int, seed: int = 1, item_columns: int = BENCH_ITEM_COLUMNS) -> bytes:
+    """En .xlsx med `candidates` rader, realistisk header och lite saknade värden."""
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(seed)
+    scores = np.round(rng.normal(3.2, 0.8, size=(candidates, len(BENCH_COMPETENCIES))).clip(1, 5), 2)
+    missing = rng.random(scores.shape) < BENCH_MISSING_RATE
+    items = rng.integers(1, 6, size=(candidates, item_columns))
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Results")
+    ws.append(
+        ["First Name", "Last Name", "Email", "Completed"]
+        + [f"Competency Score: {c} (STIVE)" for c in BENCH_COMPETENCIES]
+        + [f"Item {i + 1}" for i in range(item_columns)]
+    )
+    for i in range(candidates):
+        row_scores = [None if missing[i, j] else float(scores[i, j]) for j in range(len(BENCH_COMPETENCIES))]
+        ws.append(
+            [f"Förnamn{i}", f"Efternamn{i}", f"kandidat{i}@example.se", "2026-01-01"]
+            + row_scores
+            + items[i].tolist()
+        )
+
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def _named_file(data: bytes, name: str = "bench.xlsx") -> io.BytesIO:
+    f = io.BytesIO(data)
+    f.name = name
+    return f
+
+
+BENCH_MIN_SAMPLE_MS = 20.0  # korta anrop körs flera gånger per mätning, så att timerbrus inte dominerar
+
+
+def time_call(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Kör fn repeat mätningar (efter warmup) och returnerar median/min/max i ms per anrop."""
+    for _ in range(warmup):
+        fn()
+
+    # Kalibrera: hur många anrop behövs för att en mätning ska ta minst BENCH_MIN_SAMPLE_MS?
+    t0 = time.perf_counter()
+    fn()
+    once_ms = (time.perf_counter() - t0) * 1000.0
+    number = max(1, math.ceil(BENCH_MIN_SAMPLE_MS / once_ms)) if once_ms > 0 else 1000
+
+    samples: List[float] = []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) * 1000.0 / number)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "runs": len(samples),
+        "number": number,
+    }
+
+
+def run_benchmarks(
+    sizes: Sequence[int] = (1, 100, 1000),
+    repeat: int = 5,
+    backends: Sequence[str] = ("native",),
+    log: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Kör alla benchmarks. Returnerar {"meta": ..., "results": {namn: timing}}."""
+    import django
+    from django.template.loader import render_to_string
+
+    from .cohort import cohort_stats
+    from .ingest import read_candidates, widen_scores
+    from .renderers import get_renderer
+    from .framework import get_framework, load_framework
+    from .scoring import score_matrix
+    from .view_model import report_context
+    from .views import (
+        _build_report_data,
+        _competency_columns,
+        _competency_matrix,
+        _competency_row,
+        calculate_b3_underbehaviors_and_clusters,
+    )
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def record(name: str, fn: Callable[[], Any], runs: int = repeat) -> None:
+        results[name] = time_call(fn, runs)
+        if log:
+            log(f"{name:<32} {results[name]['median_ms']:10.2f} ms")
+
+    framework = get_framework()
+    fw = framework.compiled
+    first: Optional[Tuple[Sequence[str], np.ndarray]] = None  # (header, första raden)
+    first_name = "Kandidat"
+
+    for n in sizes:
+        data = synthetic_workbook(n)
+        names, labels, values = read_candidates(_named_file(data))
+
+        # Stora filer tar sekunder – färre varv räcker för en stabil median
+        runs = repeat if n <= 1000 else max(1, repeat // 2)
+        record(f"ingest[{n}]", lambda: read_candidates(_named_file(data)), runs)
+
+        columns = _competency_columns(framework, labels)
+        record(f"score_batch[{n}]", lambda: score_matrix(fw, _competency_matrix(fw, values, columns)), runs)
+        X = _competency_matrix(fw, values, columns)
+        record(f"cohort[{n}]", lambda: cohort_stats(fw, X), runs)
+
+        if first is None:
+            first = (labels, widen_scores(values[0]))
+            first_name = names[0]
+
+    first_labels, first_row = first or ((), np.empty(0))
+    row = _competency_row(framework, first_labels, first_row)
+    record(
+        "score_single",
+        lambda: calculate_b3_underbehaviors_and_clusters(row, framework),
+    )
+
+    if framework.path is not None:
+        record("framework_load", lambda: load_framework(framework.path))
+
+    report_data = _build_report_data(first_name, first_labels, first_row, framework)
+    record("report_data", lambda: _build_report_data("Kandidat", first_labels, first_row, framework))
+    record(
+        "template[report_pdf.html]",
+        lambda: render_to_string("reports/report_pdf.html", report_context(report_data, True)),
+    )
+
+    for backend in backends:
+        renderer = get_renderer(backend)
+        record(f"pdf[{renderer.name}]", lambda: renderer.render(report_data, show_mapping=True), repeat)
+        record(f"pdf_both[{renderer.name}]", lambda: renderer.render_both(report_data), repeat)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "sizes": list(sizes),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Benchmarks vars median är mer än `threshold` (0.25 = 25 %) långsammare än baseline.
+    Bara namn som finns i båda körningarna jämförs.
+    """
+    regressions = []
+    for name, timing in current.get("results", {}).items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get("median_ms"):
+            continue
+        ratio = timing["median_ms"] / before["median_ms"]
+        if ratio > 1.0 + threshold:
+            regressions.append({
+                "name": name,
+                "baseline_ms": before["median_ms"],
+                "current_ms": timing["median_ms"],
+                "ratio": ratio,
+            })
+    return regressions
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2, ensure_ascii=False)
+        fh.write("\n")
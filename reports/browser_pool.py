@@ -0,0 +1,262 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from django.conf import settings
+
+from .timing import NULL_TIMER
+
+if TYPE_CHECKING:  # playwright importeras först när poolen startar (se _astart)
+    from playwright.async_api import Browser, BrowserContext, Playwright
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# ─────────────────────────────────────────
+# Chromium-pool (en per worker-process)
+# ─────────────────────────────────────────
+#
+# Playwright-objekt är bundna till den event loop de skapades i, så poolen
+# äger en egen loop i en bakgrundstråd. Synkrona vyer lämnar in jobb med
+# run(), async-vyer med arun(), och varje jobb får en ny, isolerad
+# BrowserContext i en varm browser.
+
+
+class _PooledBrowser:
+    __slots__ = ("browser", "uses")
+
+    def __init__(self, browser: "Browser"):
+        self.browser = browser
+        self.uses = 0
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int = 2,
+        max_uses: int = 50,
+        launch_args: Optional[List[str]] = None,
+    ):
+        self.size = max(1, int(size))
+        self.max_uses = max(1, int(max_uses))
+        self.launch_args = list(launch_args or [])
+
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+        # Skapas inne i poolens loop
+        self._playwright: Optional["Playwright"] = None
+        self._slots: Optional[asyncio.Queue] = None
+
+    # ── Livscykel ───────────────────────────
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            alive = self._thread is not None and self._thread.is_alive()
+            if self._loop is not None and alive and self._pid == os.getpid():
+                return self._loop
+
+            # Ny process (efter fork) eller död tråd: börja om från noll.
+            # Föräldrans browsers går inte att återanvända här.
+            self._pid = os.getpid()
+            self._playwright = None
+            self._slots = None
+            self._loop = asyncio.new_event_loop()
+
+            started = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run_loop,
+                args=(self._loop, started),
+                name="browser-pool",
+                daemon=True,
+            )
+            self._thread.start()
+            started.wait()
+
+            asyncio.run_coroutine_threadsafe(self._astart(), self._loop).result()
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, started: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        loop.run_forever()
+
+    async def _astart(self) -> None:
+        # Importen är tung (~50 ms, flera MB per process) och behövs bara
+        # av chromium-backenden – workers som aldrig renderar slipper den.
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._slots = asyncio.Queue()
+        # None = platsen är ledig men browsern startas först när den behövs
+        for _ in range(self.size):
+            self._slots.put_nowait(None)
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=True, args=self.launch_args)
+        return _PooledBrowser(browser)
+
+    async def _close_browser(self, pooled: Optional[_PooledBrowser]) -> None:
+        if pooled is None:
+            return
+        try:
+            await pooled.browser.close()
+        except Exception:
+            # Kraschad browser går inte att stänga snyggt – det är ok
+            pass
+
+    # ── Utlåning ────────────────────────────
+
+    async def _acquire(self) -> _PooledBrowser:
+        pooled = await self._slots.get()
+        try:
+            # Hälsokontroll: tappad anslutning = kraschad browser
+            if pooled is not None and not pooled.browser.is_connected():
+                logger.warning("Chromium i poolen har tappat anslutningen, startar om.")
+                await self._close_browser(pooled)
+                pooled = None
+
+            if pooled is None:
+                pooled = await self._launch()
+            return pooled
+        except BaseException:
+            # Lämna tillbaka platsen så poolen inte krymper
+            self._slots.put_nowait(None)
+            raise
+
+    async def _release(self, pooled: _PooledBrowser, failed: bool) -> None:
+        pooled.uses += 1
+        recycle = pooled.uses >= self.max_uses or not pooled.browser.is_connected()
+
+        if failed and not pooled.browser.is_connected():
+            logger.warning("Chromium kraschade under rendering, ersätts.")
+
+        if recycle:
+            await self._close_browser(pooled)
+            self._slots.put_nowait(None)
+        else:
+            self._slots.put_nowait(pooled)
+
+    async def _run_job(
+        self,
+        job: Callable[["BrowserContext"], Awaitable[T]],
+        context_options: Dict[str, Any],
+        timer=NULL_TIMER,
+    ) -> T:
+        with timer.stage("launch"):  # väntan på ledig plats + ev. start av Chromium
+            pooled = await self._acquire()
+        failed = False
+        context: Optional["BrowserContext"] = None
+        try:
+            with timer.stage("context"):
+                context = await pooled.browser.new_context(**context_options)
+            return await job(context)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            await self._release(pooled, failed)
+
+    def submit(
+        self,
+        job: Callable[["BrowserContext"], Awaitable[T]],
+        context_options: Optional[Dict[str, Any]] = None,
+        timer=NULL_TIMER,
+    ) -> "Future[T]":
+        """Lämnar in ett jobb (async fn som tar en BrowserContext) och returnerar en Future."""
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._run_job(job, dict(context_options or {}), timer), loop)
+
+    def run(
+        self,
+        job: Callable[["BrowserContext"], Awaitable[T]],
+        context_options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        timer=NULL_TIMER,
+    ) -> T:
+        """Synkron variant av submit() – blockerar tills jobbet är klart."""
+        future = self.submit(job, context_options, timer)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def arun(
+        self,
+        job: Callable[["BrowserContext"], Awaitable[T]],
+        context_options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        timer=NULL_TIMER,
+    ) -> T:
+        """Async variant av run() för async-vyer: väntar utan att blockera en tråd."""
+        # Första anropet startar poolens loop + Playwright, vilket blockerar en stund
+        future = await asyncio.to_thread(self.submit, job, context_options, timer)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise
+
+    def warm(self) -> None:
+        """Startar alla browsers direkt i stället för vid första rendering."""
+        loop = self._ensure_started()
+
+        async def _warm() -> None:
+            taken = [await self._acquire() for _ in range(self.size)]
+            for pooled in taken:
+                self._slots.put_nowait(pooled)
+
+        asyncio.run_coroutine_threadsafe(_warm(), loop).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            loop = self._loop
+            if loop is None or self._pid != os.getpid() or not loop.is_running():
+                return
+
+            async def _ashutdown() -> None:
+                while self._slots is not None and not self._slots.empty():
+                    await self._close_browser(self._slots.get_nowait())
+                if self._playwright is not None:
+                    await self._playwright.stop()
+
+            try:
+                asyncio.run_coroutine_threadsafe(_ashutdown(), loop).result(timeout=10)
+            except Exception:
+                logger.exception("Kunde inte stänga browser-poolen snyggt.")
+            loop.call_soon_threadsafe(loop.stop)
+            self._loop = None
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Processens gemensamma pool, konfigurerad från settings."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                size=getattr(settings, "REPORT_PDF_POOL_SIZE", 2),
+                max_uses=getattr(settings, "REPORT_PDF_POOL_MAX_USES", 50),
+                launch_args=["--no-sandbox", "--disable-setuid-sandbox"] if not settings.DEBUG else [],
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
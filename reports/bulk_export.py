@@ -0,0 +1,258 @@
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.text import slugify
+
+from . import metrics
+from .pdf_cache import get_pdf_cache, pdf_cache_key
+from .renderers import PdfRenderer
+
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────
+# Bulk-export: många PDF:er som en ZIP-ström
+# ─────────────────────────────────────────
+#
+# N renderingar körs samtidigt (REPORT_BULK_PARALLELISM) och varje PDF
+# skrivs till ZIP:en så fort den är klar – i den ordning de blir klara,
+# filnamnen är numrerade. Resultatkön har lika många platser som det finns
+# renderare, så en långsam klient bromsar renderingen i stället för att
+# PDF:erna samlas i minnet.
+#
+# Chromium-renderingar går genom browser-poolen (REPORT_PDF_POOL_SIZE
+# samtidiga contexts per process). Native-renderaren är ren Python och
+# skulle stå still på GIL:en i trådar, så den körs i en processpool med
+# en process per parallell rendering. Varje process är en full Django-import,
+# så poolen är liten som default och stängs när den stått oanvänd en stund.
+
+BulkEntry = Tuple[str, Callable[[], Dict[str, Any]]]  # (filnamn i ZIP:en, bygger report_data)
+
+BULK_PARALLELISM = 2         # settings.REPORT_BULK_PARALLELISM
+PROCESS_IDLE_TIMEOUT = 60    # sekunder (settings.REPORT_BULK_PROCESS_IDLE)
+
+
+def bulk_parallelism() -> int:
+    return max(1, int(getattr(settings, "REPORT_BULK_PARALLELISM", BULK_PARALLELISM)))
+
+
+def bulk_filename(position: int, total: int, full_name: str) -> str:
+    """'007_anna-andersson.pdf' – numret håller ordningen och gör namnen unika."""
+    width = len(str(total))
+    return f"{position:0{width}d}_{slugify(full_name) or 'kandidat'}.pdf"
+
+
+# ── Processpool (native) ────────────────
+
+_processes: Optional[ProcessPoolExecutor] = None
+_processes_pid: Optional[int] = None
+_processes_busy = 0                                 # renderingar i poolen just nu
+_processes_idle_timer: Optional[threading.Timer] = None
+_processes_lock = threading.Lock()
+
+
+def _init_render_process() -> None:
+    import django
+
+    django.setup()
+
+
+def _render_in_process(backend: str, report_data: Dict[str, Any], show_mapping: bool) -> bytes:
+    from .renderers import get_renderer
+
+    return get_renderer(backend).render(report_data, show_mapping=show_mapping)
+
+
+def _cancel_idle_timer() -> None:
+    global _processes_idle_timer
+    if _processes_idle_timer is not None:
+        _processes_idle_timer.cancel()
+        _processes_idle_timer = None
+
+
+def _acquire_render_processes() -> ProcessPoolExecutor:
+    """Processens pool för CPU-bundna renderingar. Startas vid första bulk-exporten."""
+    global _processes, _processes_pid, _processes_busy
+    with _processes_lock:
+        if _processes is None or _processes_pid != os.getpid():
+            # spawn: barnen ärver inga trådar eller låsta lås från en gunicorn-worker
+            _processes = ProcessPoolExecutor(
+                max_workers=bulk_parallelism(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_render_process,
+            )
+            _processes_pid = os.getpid()
+            _processes_busy = 0
+        _cancel_idle_timer()
+        _processes_busy += 1
+        return _processes
+
+
+def _release_render_processes(pool: ProcessPoolExecutor) -> None:
+    """En rendering klar. När ingen längre använder poolen stängs den efter idle-tiden."""
+    global _processes_busy, _processes_idle_timer
+    with _processes_lock:
+        if pool is not _processes:
+            return
+        _processes_busy -= 1
+        if _processes_busy == 0:
+            _cancel_idle_timer()
+            _processes_idle_timer = threading.Timer(
+                getattr(settings, "REPORT_BULK_PROCESS_IDLE", PROCESS_IDLE_TIMEOUT), _shutdown_if_idle, (pool,)
+            )
+            _processes_idle_timer.daemon = True
+            _processes_idle_timer.start()
+
+
+def _shutdown_if_idle(pool: ProcessPoolExecutor) -> None:
+    global _processes, _processes_idle_timer
+    with _processes_lock:
+        if pool is not _processes or _processes_busy:
+            return  # ny pool, eller en export hann börja
+        _processes = None
+        _processes_idle_timer = None
+    pool.shutdown(wait=True)
+
+
+def _discard_render_processes(broken: ProcessPoolExecutor) -> None:
+    """En process dog (t.ex. OOM) – poolen går inte att använda igen, nästa anrop startar en ny."""
+    global _processes
+    with _processes_lock:
+        if _processes is broken:
+            _processes = None
+            _cancel_idle_timer()
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_render_processes() -> None:
+    """Stänger processens pool (vid exit, eller i tester)."""
+    global _processes
+    with _processes_lock:
+        pool = _processes if _processes_pid == os.getpid() else None
+        _processes = None
+        _cancel_idle_timer()
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_render_processes)
+
+
+# ── ZIP-ström ───────────────────────────
+
+class _ZipBuffer:
+    """Skrivmål för zipfile utan seek: samlar bytes tills drain() hämtar dem."""
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _render_one(renderer: PdfRenderer, report_data: Dict[str, Any], show_mapping: bool) -> bytes:
+    key = pdf_cache_key(report_data, show_mapping, renderer.name)
+    cache = get_pdf_cache()
+    if cache is not None:
+        cached = await sync_to_async(cache.get, thread_sensitive=False)(key)
+        metrics.inc("reports_pdf_cache_total", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+
+    with metrics.in_flight("reports_pdf_renders_in_flight", backend=renderer.name), \
+            metrics.timed("reports_pdf_render_seconds", backend=renderer.name):
+        if renderer.cpu_bound and bulk_parallelism() > 1:
+            loop = asyncio.get_running_loop()
+            processes = _acquire_render_processes()
+            try:
+                pdf_bytes = await loop.run_in_executor(
+                    processes, _render_in_process, renderer.name, report_data, show_mapping
+                )
+            except BrokenProcessPool:
+                _discard_render_processes(processes)
+                raise
+            finally:
+                _release_render_processes(processes)
+        else:
+            pdf_bytes = await renderer.arender(report_data, show_mapping=show_mapping)
+
+    if cache is not None:
+        await sync_to_async(cache.put, thread_sensitive=False)(key, pdf_bytes)
+    return pdf_bytes
+
+
+async def stream_pdf_zip(
+    entries: Sequence[BulkEntry],
+    renderer: PdfRenderer,
+    show_mapping: bool = True,
+    parallelism: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    ZIP-bytes i bitar, en bit per färdig PDF. Misslyckade renderingar loggas
+    och listas i FEL.txt sist i arkivet – resten av exporten fortsätter.
+    """
+    parallelism = min(parallelism or bulk_parallelism(), max(1, len(entries)))
+    pending: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(len(entries)):
+        pending.put_nowait(i)
+    done: "asyncio.Queue[Tuple[int, Optional[bytes]]]" = asyncio.Queue(maxsize=parallelism)
+
+    async def worker() -> None:
+        while True:
+            try:
+                i = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            filename, build = entries[i]
+            try:
+                report_data = await sync_to_async(build, thread_sensitive=False)()
+                pdf_bytes = await _render_one(renderer, report_data, show_mapping)
+            except Exception:
+                logger.exception("Bulk-export: kunde inte rendera %s.", filename)
+                pdf_bytes = None
+            await done.put((i, pdf_bytes))
+
+    tasks = [asyncio.create_task(worker()) for _ in range(parallelism)]
+    buffer = _ZipBuffer()
+    failed: List[str] = []
+    try:
+        # PDF:er är redan komprimerade – STORED sparar CPU utan att ZIP:en växer nämnvärt
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+            for _ in range(len(entries)):
+                i, pdf_bytes = await done.get()
+                filename = entries[i][0]
+                if pdf_bytes is None:
+                    failed.append(filename)
+                    continue
+                zf.writestr(filename, pdf_bytes)
+                yield buffer.drain()
+
+            if failed:
+                zf.writestr("FEL.txt", "Följande rapporter kunde inte skapas:\n" + "\n".join(sorted(failed)) + "\n")
+        yield buffer.drain()
+    finally:
+        # Klienten kan ha avbrutit nedladdningen – lämna inga renderingar kvar i kön
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,278 @@
+import math
+from functools import lru_cache
+from html import escape
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+# ─────────────────────────────────────────
+# Serverside-diagram (inline SVG)
+# ─────────────────────────────────────────
+#
+# Ersätter Chart.js-canvasen: samma utseende som tidigare radar-plugin
+# (rundade polygonringar, dubbelring-prickar och procent-badges), men
+# renderat en gång per värdeuppsättning och cachat.
+
+FONT_FAMILY = "'Work Sans', sans-serif"
+
+RADAR_WIDTH = 720
+RADAR_HEIGHT = 500
+RADAR_RADIUS = 165
+RADAR_STEPS = (20, 40, 60, 80, 100)
+RADAR_CORNER_RADIUS = 16
+RADAR_LABEL_PADDING = 22
+RADAR_LABEL_FONT_SIZE = 13
+
+BRAND_COLOR = "#028081"
+
+
+def cluster_color(cluster: Dict[str, Any]) -> str:
+    """Klustrets färg från ramverket (clusters.<namn>.color i YAML-filen), annars BRAND_COLOR."""
+    return cluster.get("color") or BRAND_COLOR
+
+
+def _wrap_label(label: str, max_chars: int = 18) -> List[str]:
+    lines: List[str] = []
+    current = ""
+    for word in (label or "").split(" "):
+        nxt = f"{current} {word}" if current else word
+        if len(nxt) <= max_chars:
+            current = nxt
+        else:
+            if current:
+                lines.append(current)
+            current = word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _f(n: float) -> str:
+    return f"{n:.1f}"
+
+
+def rounded_polygon_segments(
+    points: Sequence[Tuple[float, float]],
+    corner_radius: float,
+) -> List[Tuple[Tuple[float, float], Tuple[float, float], Tuple[float, float]]]:
+    """
+    Samma rundning som roundedPolygonPath() i gamla Chart.js-pluginet.
+    Returnerar [(start, hörn, slut), ...] – en kvadratisk kurva per hörn.
+    """
+    n = len(points)
+    if n < 3:
+        return []
+
+    segments = []
+    for i in range(n):
+        p0 = points[(i - 1) % n]
+        p1 = points[i]
+        p2 = points[(i + 1) % n]
+
+        v1x, v1y = p0[0] - p1[0], p0[1] - p1[1]
+        v2x, v2y = p2[0] - p1[0], p2[1] - p1[1]
+        len1 = math.hypot(v1x, v1y)
+        len2 = math.hypot(v2x, v2y)
+        if not len1 or not len2:
+            continue
+
+        r = min(corner_radius, len1 * 0.25, len2 * 0.25)
+        start = (p1[0] + v1x / len1 * r, p1[1] + v1y / len1 * r)
+        end = (p1[0] + v2x / len2 * r, p1[1] + v2y / len2 * r)
+        segments.append((start, p1, end))
+
+    return segments
+
+
+def _rounded_polygon_path(points: Sequence[Tuple[float, float]], corner_radius: float) -> str:
+    parts: List[str] = []
+    for start, corner, end in rounded_polygon_segments(points, corner_radius):
+        parts.append(f"{'M' if not parts else 'L'}{_f(start[0])} {_f(start[1])}")
+        parts.append(f"Q{_f(corner[0])} {_f(corner[1])} {_f(end[0])} {_f(end[1])}")
+    return " ".join(parts) + " Z" if parts else ""
+
+
+class RadarLayout:
+    """
+    Geometri för radarn i ett (RADAR_WIDTH × RADAR_HEIGHT)-koordinatsystem med y nedåt.
+    Delas av SVG-versionen och den inbyggda reportlab-renderaren.
+    """
+
+    __slots__ = ("center", "grid", "axes", "points", "labels", "badges")
+
+    def __init__(self, labels: Sequence[str], values: Sequence[float], colors: Sequence[str]):
+        n = len(labels)
+        cx = RADAR_WIDTH / 2
+        cy = RADAR_HEIGHT / 2 + 5
+        self.center = (cx, cy)
+
+        def _pos(i: int, value: float, extra: float = 0.0) -> Tuple[float, float]:
+            angle = -math.pi / 2 + (2 * math.pi * i) / n
+            r = RADAR_RADIUS * max(0.0, min(100.0, value)) / 100.0 + extra
+            return cx + math.cos(angle) * r, cy + math.sin(angle) * r
+
+        # Rundade rutnätsringar + vinkellinjer
+        self.grid = [[_pos(i, step) for i in range(n)] for step in RADAR_STEPS]
+        self.axes = [_pos(i, 100) for i in range(n)]
+        self.points = [_pos(i, v) for i, v in enumerate(values)]
+
+        # Etiketter: (x, övre kant, ankare, rader)
+        line_height = RADAR_LABEL_FONT_SIZE * 1.2
+        self.labels = []
+        for i, label in enumerate(labels):
+            lines = _wrap_label(label, 18)
+            x, y = _pos(i, 100, RADAR_LABEL_PADDING)
+            dx = x - cx
+            anchor = "middle" if abs(dx) < 1 else ("start" if dx > 0 else "end")
+
+            block_h = line_height * len(lines)
+            dy = y - cy
+            if abs(dy) < 1:
+                top = y - block_h / 2
+            elif dy < 0:
+                top = y - block_h
+            else:
+                top = y
+            self.labels.append((x, top, anchor, lines))
+
+        # Badges: (text, x, y, bredd, färg på pricken)
+        self.badges = []
+        for i, (x, y) in enumerate(self.points):
+            text = f"{int(round(values[i]))}%"
+            badge_w = len(text) * 6.4 + 16
+            self.badges.append((text, x - badge_w / 2, y - RADAR_RING_RADIUS - RADAR_BADGE_GAP - RADAR_BADGE_HEIGHT, badge_w, colors[i]))
+
+
+RADAR_RING_RADIUS = 11
+RADAR_DOT_RADIUS = 6
+RADAR_BADGE_HEIGHT = 18
+RADAR_BADGE_GAP = 6
+
+
+@lru_cache(maxsize=256)
+def radar_svg(labels: Tuple[str, ...], values: Tuple[float, ...], colors: Tuple[str, ...]) -> str:
+    """
+    Radar (0–100) som inline-SVG.
+    labels/values/colors måste vara tuples (cache-nyckel), values avrundas av anroparen.
+    """
+    if len(labels) < 3:
+        return ""
+
+    layout = RadarLayout(labels, values, colors)
+    cx, cy = layout.center
+
+    out: List[str] = [
+        f'<svg class="radar-svg" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {RADAR_WIDTH} {RADAR_HEIGHT}" '
+        f'preserveAspectRatio="xMidYMid meet" role="img" aria-label="Radardiagram">'
+    ]
+
+    for pts in layout.grid:
+        out.append(
+            f'<path d="{_rounded_polygon_path(pts, RADAR_CORNER_RADIUS)}" fill="none" '
+            f'stroke="rgba(0,0,0,0.10)" stroke-width="1"/>'
+        )
+    for x, y in layout.axes:
+        out.append(
+            f'<line x1="{_f(cx)}" y1="{_f(cy)}" x2="{_f(x)}" y2="{_f(y)}" stroke="rgba(0,0,0,0.06)" stroke-width="1"/>'
+        )
+
+    # Dataytan
+    poly = " ".join(f"{_f(x)},{_f(y)}" for x, y in layout.points)
+    out.append(
+        f'<polygon points="{poly}" fill="rgba(2,128,129,0.14)" stroke="{BRAND_COLOR}" '
+        f'stroke-width="2.6" stroke-linejoin="round"/>'
+    )
+
+    # Etiketter runt om
+    line_height = RADAR_LABEL_FONT_SIZE * 1.2
+    for x, top, anchor, lines in layout.labels:
+        out.append(
+            f'<text x="{_f(x)}" y="{_f(top)}" text-anchor="{anchor}" font-family="{FONT_FAMILY}" '
+            f'font-size="{RADAR_LABEL_FONT_SIZE}" font-weight="700" fill="#222">'
+        )
+        for j, line in enumerate(lines):
+            out.append(f'<tspan x="{_f(x)}" dy="{_f(line_height if j else RADAR_LABEL_FONT_SIZE)}">{escape(line)}</tspan>')
+        out.append("</text>")
+
+    # Prickar + procent-badges
+    for (x, y), (text, bx, by, badge_w, color) in zip(layout.points, layout.badges):
+        out.append(
+            f'<circle cx="{_f(x)}" cy="{_f(y)}" r="{RADAR_RING_RADIUS}" fill="#ffffff" stroke="rgba(0,0,0,0.10)" stroke-width="1.2"/>'
+            f'<circle cx="{_f(x)}" cy="{_f(y)}" r="{RADAR_DOT_RADIUS}" fill="{color}"/>'
+            f'<rect x="{_f(bx)}" y="{_f(by)}" width="{_f(badge_w)}" height="{RADAR_BADGE_HEIGHT}" rx="6" '
+            f'fill="rgba(255,255,255,0.97)" stroke="rgba(0,0,0,0.10)" stroke-width="1"/>'
+            f'<text x="{_f(x)}" y="{_f(by + RADAR_BADGE_HEIGHT / 2)}" text-anchor="middle" dominant-baseline="central" '
+            f'font-family="{FONT_FAMILY}" font-size="10" font-weight="700" fill="#111">{text}</text>'
+        )
+
+    out.append("</svg>")
+    return "".join(out)
+
+
+BAR_ROW_HEIGHT = 22
+BAR_LABEL_WIDTH = 230
+BAR_AREA_WIDTH = 340
+BAR_MAX = 5.0
+
+
+@lru_cache(maxsize=256)
+def competency_bar_svg(labels: Tuple[str, ...], values: Tuple[float, ...]) -> str:
+    """Kompetenspoäng (0–5) som liggande staplar."""
+    if not labels:
+        return ""
+
+    top = 8
+    axis_h = 20
+    width = BAR_LABEL_WIDTH + BAR_AREA_WIDTH + 40
+    height = top + BAR_ROW_HEIGHT * len(labels) + axis_h
+    x0 = BAR_LABEL_WIDTH + 10
+
+    out: List[str] = [
+        f'<svg class="competency-svg" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'preserveAspectRatio="xMidYMid meet" role="img" aria-label="Kompetenspoäng">'
+    ]
+
+    # Skala 0–5
+    axis_y = top + BAR_ROW_HEIGHT * len(labels)
+    for tick in range(6):
+        x = x0 + BAR_AREA_WIDTH * tick / BAR_MAX
+        out.append(f'<line x1="{_f(x)}" y1="{top}" x2="{_f(x)}" y2="{axis_y}" stroke="rgba(0,0,0,0.08)" stroke-width="1"/>')
+        out.append(
+            f'<text x="{_f(x)}" y="{axis_y + 14}" text-anchor="middle" font-family="{FONT_FAMILY}" '
+            f'font-size="10" fill="#555">{tick}</text>'
+        )
+
+    for i, (label, value) in enumerate(zip(labels, values)):
+        y = top + BAR_ROW_HEIGHT * i
+        bar_w = BAR_AREA_WIDTH * max(0.0, min(BAR_MAX, value)) / BAR_MAX
+        out.append(
+            f'<text x="{BAR_LABEL_WIDTH}" y="{_f(y + BAR_ROW_HEIGHT / 2)}" text-anchor="end" dominant-baseline="central" '
+            f'font-family="{FONT_FAMILY}" font-size="11" fill="#222">{escape(label)}</text>'
+            f'<rect x="{x0}" y="{_f(y + 4)}" width="{_f(bar_w)}" height="{BAR_ROW_HEIGHT - 8}" rx="3" fill="{BRAND_COLOR}"/>'
+            f'<text x="{_f(x0 + bar_w + 6)}" y="{_f(y + BAR_ROW_HEIGHT / 2)}" dominant-baseline="central" '
+            f'font-family="{FONT_FAMILY}" font-size="10" font-weight="600" fill="#111">{value:.2f}</text>'
+        )
+
+    out.append("</svg>")
+    return "".join(out)
+
+
+def radar_values_for(report_data: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[float, ...], Tuple[str, ...]]:
+    """Radarns etiketter (klustertitlar), värden och klusterfärger, som cache-vänliga tuples."""
+    clusters = report_data.get("b3_clusters") or []
+    labels = tuple(c.get("title") or c.get("name") or "" for c in clusters)
+    values = tuple(round(float(v), 2) for v in report_data.get("radar_values") or [])
+    colors = tuple(cluster_color(c) for c in clusters)
+    return labels, values, colors
+
+
+def chart_context(report_data: Dict[str, Any]) -> Dict[str, str]:
+    """Radar + kompetensstaplar som inline-SVG, redo att lägga i template-context."""
+    radar_labels, radar_values, radar_colors = radar_values_for(report_data)
+
+    chart_labels = tuple(report_data.get("chart_labels") or [])
+    chart_values = tuple(round(float(v), 2) for v in report_data.get("chart_values") or [])
+
+    return {
+        "radar_svg": radar_svg(radar_labels, radar_values, radar_colors),
+        "competency_chart_svg": competency_bar_svg(chart_labels, chart_values),
+    }
@@ -0,0 +1,137 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .scoring import MAX_SCORE, CompiledFramework, score_matrix
+
+
+# ─────────────────────────────────────────
+# Gruppsammanställning (alla kandidater i en fil)
+# ─────────────────────────────────────────
+#
+# Samma matriser som score_matrix ger (N × kompetenser, underbeteenden,
+# kluster) sammanfattas kolumnvis: antal, medel, spridning, min/kvartiler/max
+# och histogram. Varje kolumn sorteras en gång och kvartiler och histogram
+# läses ur den sorterade kolumnen – inga Python-loopar över kandidater, så
+# även tiotusentals rader tar en bråkdel av en sekund.
+
+SCORE_BINS = np.arange(1.0, MAX_SCORE + 0.5, 0.5)  # 1.0, 1.5 … 5.0 -> 8 staplar
+PCT_BINS = np.linspace(0.0, 100.0, 11)              # 0, 10 … 100 -> 10 staplar
+
+QUANTILES = (0.25, 0.5, 0.75)
+TEAM_TOP_N = 3  # underbeteenden i topp/botten, som top_energy/low_energy för en kandidat
+
+
+def _opt(v: float) -> Optional[float]:
+    return None if np.isnan(v) else float(v)
+
+
+class ColumnStats:
+    """Statistik per kolumn i en (N, D)-matris. NaN räknas som saknat värde."""
+
+    __slots__ = ("count", "mean", "std", "min", "q1", "median", "q3", "max", "histogram", "bins")
+
+    def __init__(self, M: np.ndarray, bins: np.ndarray):
+        M = np.atleast_2d(np.asarray(M, dtype=float))
+        n, d = M.shape
+
+        # En rad per kolumn, sorterad. NaN hamnar sist, så kolumn j:s värden är S[j, :count[j]]
+        S = np.sort(M.T, axis=1)
+        count = np.count_nonzero(~np.isnan(S), axis=1)
+        has = count > 0
+        rows = np.arange(d)
+        last = np.maximum(count - 1, 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(S, axis=1) / count
+            # Populationens standardavvikelse (ddof=0) – gruppen är hela populationen
+            std = np.sqrt(np.nansum((S - mean[:, np.newaxis]) ** 2, axis=1) / count)
+
+        def at_rank(pos: np.ndarray) -> np.ndarray:
+            # Linjär interpolation mellan närmaste rangerna (samma som np.quantile)
+            if not n:
+                return np.full(d, np.nan)
+            lo = np.floor(pos).astype(np.intp)
+            hi = np.minimum(lo + 1, last)
+            frac = pos - lo
+            return np.where(has, S[rows, lo] * (1.0 - frac) + S[rows, hi] * frac, np.nan)
+
+        self.count = count
+        self.mean = np.where(has, mean, np.nan)
+        self.std = np.where(has, std, np.nan)
+        self.min = at_rank(np.zeros(d))
+        self.max = at_rank(last.astype(float))
+        self.q1, self.median, self.q3 = (at_rank(q * last) for q in QUANTILES)
+
+        # Histogram ur de sorterade raderna: antal värden under varje kant. Värden
+        # utanför skalan räknas till första/sista stapeln, sista stapeln är sluten.
+        below = np.empty((d, len(bins)), dtype=np.intp)
+        for j in range(d):
+            below[j] = np.searchsorted(S[j, :count[j]], bins, side="left")
+        below[:, 0] = 0
+        below[:, -1] = count
+        self.histogram = np.diff(below, axis=1)
+        self.bins = bins
+
+    def row(self, j: int) -> Dict[str, Any]:
+        """Kolumn j som dict för templates (None där värde saknas)."""
+        count = int(self.count[j])
+        hist = self.histogram[j]
+        peak = int(hist.max()) if count else 0
+        return {
+            "count": count,
+            "mean": _opt(self.mean[j]),
+            "std": _opt(self.std[j]),
+            "min": _opt(self.min[j]),
+            "q1": _opt(self.q1[j]),
+            "median": _opt(self.median[j]),
+            "q3": _opt(self.q3[j]),
+            "max": _opt(self.max[j]),
+            "histogram": [
+                {
+                    "lo": float(self.bins[b]),
+                    "hi": float(self.bins[b + 1]),
+                    "count": int(c),
+                    "height": (c / peak * 100.0) if peak else 0.0,  # stapelhöjd relativt högsta stapeln
+                }
+                for b, c in enumerate(hist)
+            ],
+        }
+
+
+class CohortStats:
+    """Gruppens statistik för kompetenser, underbeteenden och kluster (index som i ramverket)."""
+
+    __slots__ = ("size", "competencies", "under", "cluster_mean", "cluster_pct")
+
+    def __init__(self, size, competencies, under, cluster_mean, cluster_pct):
+        self.size = size                    # antal kandidater
+        self.competencies = competencies    # ColumnStats över fw.competencies, 1–5
+        self.under = under                  # ColumnStats över fw.underbehaviors, 1–5
+        self.cluster_mean = cluster_mean    # ColumnStats över fw.cluster_order, medel 1–5
+        self.cluster_pct = cluster_pct      # ColumnStats över fw.cluster_order, 0..100
+
+
+def cohort_stats(fw: CompiledFramework, X: np.ndarray) -> CohortStats:
+    """X: (N, C) som till score_matrix. Poängsätter alla rader och sammanfattar per kolumn."""
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    result = score_matrix(fw, X)
+    return CohortStats(
+        size=X.shape[0],
+        competencies=ColumnStats(X, SCORE_BINS),
+        under=ColumnStats(result.under, SCORE_BINS),
+        cluster_mean=ColumnStats(result.cluster_mean, SCORE_BINS),
+        cluster_pct=ColumnStats(result.cluster_pct, PCT_BINS),
+    )
+
+
+def ranked(values: Sequence[float], n: int) -> Tuple[List[int], List[int]]:
+    """
+    (högsta n, lägsta n) index efter värde; NaN hoppas över. Lika värden
+    behåller ramverkets ordning – samma som max()/sorted() för en kandidat.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    order = valid[np.argsort(values[valid], kind="stable")]
+    top = valid[np.argsort(-values[valid], kind="stable")][:n]
+    return top.tolist(), order[:n].tolist()
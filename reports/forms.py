@@ -1,8 +1,21 @@
 from django import forms
 from django.core.exceptions import ValidationError
 
+from .framework import available_frameworks, default_framework_key
+
+
 class ExcelUploadForm(forms.Form):
     file = forms.FileField(label="Ladda upp testresultat (Excel)")
+    framework = forms.ChoiceField(label="Ramverk", required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        choices = available_frameworks()
+        field = self.fields["framework"]
+        field.choices = choices
+        field.initial = default_framework_key()
+        if len(choices) <= 1:
+            field.widget = forms.HiddenInput()  # ett enda ramverk: inget att välja
 
     def clean_file(self):
         f = self.cleaned_data["file"]
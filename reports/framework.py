@@ -0,0 +1,423 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import yaml
+from django.conf import settings
+
+from .scoring import HEAVY_WEIGHT, NORMAL_WEIGHT, CompiledFramework
+
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────
+# Ramverksdefinition (YAML)
+# ─────────────────────────────────────────
+#
+# Varje ramverk (underbeteenden, kluster, vikter och alla texter) är en
+# YAML-fil i settings.REPORT_FRAMEWORK_DIR (default reports/frameworks/);
+# filnamnet utan .yaml är ramverkets nyckel. En uppladdning väljer ramverk,
+# annars används settings.REPORT_FRAMEWORK_DEFAULT. Filen valideras och
+# kompileras en gång till ett oföränderligt Framework: scoring-matriserna
+# (CompiledFramework) plus texterna i uppslagsform. Kompilerade ramverk hålls
+# i en begränsad LRU-cache per process. Ändras en fil läses den om vid nästa
+# anrop – varje worker för sig, utan omstart.
+#
+# Två versioner:
+#   Framework.version           hash av hela definitionen, texter inräknade.
+#                               Ingår i cachenycklar för report_data, textfragment
+#                               och PDF:er – en ändrad formulering slår igenom direkt.
+#   Framework.compiled.version  hash av underbeteendena (poängsättningen). Sparas
+#                               med rapporter och normtabeller, som bara beror på
+#                               poängen.
+
+DEFAULT_FRAMEWORK_DIR = Path(__file__).resolve().parent / "frameworks"
+DEFAULT_FRAMEWORK_KEY = "b3"
+FRAMEWORK_CACHE_SIZE = 8  # kompilerade ramverk per process (settings.REPORT_FRAMEWORK_CACHE_SIZE)
+
+FRAMEWORK_KEY_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")  # även skydd mot ../ i sökvägen
+COLOR_RE = re.compile(r"^#[0-9a-fA-F]{6}$")
+
+INSIGHT_KINDS = ("top", "low")  # top = starkast, low = mest att utveckla
+FRAMEWORK_KEYS = ("name", "organization", "organization_genitive", "clusters", "underbehaviors", "competencies", "aliases")
+UNDERBEHAVIOR_KEYS = ("cluster", "name", "competencies", "weighted_competencies", "weight", "spacer")
+
+
+class FrameworkError(ValueError):
+    """Ogiltig ramverksfil. Meddelandet anger fil och plats i filen."""
+
+
+class ClusterText:
+    __slots__ = ("title", "description", "slug", "color", "one_liners", "questions")
+
+    def __init__(self, title: str, description: str = "", slug: str = "", color: str = "", one_liners=None, questions=None):
+        self.title = title
+        self.description = description
+        self.slug = slug                # data-cluster-värde som report.css färgsätter kortet med
+        self.color = color              # "#rrggbb" för diagram och PDF ("" = charts.BRAND_COLOR)
+        self.one_liners: Mapping[str, str] = MappingProxyType(dict(one_liners or {}))
+        self.questions: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+            {kind: tuple(qs) for kind, qs in (questions or {}).items()}
+        )
+
+
+class CompetencyText:
+    __slots__ = ("label", "description")
+
+    def __init__(self, label: str, description: str = ""):
+        self.label = label              # svenskt namn
+        self.description = description
+
+
+class Framework:
+    """Ett kompilerat, oföränderligt ramverk. Skapas av load_framework()."""
+
+    __slots__ = (
+        "key",               # filnamnet utan .yaml
+        "name",
+        "organization",      # i rapporttexterna, t.ex. "B3"
+        "organization_genitive",  # "B3:s"
+        "path",
+        "version",           # hash av hela definitionen (se ovan)
+        "compiled",          # CompiledFramework – matriserna för score_matrix
+        "clusters",          # klusternamn -> ClusterText
+        "competencies",      # kompetensnamn -> CompetencyText
+        "spacers",           # underbeteende -> CSS-klass för manuell sidbrytning efter det i mappningen
+        "aliases",           # ((normaliserat namn, (stavningar, ...)), ...) – hashbar, för resolve_columns
+        "cluster_titles",    # titlar i compiled.cluster_order-ordning
+        "competency_labels",  # svenska namn i compiled.competencies-ordning
+    )
+
+    def __init__(self, key: str, definition: Dict[str, Any], path: Optional[Path] = None):
+        payload = json.dumps(definition, sort_keys=True, ensure_ascii=False)
+        self.version = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+        self.key = key
+        self.name = definition["name"]
+        self.organization = definition["organization"]
+        self.organization_genitive = definition["organization_genitive"]
+        self.path = path
+        self.compiled = CompiledFramework(definition["underbehaviors"])
+
+        self.clusters: Mapping[str, ClusterText] = MappingProxyType({
+            name: ClusterText(c["title"], c["description"], c["slug"], c["color"], c["one_liners"], c["questions"])
+            for name, c in definition["clusters"].items()
+        })
+        self.spacers: Mapping[str, str] = MappingProxyType(dict(definition["spacers"]))
+        self.competencies: Mapping[str, CompetencyText] = MappingProxyType({
+            name: CompetencyText(c["sv"], c["desc"]) for name, c in definition["competencies"].items()
+        })
+        self.aliases = tuple((key, tuple(variants)) for key, variants in definition["aliases"].items())
+
+        self.cluster_titles = tuple(self.cluster(name).title for name in self.compiled.cluster_order)
+        self.competency_labels = tuple(self.competency(name).label for name in self.compiled.competencies)
+
+    # Jämförs på (nyckel, version): ett Framework kan vara nyckel i lru_cache och
+    # ger samma träffar som versionssträngen, men följer med till den cachade funktionen
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Framework) and (other.key, other.version) == (self.key, self.version)
+
+    def __hash__(self) -> int:
+        return hash((self.key, self.version))
+
+    def __repr__(self) -> str:
+        return f"<Framework {self.key} {self.name!r} {self.version}>"
+
+    def summary(self) -> Dict[str, str]:
+        """Det som rapporttexterna behöver om ramverket (ingår i report_data)."""
+        return {
+            "key": self.key,
+            "name": self.name,
+            "version": self.version,
+            "organization": self.organization,
+            "organization_genitive": self.organization_genitive,
+        }
+
+    def cluster(self, name: str) -> ClusterText:
+        text = self.clusters.get(name)
+        return text if text is not None else ClusterText(name)
+
+    def competency(self, name: str) -> CompetencyText:
+        text = self.competencies.get(name)
+        return text if text is not None else CompetencyText(name)
+
+    def one_liner(self, cluster_name: str, kind: str) -> str:
+        return self.cluster(cluster_name).one_liners.get(kind, "")
+
+    def questions(self, cluster_name: str, kind: str) -> Tuple[str, ...]:
+        return self.cluster(cluster_name).questions.get(kind, ())
+
+
+# ── Validering ──────────────────────────
+#
+# Allt kontrolleras innan något kompileras, så att ett fel i filen ger ett
+# begripligt meddelande i stället för ett KeyError mitt i en request.
+
+def _fail(where: str, message: str):
+    raise FrameworkError(f"{where}: {message}")
+
+
+def _text(value: Any, where: str, required: bool = True) -> str:
+    if value is None and not required:
+        return ""
+    if not isinstance(value, str) or (required and not value.strip()):
+        _fail(where, "måste vara en text" if not required else "måste vara en icke-tom text")
+    return value
+
+
+def _mapping(value: Any, where: str, required: bool = True) -> Dict[Any, Any]:
+    if value is None and not required:
+        return {}
+    if not isinstance(value, dict):
+        _fail(where, "måste vara en mappning (nyckel: värde)")
+    return value
+
+
+def _texts(value: Any, where: str, required: bool = True) -> List[str]:
+    if value is None and not required:
+        return []
+    if not isinstance(value, list) or (required and not value):
+        _fail(where, "måste vara en icke-tom lista" if required else "måste vara en lista")
+    return [_text(v, f"{where}[{i}]") for i, v in enumerate(value)]
+
+
+def _color(value: Any, where: str) -> str:
+    if value is None:
+        return ""
+    if not isinstance(value, str) or not COLOR_RE.match(value):
+        _fail(where, "måste vara en färg på formen #rrggbb")
+    return value.lower()
+
+
+def _kinds(value: Any, where: str) -> Dict[str, Any]:
+    value = _mapping(value, where, required=False)
+    for kind in value:
+        if kind not in INSIGHT_KINDS:
+            _fail(f"{where}.{kind}", f"okänd nyckel, tillåtna är {', '.join(INSIGHT_KINDS)}")
+    return value
+
+
+def _validate_cluster(name: str, raw: Any, where: str) -> Dict[str, Any]:
+    raw = _mapping(raw, where)
+    one_liners = _kinds(raw.get("one_liners"), f"{where}.one_liners")
+    questions = _kinds(raw.get("questions"), f"{where}.questions")
+    return {
+        "title": _text(raw.get("title", name), f"{where}.title"),
+        "description": _text(raw.get("description"), f"{where}.description", required=False),
+        "slug": _text(raw.get("slug"), f"{where}.slug", required=False),
+        "color": _color(raw.get("color"), f"{where}.color"),
+        "one_liners": {k: _text(v, f"{where}.one_liners.{k}") for k, v in one_liners.items()},
+        "questions": {k: _texts(v, f"{where}.questions.{k}", required=False) for k, v in questions.items()},
+    }
+
+
+def _validate_underbehavior(raw: Any, where: str, clusters: Dict[str, Any]) -> Dict[str, Any]:
+    raw = _mapping(raw, where)
+    cluster = _text(raw.get("cluster"), f"{where}.cluster")
+    if cluster not in clusters:
+        _fail(f"{where}.cluster", f"{cluster!r} finns inte under clusters")
+
+    competencies = _texts(raw.get("competencies"), f"{where}.competencies")
+    if len(set(competencies)) != len(competencies):
+        _fail(f"{where}.competencies", "innehåller dubbletter")
+
+    weight = raw.get("weight", NORMAL_WEIGHT)
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or float(weight) not in (NORMAL_WEIGHT, HEAVY_WEIGHT):
+        _fail(f"{where}.weight", f"måste vara {NORMAL_WEIGHT:g} eller {HEAVY_WEIGHT:g}")
+
+    # Samma nycklar och typer som de tidigare Python-literalerna, så att
+    # compiled.version (och därmed sparade rapporter och normtabeller) behålls
+    beh: Dict[str, Any] = {
+        "cluster": cluster,
+        "name": _text(raw.get("name"), f"{where}.name"),
+        "competencies": competencies,
+    }
+    if "weighted_competencies" in raw:
+        weighted = _texts(raw["weighted_competencies"], f"{where}.weighted_competencies", required=False)
+        unknown = [c for c in weighted if c not in competencies]
+        if unknown:
+            _fail(f"{where}.weighted_competencies", f"{', '.join(map(repr, unknown))} finns inte i competencies")
+        beh["weighted_competencies"] = weighted
+    beh["weight"] = float(weight)
+
+    extra = set(raw) - set(UNDERBEHAVIOR_KEYS)
+    if extra:
+        _fail(where, f"okända nycklar: {', '.join(sorted(map(str, extra)))}")
+    return beh
+
+
+def validate_definition(raw: Any, source: str = "ramverk") -> Dict[str, Any]:
+    """Rå YAML-data -> normaliserad definition. FrameworkError om något är fel."""
+    raw = _mapping(raw, source)
+    extra = set(raw) - set(FRAMEWORK_KEYS)
+    if extra:
+        _fail(source, f"okända nycklar: {', '.join(sorted(map(str, extra)))}")
+
+    clusters = {
+        _text(name, f"{source}.clusters"): _validate_cluster(name, c, f"{source}.clusters.{name}")
+        for name, c in _mapping(raw.get("clusters"), f"{source}.clusters").items()
+    }
+
+    raw_underbehaviors = raw.get("underbehaviors")
+    if not isinstance(raw_underbehaviors, list) or not raw_underbehaviors:
+        _fail(f"{source}.underbehaviors", "måste vara en icke-tom lista")
+    underbehaviors = [
+        _validate_underbehavior(beh, f"{source}.underbehaviors[{i}]", clusters)
+        for i, beh in enumerate(raw_underbehaviors)
+    ]
+
+    # Sidbrytningar är layout och hålls utanför definitionen som poängsätts
+    spacers = {
+        beh["name"]: _text(raw_beh["spacer"], f"{source}.underbehaviors[{i}].spacer")
+        for i, (beh, raw_beh) in enumerate(zip(underbehaviors, raw_underbehaviors))
+        if "spacer" in raw_beh
+    }
+
+    names = [beh["name"] for beh in underbehaviors]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        _fail(f"{source}.underbehaviors", f"namnen måste vara unika: {', '.join(map(repr, duplicates))}")
+    unused = [name for name in clusters if name not in {beh["cluster"] for beh in underbehaviors}]
+    if unused:
+        _fail(f"{source}.clusters", f"används inte av något underbeteende: {', '.join(map(repr, unused))}")
+
+    competencies = {}
+    for name, c in _mapping(raw.get("competencies"), f"{source}.competencies", required=False).items():
+        where = f"{source}.competencies.{name}"
+        c = _mapping(c, where)
+        competencies[_text(name, f"{source}.competencies")] = {
+            "sv": _text(c.get("sv"), f"{where}.sv"),
+            "desc": _text(c.get("desc"), f"{where}.desc", required=False),
+        }
+
+    aliases = {
+        _text(key, f"{source}.aliases"): _texts(variants, f"{source}.aliases.{key}")
+        for key, variants in _mapping(raw.get("aliases"), f"{source}.aliases", required=False).items()
+    }
+
+    name = _text(raw.get("name", source), f"{source}.name")
+    organization = _text(raw.get("organization", name), f"{source}.organization")
+    return {
+        "name": name,
+        "organization": organization,
+        "organization_genitive": _text(
+            raw.get("organization_genitive", f"{organization}s"), f"{source}.organization_genitive"
+        ),
+        "clusters": clusters,
+        "underbehaviors": underbehaviors,
+        "spacers": spacers,
+        "competencies": competencies,
+        "aliases": aliases,
+    }
+
+
+# libyaml-laddaren om PyYAML är byggd med den (flera gånger snabbare), annars den rena Python-varianten
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_framework(path: Path) -> Framework:
+    """Läser, validerar och kompilerar en ramverksfil. Nyckeln är filnamnet utan .yaml."""
+    try:
+        raw = yaml.load(path.read_text(encoding="utf-8"), Loader=_YAML_LOADER)
+    except yaml.YAMLError as e:
+        raise FrameworkError(f"{path.name}: ogiltig YAML: {e}") from e
+    return Framework(path.stem, validate_definition(raw, path.name), path)
+
+
+# ── Register ────────────────────────────
+
+class _Entry:
+    __slots__ = ("stamp", "framework")
+
+    def __init__(self, stamp: Tuple[str, int], framework: Framework):
+        self.stamp = stamp            # (sökväg, mtime_ns) för den senast lästa filen
+        self.framework = framework    # senast fungerande kompilering
+
+
+_frameworks: "OrderedDict[str, _Entry]" = OrderedDict()  # nyckel -> entry, äldst använd först
+_frameworks_lock = threading.Lock()
+
+
+def framework_dir() -> Path:
+    return Path(getattr(settings, "REPORT_FRAMEWORK_DIR", "") or DEFAULT_FRAMEWORK_DIR)
+
+
+def default_framework_key() -> str:
+    return getattr(settings, "REPORT_FRAMEWORK_DEFAULT", "") or DEFAULT_FRAMEWORK_KEY
+
+
+def framework_path(key: str) -> Path:
+    if not FRAMEWORK_KEY_RE.match(key or ""):
+        raise FrameworkError(f"Ogiltig ramverksnyckel: {key!r}")
+    return framework_dir() / f"{key}.yaml"
+
+
+def framework_keys() -> List[str]:
+    """Nycklarna för alla ramverksfiler i katalogen, sorterade."""
+    try:
+        paths = framework_dir().glob("*.yaml")
+        return sorted(p.stem for p in paths if FRAMEWORK_KEY_RE.match(p.stem))
+    except OSError:
+        return []
+
+
+def available_frameworks() -> List[Tuple[str, str]]:
+    """(nyckel, namn) för varje ramverk som går att läsa – till väljaren vid uppladdning."""
+    choices = []
+    for key in framework_keys():
+        try:
+            choices.append((key, get_framework(key).name))
+        except FrameworkError:
+            logger.warning("Ramverket %s kan inte läsas och visas inte.", key, exc_info=True)
+    return choices
+
+
+def get_framework(key: Optional[str] = None) -> Framework:
+    """
+    Ramverket med nyckeln key (default settings.REPORT_FRAMEWORK_DEFAULT).
+    Läses om när filen ändras; ger den nya filen samma version behålls det
+    kompilerade objektet (och därmed alla cachar). En trasig fil loggas och
+    det senast fungerande ramverket används – utan ett sådant kastas
+    FrameworkError, liksom för en okänd nyckel.
+    """
+    key = key or default_framework_key()
+    path = framework_path(key)
+    entry = _frameworks.get(key)
+    try:
+        stamp = (str(path), path.stat().st_mtime_ns)
+    except OSError as e:
+        if entry is None:
+            raise FrameworkError(f"Ramverket {key!r} finns inte ({path}).") from e
+        return entry.framework
+
+    with _frameworks_lock:
+        entry = _frameworks.get(key)
+        if entry is not None and entry.stamp == stamp:
+            _frameworks.move_to_end(key)
+            return entry.framework
+
+        try:
+            framework = load_framework(path)
+        except (OSError, FrameworkError) as e:
+            if entry is None:
+                raise
+            logger.error("Kunde inte läsa om ramverket (%s) – fortsätter med version %s.", e, entry.framework.version)
+            framework = entry.framework
+        else:
+            if entry is not None and framework == entry.framework:
+                framework = entry.framework
+            elif entry is not None:
+                logger.info("Ramverket %s omläst: version %s -> %s.", key, entry.framework.version, framework.version)
+
+        _frameworks[key] = _Entry(stamp, framework)
+        _frameworks.move_to_end(key)
+        limit = max(1, int(getattr(settings, "REPORT_FRAMEWORK_CACHE_SIZE", FRAMEWORK_CACHE_SIZE)))
+        while len(_frameworks) > limit:
+            _frameworks.popitem(last=False)
+        return framework
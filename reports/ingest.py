@@ -0,0 +1,199 @@
+import math
+import zipfile
+import zlib
+from typing import Any, Iterator, List, Optional, Sequence, Set, Tuple
+from xml.etree import ElementTree
+
+import numpy as np
+
+
+# ─────────────────────────────────────────
+# Excel-inläsning (header först, bara de kolumner vi använder)
+# ─────────────────────────────────────────
+#
+# Leverantörsexporter har ofta hundratals kolumner på item-nivå. Vi läser
+# header-raden först, avbryter direkt om filen saknar kompetenskolumner, och
+# strömmar sedan arket rad för rad (openpyxl read_only) där bara namn- och
+# kompetenscellerna används – rakt in i en numpy-matris, ingen DataFrame över
+# hela arket.
+#
+# Matrisen sparas som float32 (halva minnet i rapportlagret). Poängen i
+# exporterna har få decimaler, så widen_scores() återställer exakt samma
+# float64-värden som filen innehöll innan något räknas på dem.
+
+COMPETENCY_COLUMN_PREFIX = "Competency Score:"
+NAME_COLUMNS = ("First Name", "Last Name")
+
+SCORE_DTYPE = np.float32
+SCORE_DECIMALS = 5  # float32 -> float64 är exakt upp till 5 decimaler för poäng under 128
+
+
+class ExcelIngestError(ValueError):
+    """Filen går inte att använda. Meddelandet visas för användaren."""
+
+
+UNREADABLE_MESSAGE = "Filen kunde inte läsas som en Excel-fil (.xlsx)."
+
+# Fel som en trasig eller oväntad fil kan ge var som helst i arket (zip, XML,
+# openpyxl, pandas/xlrd) – alla blir ExcelIngestError
+_READ_ERRORS = (
+    zipfile.BadZipFile, zlib.error, EOFError, KeyError, IndexError, TypeError, ValueError, ElementTree.ParseError
+)
+
+
+def competency_label(col: Any) -> Optional[str]:
+    """'Competency Score: Drive (STIVE)' -> 'Drive'. None om kolumnen inte är en kompetens."""
+    if not (isinstance(col, str) and col.startswith(COMPETENCY_COLUMN_PREFIX)):
+        return None
+    label = col.replace(COMPETENCY_COLUMN_PREFIX, "").strip()
+    return label.replace("(STIVE)", "").strip()
+
+
+def full_name(first_name: Any, last_name: Any) -> str:
+    parts = [str(x).strip() for x in (first_name, last_name) if isinstance(x, str)]
+    return " ".join(p for p in parts if p) or "Kandidaten"
+
+
+def widen_scores(values: np.ndarray) -> np.ndarray:
+    """Poängmatris (float32 från read_candidates) -> float64 med filens värden, NaN behålls."""
+    values = np.asarray(values)
+    if values.dtype != SCORE_DTYPE:
+        return values.astype(float, copy=False)
+    return np.round(values.astype(float), SCORE_DECIMALS)
+
+
+def _to_float(v: Any) -> float:
+    """
+    Cellvärde -> float, NaN om cellen är tom eller inte ett tal (som pd.to_numeric(errors='coerce')).
+    Fel (#N/A), datum och TRUE/FALSE är inga poäng.
+    """
+    if v is None or isinstance(v, bool):
+        return math.nan
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        return float(str(v).strip())
+    except ValueError:
+        return math.nan
+
+
+class HeaderPlan:
+    """Vilka kolumnindex vi behöver ur en header-rad."""
+
+    __slots__ = ("first_name", "last_name", "columns", "labels")
+
+    def __init__(self, header: Sequence[Any]):
+        index = {col: i for i, col in reversed(list(enumerate(header))) if isinstance(col, str)}
+        self.first_name: Optional[int] = index.get(NAME_COLUMNS[0])
+        self.last_name: Optional[int] = index.get(NAME_COLUMNS[1])
+
+        self.columns: List[int] = []
+        self.labels: List[str] = []
+        for i, col in enumerate(header):
+            label = competency_label(col)
+            if label is not None:
+                self.columns.append(i)
+                self.labels.append(label)
+
+        if not self.columns:
+            raise ExcelIngestError(
+                f"Hittade inga kolumner som börjar med '{COMPETENCY_COLUMN_PREFIX}' i Excel-filen."
+            )
+
+
+class _XlsxRows:
+    """
+    Första arkets rader via openpyxl i read_only-läge (strömmar arket, håller
+    inte hela arbetsboken i minnet). Sätt .keep (kolumnindex) efter header-raden,
+    så läses bara celler fram till den sista kolumn vi behöver.
+    """
+
+    def __init__(self, excel_file):
+        self.excel_file = excel_file
+        self.keep: Optional[Set[int]] = None
+
+    def __iter__(self):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(self.excel_file, read_only=True, data_only=True)
+        try:
+            if not wb.worksheets:
+                raise ExcelIngestError("Excel-filen saknar kalkylblad.")
+            sheet = wb.worksheets[0]
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            yield list(header)
+            max_col = max(self.keep) + 1 if self.keep else None
+            for row in sheet.iter_rows(min_row=2, max_col=max_col, values_only=True):
+                yield list(row)
+        finally:
+            wb.close()
+
+
+class _PandasRows:
+    """Fallback för gamla .xls (bara pandas/xlrd kan läsa dem). .keep ignoreras."""
+
+    def __init__(self, excel_file):
+        self.excel_file = excel_file
+        self.keep: Optional[Set[int]] = None
+
+    def __iter__(self):
+        import pandas as pd
+
+        df = pd.read_excel(self.excel_file, header=None, dtype=object)
+        for row in df.itertuples(index=False, name=None):
+            yield [None if (isinstance(v, float) and math.isnan(v)) else v for v in row]
+
+
+def _guarded(rows: Iterator[List[Any]]) -> Iterator[List[Any]]:
+    """Raderna ur en läsare, där läsfel i vilken rad som helst blir ExcelIngestError."""
+    try:
+        yield from rows
+    except ExcelIngestError:
+        raise
+    except _READ_ERRORS:
+        raise ExcelIngestError(UNREADABLE_MESSAGE)
+
+
+def read_candidates(excel_file) -> Tuple[List[str], List[str], np.ndarray]:
+    """
+    Läser första arket.
+    Returnerar (namn per rad, kompetens-labels, värden N × L med NaN där cellen saknas/inte är ett tal).
+    Värdena är float32 – se widen_scores().
+    Kastar ExcelIngestError om filen inte går att läsa, om headern saknar
+    kompetenskolumner eller om filen saknar datarader.
+    """
+    name = getattr(excel_file, "name", "") or ""
+    reader = _PandasRows(excel_file) if name.lower().endswith(".xls") else _XlsxRows(excel_file)
+    rows = _guarded(iter(reader))
+
+    header = next(rows, None)
+    if header is None:
+        raise ExcelIngestError("Excel-filen verkar vara tom.")
+
+    # Header först: saknas kompetenskolumner avbryter vi innan någon datarad tolkas
+    plan = HeaderPlan(header)
+    wanted = [i for i in (plan.first_name, plan.last_name) if i is not None] + plan.columns
+    reader.keep = set(wanted)
+    width = max(wanted) + 1
+
+    names: List[str] = []
+    data: List[List[float]] = []
+    for row in rows:
+        if len(row) < width:
+            row = row + [None] * (width - len(row))
+        if all(row[i] is None for i in wanted):
+            continue  # tomma rader (t.ex. formaterade men tomma i slutet av arket)
+
+        first = row[plan.first_name] if plan.first_name is not None else ""
+        last = row[plan.last_name] if plan.last_name is not None else ""
+        names.append(full_name(first, last))
+        data.append([_to_float(row[i]) for i in plan.columns])
+
+    if not names:
+        raise ExcelIngestError("Excel-filen verkar vara tom.")
+
+    values = np.array(data, dtype=SCORE_DTYPE).reshape(len(names), len(plan.labels))
+    return names, plan.labels, values
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.benchmarks import compare, load_results, run_benchmarks, save_results, synthetic_workbook
+from reports.renderers import PDF_RENDERERS
+
+
+class Command(BaseCommand):
+    help = "Mäter inläsning, poängsättning, template och PDF på syntetiska Excel-filer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1,100,1000",
+            help="Antal kandidater per syntetisk fil, kommaseparerat (1–10000). Default: 1,100,1000.",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Varv per benchmark (median rapporteras).")
+        parser.add_argument(
+            "--backends",
+            default="native",
+            help="PDF-renderare att mäta, kommaseparerat (native, chromium). Tom sträng = ingen PDF.",
+        )
+        parser.add_argument("--output", help="Spara resultaten som JSON hit.")
+        parser.add_argument("--baseline", help="Tidigare JSON att jämföra mot.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Tillåten försämring mot baseline innan kommandot misslyckas (0.25 = 25 %%).",
+        )
+        parser.add_argument(
+            "--write-fixture",
+            metavar="PATH",
+            help="Skriv bara en syntetisk .xlsx (första storleken i --sizes) och avsluta.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--sizes ska vara heltal, t.ex. 1,100,1000.")
+        if not sizes or not all(1 <= n <= 10000 for n in sizes):
+            raise CommandError("--sizes måste ligga mellan 1 och 10000.")
+
+        if options["write_fixture"]:
+            with open(options["write_fixture"], "wb") as fh:
+                fh.write(synthetic_workbook(sizes[0]))
+            self.stdout.write(f"Skrev {sizes[0]} kandidater till {options['write_fixture']}.")
+            return
+
+        backends = [b.strip() for b in options["backends"].split(",") if b.strip()]
+        unknown = [b for b in backends if b not in PDF_RENDERERS]
+        if unknown:
+            # get_renderer() faller tillbaka på default-backenden – då skulle fel renderare mätas
+            raise CommandError(
+                f"Okänd PDF-renderare: {', '.join(unknown)}. Välj bland: {', '.join(sorted(PDF_RENDERERS))}."
+            )
+        results = run_benchmarks(sizes, repeat=options["repeat"], backends=backends, log=self.stdout.write)
+
+        if options["output"]:
+            save_results(results, options["output"])
+            self.stdout.write(f"Resultat sparade i {options['output']}.")
+
+        if options["baseline"]:
+            regressions = compare(results, load_results(options["baseline"]), options["threshold"])
+            if regressions:
+                for r in regressions:
+                    self.stderr.write(
+                        f"{r['name']}: {r['baseline_ms']:.2f} ms -> {r['current_ms']:.2f} ms ({r['ratio']:.2f}×)"
+                    )
+                raise CommandError(f"{len(regressions)} benchmark(s) långsammare än baseline + {options['threshold']:.0%}.")
+            self.stdout.write(self.style.SUCCESS("Inga regressioner mot baseline."))
@@ -0,0 +1,71 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.ingest import ExcelIngestError, read_candidates
+from reports.models import Report
+from reports.framework import Framework, FrameworkError, get_framework
+from reports.norms import NormTable, norm_table_path
+from reports.views import _competency_columns, _competency_matrix
+
+
+def _matrix_from_reports(framework: Framework) -> np.ndarray:
+    """Ramverkets sparade rapporter som en (N, C)-matris. Rader med samma kolumner slås upp tillsammans."""
+    by_labels: Dict[Tuple[str, ...], List[List[float]]] = {}
+    saved = Report.objects.filter(framework=framework.key).values_list("competency_values", flat=True)
+    for values in saved.iterator(chunk_size=2000):
+        by_labels.setdefault(tuple(values.keys()), []).append(list(values.values()))
+
+    blocks = [
+        _competency_matrix(framework.compiled, np.array(rows, dtype=float), _competency_columns(framework, labels))
+        for labels, rows in by_labels.items()
+    ]
+    return np.vstack(blocks) if blocks else np.empty((0, len(framework.compiled.competencies)))
+
+
+def _matrix_from_files(framework: Framework, paths: List[str]) -> np.ndarray:
+    blocks = []
+    for path in paths:
+        try:
+            with open(path, "rb") as fh:
+                _, labels, values = read_candidates(fh)
+        except (OSError, ExcelIngestError) as e:
+            raise CommandError(f"{path}: {e}")
+        blocks.append(_competency_matrix(framework.compiled, values, _competency_columns(framework, labels)))
+    return np.vstack(blocks) if blocks else np.empty((0, len(framework.compiled.competencies)))
+
+
+class Command(BaseCommand):
+    help = "Bygger normtabellen (percentiler) ur sparade rapporter eller Excel-filer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "files", nargs="*", help="Excel-filer som utgör normgruppen. Utan filer: ramverkets sparade rapporter."
+        )
+        parser.add_argument("--framework", help="Ramverkets nyckel (default: settings.REPORT_FRAMEWORK_DEFAULT).")
+        parser.add_argument(
+            "--output", help="Sökväg till .npz (default: <REPORT_NORM_DIR>/<ramverk>-<version>.npz)."
+        )
+        parser.add_argument("--min-size", type=int, default=30, help="Minsta normgrupp (default: 30).")
+
+    def handle(self, *args, **options):
+        try:
+            framework = get_framework(options["framework"])
+        except FrameworkError as e:
+            raise CommandError(str(e))
+
+        output = Path(options["output"]) if options["output"] else norm_table_path(framework)
+        if output is None:
+            raise CommandError("Ange --output eller sätt REPORT_NORM_DIR.")
+        X = _matrix_from_files(framework, options["files"]) if options["files"] else _matrix_from_reports(framework)
+        if X.shape[0] < options["min_size"]:
+            raise CommandError(f"Normgruppen har {X.shape[0]} personer, minst {options['min_size']} krävs.")
+
+        table = NormTable.build(framework.compiled, X)
+        table.save(output)
+        self.stdout.write(
+            f"Normtabell {table.version} ({table.size} personer, ramverk {framework.key} "
+            f"version {table.framework_version}) sparad i {output}."
+        )
@@ -0,0 +1,38 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reports.pdf_jobs import PdfWorker
+
+
+class Command(BaseCommand):
+    help = "Renderar PDF-jobb ur kön (PdfJob) med begränsad parallellism."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "REPORT_PDF_JOB_CONCURRENCY", 2),
+            help="Max antal samtidiga renderingar (default: settings.REPORT_PDF_JOB_CONCURRENCY).",
+        )
+        parser.add_argument("--poll-interval", type=float, default=0.5)
+        parser.add_argument("--once", action="store_true", help="Plocka det som finns i kön och avsluta.")
+        parser.add_argument("--force", action="store_true", help="Kör även om settings.REPORT_PDF_JOBS är av.")
+
+    def handle(self, *args, **options):
+        if not (getattr(settings, "REPORT_PDF_JOBS", False) or options["force"]):
+            self.stdout.write("REPORT_PDF_JOBS är av – ingen PDF-worker behövs.")
+            return
+
+        worker = PdfWorker(concurrency=options["concurrency"], poll_interval=options["poll_interval"])
+
+        def _stop(signum, frame):
+            self.stdout.write("Avslutar PDF-worker efter pågående jobb…")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        self.stdout.write(f"PDF-worker startad (concurrency={worker.concurrency}).")
+        worker.run(once=options["once"])
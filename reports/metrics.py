@@ -0,0 +1,395 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows – ingen sammanslagning av döda processers filer
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────
+# Metrics (Prometheus-textformat, delade mellan processer)
+# ─────────────────────────────────────────
+#
+# Varje process (gunicorn-workers, pdf_worker) håller sina räknare i minnet
+# och skriver dem till en egen JSON-fil i REPORT_METRICS_DIR. En uppdatering
+# rör bara minnet – filen skrivs av en bakgrundstråd högst en gång per
+# REPORT_METRICS_FLUSH_INTERVAL, vid scrape och när processen avslutas, så
+# async-vyerna aldrig väntar på disk. /metrics läser alla filer och summerar,
+# så att siffrorna gäller hela maskinen oavsett vilken worker som svarar. Filer från döda
+# processer slås ihop i archive.json (räknare och histogram lever vidare,
+# gauges försvinner med processen).
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000)
+ROWS_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# namn -> (typ, hjälptext, buckets)
+METRICS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    "reports_requests_total": (COUNTER, "Requests per vy och statuskod.", ()),
+    "reports_request_seconds": (HISTOGRAM, "Svarstid per vy.", SECONDS_BUCKETS),
+    "reports_uploads_total": (COUNTER, "Uppladdade filer per utfall (ok/error).", ()),
+    "reports_upload_bytes": (HISTOGRAM, "Storlek på uppladdade filer.", BYTES_BUCKETS),
+    "reports_upload_rows": (HISTOGRAM, "Kandidatrader per uppladdad fil.", ROWS_BUCKETS),
+    "reports_pdf_cache_total": (COUNTER, "PDF-uppslag per utfall (hit/miss/not_modified).", ()),
+    "reports_pdf_render_seconds": (HISTOGRAM, "PDF-renderingstid per backend.", SECONDS_BUCKETS),
+    "reports_pdf_renders_in_flight": (GAUGE, "Pågående PDF-renderingar per backend.", ()),
+    "reports_pdf_jobs": (GAUGE, "PdfJob-rader per status (läses ur databasen vid scrape).", ()),
+}
+
+DEFAULT_FLUSH_INTERVAL = 1.0  # sekunder mellan skrivningar av processens fil
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _enabled() -> bool:
+    return getattr(settings, "REPORT_METRICS", False)
+
+
+def _flush_interval() -> float:
+    return float(getattr(settings, "REPORT_METRICS_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+
+
+def _metrics_dir() -> Path:
+    directory = getattr(settings, "REPORT_METRICS_DIR", None) or os.path.join(
+        tempfile.gettempdir(), "b3-report-metrics"
+    )
+    return Path(directory)
+
+
+class ProcessMetrics:
+    """
+    Den här processens värden, i minnet. En bakgrundstråd skriver dem till
+    {pid}-{token}.json när något ändrats; add/observe rör aldrig disken.
+    """
+
+    def __init__(self, directory: Path, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.directory = directory
+        self.path = directory / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        self.values: Dict[str, Dict[Labels, Any]] = {}
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()        # values och _dirty
+        self._write_lock = threading.Lock()  # en skrivning i taget (tråden, scrape, exit)
+        self._dirty = False
+        self._flusher: Optional[threading.Thread] = None
+
+    def _series(self, name: str, labels: Labels, default: Callable[[], Any]) -> Any:
+        by_labels = self.values.setdefault(name, {})
+        if labels not in by_labels:
+            by_labels[labels] = default()
+        return by_labels[labels]
+
+    def add(self, name: str, amount: float, labels: Labels) -> None:
+        with self._lock:
+            series = self.values.setdefault(name, {})
+            series[labels] = series.get(labels, 0.0) + amount
+            self._changed()
+
+    def observe(self, name: str, value: float, labels: Labels) -> None:
+        buckets = METRICS[name][2]
+        with self._lock:
+            # [räknare per bucket (icke-kumulativt) ..., +Inf, summa, antal]
+            h = self._series(name, labels, lambda: [0] * (len(buckets) + 1) + [0.0, 0])
+            h[bisect_left(buckets, value)] += 1
+            h[-2] += value
+            h[-1] += 1
+            self._changed()
+
+    def _changed(self) -> None:
+        """Anropas med self._lock. Startar skrivtråden första gången något ändras."""
+        self._dirty = True
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """Skriver filen om något ändrats sedan förra skrivningen."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Ögonblicksbild – histogrammens listor kopieras, resten skrivs utan lås
+                values = {
+                    name: [[list(map(list, k)), list(v) if isinstance(v, list) else v] for k, v in series.items()]
+                    for name, series in self.values.items()
+                }
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    json.dump({"pid": os.getpid(), "values": values}, fh, separators=(",", ":"))
+                os.replace(tmp, self.path)
+            except OSError:
+                logger.warning("Kunde inte skriva metrics till %s.", self.directory, exc_info=True)
+                with self._lock:
+                    self._dirty = True  # försök igen nästa varv
+
+
+_process: Optional[ProcessMetrics] = None
+_process_lock = threading.Lock()
+
+
+def _get_process() -> ProcessMetrics:
+    global _process
+    with _process_lock:
+        # Ny pid efter fork (gunicorn --preload) = ny fil
+        if _process is None or not _process.path.name.startswith(f"{os.getpid()}-"):
+            _process = ProcessMetrics(_metrics_dir(), _flush_interval())
+        return _process
+
+
+def flush() -> None:
+    """Skriver den här processens värden direkt (scrape, processens slut)."""
+    process = _process
+    if process is not None and process.path.name.startswith(f"{os.getpid()}-"):
+        process.flush()
+
+
+atexit.register(flush)
+
+
+# ── Uppdatering ─────────────────────────
+
+def inc(name: str, amount: float = 1.0, **labels: Any) -> None:
+    if _enabled():
+        _get_process().add(name, amount, _labels(labels))
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    if _enabled():
+        _get_process().observe(name, float(value), _labels(labels))
+
+
+@contextmanager
+def in_flight(name: str, **labels: Any) -> Iterator[None]:
+    """Gauge +1 under blocket."""
+    if not _enabled():
+        yield
+        return
+    process, key = _get_process(), _labels(labels)
+    process.add(name, 1.0, key)
+    try:
+        yield
+    finally:
+        process.add(name, -1.0, key)
+
+
+@contextmanager
+def timed(name: str, **labels: Any) -> Iterator[None]:
+    """Observerar blockets tid i sekunder."""
+    if not _enabled():
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t0, **labels)
+
+
+def track_view(view_name: str):
+    """Dekorator: requests_total{view,status} + request_seconds{view}, för sync- och async-vyer."""
+
+    def _record(t0: float, status: int) -> None:
+        inc("reports_requests_total", view=view_name, status=status)
+        observe("reports_request_seconds", time.perf_counter() - t0, view=view_name)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if not _enabled():
+                    return await view(request, *args, **kwargs)
+                t0 = time.perf_counter()
+                status = 500
+                try:
+                    response = await view(request, *args, **kwargs)
+                    status = response.status_code
+                    return response
+                finally:
+                    _record(t0, status)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _enabled():
+                return view(request, *args, **kwargs)
+            t0 = time.perf_counter()
+            status = 500
+            try:
+                response = view(request, *args, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                _record(t0, status)
+
+        return wrapper
+
+    return decorator
+
+
+# ── Insamling ───────────────────────────
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(into: Dict[str, Dict[Labels, Any]], values: Dict[str, List], include_gauges: bool) -> None:
+    for name, series in values.items():
+        spec = METRICS.get(name)
+        if spec is None or (spec[0] == GAUGE and not include_gauges):
+            continue
+        target = into.setdefault(name, {})
+        for raw_labels, value in series:
+            key = tuple(tuple(pair) for pair in raw_labels)
+            if spec[0] == HISTOGRAM:
+                current = target.get(key)
+                target[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+            else:
+                target[key] = target.get(key, 0.0) + value
+
+
+def _serialize(values: Dict[str, Dict[Labels, Any]]) -> Dict[str, List]:
+    return {name: [[list(map(list, k)), v] for k, v in series.items()] for name, series in values.items()}
+
+
+def _read(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None  # borttagen eller halvskriven av någon annan – tas nästa gång
+
+
+def collect() -> Dict[str, Dict[Labels, Any]]:
+    """Summerar alla processers filer. Döda processers filer flyttas in i archive.json."""
+    flush()  # den scrapade processens egna värden är alltid aktuella
+    directory = _metrics_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    archive_path = directory / "archive.json"
+    totals: Dict[str, Dict[Labels, Any]] = {}
+
+    lock_fh = open(directory / ".lock", "w")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_fh, fcntl.LOCK_EX)
+
+        archive = (_read(archive_path) or {}).get("values", {})
+        archived: Dict[str, Dict[Labels, Any]] = {}
+        _merge(archived, archive, include_gauges=False)
+
+        dead: List[Path] = []
+        for path in directory.glob("*-*.json"):
+            data = _read(path)
+            if data is None:
+                continue
+            if _pid_alive(int(data.get("pid", 0))):
+                _merge(totals, data["values"], include_gauges=True)
+            elif fcntl is not None:
+                _merge(archived, data["values"], include_gauges=False)
+                dead.append(path)
+            else:
+                _merge(totals, data["values"], include_gauges=False)
+
+        if dead:
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump({"values": _serialize(archived)}, fh, separators=(",", ":"))
+            os.replace(tmp, archive_path)
+            for path in dead:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+    finally:
+        lock_fh.close()
+
+    _merge(totals, _serialize(archived), include_gauges=False)
+    return totals
+
+
+def _collect_jobs(totals: Dict[str, Dict[Labels, Any]]) -> None:
+    """Kön är databasen – läses direkt i stället för att räknas i processerna."""
+    from django.db import DatabaseError
+    from django.db.models import Count
+
+    from .models import PdfJob
+
+    try:
+        counts = dict(PdfJob.objects.values_list("status").annotate(n=Count("id")))
+    except DatabaseError:
+        logger.warning("Kunde inte läsa PdfJob-kön till /metrics.", exc_info=True)
+        return
+    totals["reports_pdf_jobs"] = {(("status", status),): float(counts.get(status, 0)) for status, _ in PdfJob.STATUS_CHOICES}
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_number(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def render_metrics() -> str:
+    """Alla metrics i Prometheus textformat (version 0.0.4)."""
+    totals = collect()
+    _collect_jobs(totals)
+
+    lines: List[str] = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(totals.get(name, {}).items()):
+            if kind != HISTOGRAM:
+                lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (float("inf"),), value[: len(buckets) + 1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_number(value[-1])}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,58 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.sessions.middleware import SessionMiddleware
+
+from .timing import StageTimer, stage_timer
+
+
+logger = logging.getLogger("reports.timing")
+
+
+def _finish(request, response, timer: StageTimer) -> None:
+    total_ms = timer.elapsed_ms()
+    response["Server-Timing"] = timer.header(total_ms)
+    # En rad per request, nyckel=värde så att den går att filtrera/aggregera i loggarna
+    logger.info(
+        "timing method=%s path=%s status=%s total_ms=%.1f %s",
+        request.method,
+        request.path,
+        response.status_code,
+        total_ms,
+        " ".join(f"{name}_ms={ms:.1f}" for name, ms in timer.stages),
+        extra={"timing": {"total": total_ms, **{name: ms for name, ms in timer.stages}}},
+    )
+
+
+class ServerTimingMiddleware:
+    """Ska ligga först i MIDDLEWARE så att 'total' täcker hela kedjan."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = request.stage_timer = StageTimer()
+        response = self.get_response(request)
+        _finish(request, response, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = request.stage_timer = StageTimer()
+        response = await self.get_response(request)
+        _finish(request, response, timer)
+        return response
+
+
+class TimedSessionMiddleware(SessionMiddleware):
+    """SessionMiddleware där sparandet av sessionen mäts som steget 'session'."""
+
+    def process_response(self, request, response):
+        with stage_timer(request).stage("session"):
+            return super().process_response(request, response)
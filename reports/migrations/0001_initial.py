@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:31
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'I kö'), ('running', 'Renderas'), ('done', 'Klar'), ('failed', 'Misslyckades')], db_index=True, default='queued', max_length=10)),
+                ('report_data', models.JSONField()),
+                ('show_mapping', models.BooleanField(default=True)),
+                ('backend', models.CharField(max_length=20)),
+                ('cache_key', models.CharField(max_length=64)),
+                ('session_key', models.CharField(db_index=True, max_length=40)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:40
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Report',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('full_name', models.CharField(max_length=200)),
+                ('competency_values', models.JSONField()),
+                ('framework_version', models.CharField(max_length=32)),
+                ('upload_id', models.CharField(db_index=True, max_length=32)),
+                ('row_index', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['full_name', 'created_at'], name='reports_rep_full_na_a4ef94_idx'), models.Index(fields=['created_at'], name='reports_rep_created_a6aabf_idx')],
+                'constraints': [models.UniqueConstraint(fields=('upload_id', 'row_index'), name='report_unique_upload_row')],
+            },
+        ),
+    ]
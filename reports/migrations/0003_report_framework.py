@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='framework',
+            field=models.CharField(default='b3', max_length=64),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_report_framework'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='report',
+            name='report_unique_upload_row',
+        ),
+        migrations.AddConstraint(
+            model_name='report',
+            constraint=models.UniqueConstraint(fields=('upload_id', 'framework', 'framework_version', 'row_index'), name='report_unique_upload_framework_row'),
+        ),
+    ]
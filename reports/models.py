@@ -1,3 +1,82 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+class PdfJob(models.Model):
+    """En PDF-rendering i kö. Plockas upp av `manage.py pdf_worker`."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "I kö"),
+        (RUNNING, "Renderas"),
+        (DONE, "Klar"),
+        (FAILED, "Misslyckades"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+
+    # Allt workern behöver – den har ingen tillgång till användarens session
+    report_data = models.JSONField()
+    show_mapping = models.BooleanField(default=True)
+    backend = models.CharField(max_length=20)
+    cache_key = models.CharField(max_length=64)
+
+    # Bara sessionen som skapade jobbet får se och ladda ner det
+    session_key = models.CharField(max_length=40, db_index=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)  # +1 varje gång en worker tar jobbet
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # workern lever och renderar fortfarande
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self) -> str:
+        return f"PdfJob {self.id} ({self.status})"
+
+
+class Report(models.Model):
+    """
+    En kandidats resultat, sparat permanent: namn + kompetensvektorn från Excel-filen.
+    Själva rapporten (underbeteenden, kluster, texter) byggs om ur vektorn vid behov.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    full_name = models.CharField(max_length=200)
+
+    # {label: poäng} i Excel-ordning, hela headern (null där cellen var tom)
+    competency_values = models.JSONField()
+    framework = models.CharField(max_length=64)  # ramverkets nyckel (reports/frameworks/<nyckel>.yaml)
+    framework_version = models.CharField(max_length=32)
+
+    # Filen kandidaten kom från (rapportlagrets id) och raden i den. En rad
+    # skrivs aldrig om: samma fil med ett annat ramverk blir nya rader.
+    upload_id = models.CharField(max_length=32, db_index=True)
+    row_index = models.PositiveIntegerField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["full_name", "created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["upload_id", "framework", "framework_version", "row_index"],
+                name="report_unique_upload_framework_row",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Report {self.id} ({self.full_name})"
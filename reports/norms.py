@@ -0,0 +1,255 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .framework import Framework
+from .scoring import CompiledFramework, score_matrix
+
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────
+# Normtabeller och percentiler
+# ─────────────────────────────────────────
+#
+# `manage.py build_norms` poängsätter en normgrupp (historiska rapporter
+# eller Excel-filer) och sparar varje kompetens- och klusterkolumn som
+# sorterade unika värden + antal (.npz). Poäng har få unika värden, så
+# tabellen är liten även för mycket stora grupper.
+#
+# Alla kolumner ligger i EN sorterad nyckelarray (värde + kolumn × NORM_STRIDE),
+# så en kandidat – eller en hel batch – slås upp med en searchsorted för
+# alla kolumner på en gång: O(log n) per värde, oberoende av gruppens storlek.
+# Varje ramverk har sina egna tabeller i settings.REPORT_NORM_DIR, en fil per
+# ramverk och poängversion: <nyckel>-<version>.npz. Versionen är den
+# kompilerade poängsättningens hash (CompiledFramework.version), så ändrade
+# texter behåller normerna medan ändrade kompetenser eller vikter kräver en
+# ny tabell – tills den byggts saknar rapporterna percentiler.
+
+NORM_FORMAT = 2  # höj om filformatet ändras (2: värdena avrundas till NORM_DECIMALS)
+
+# Poäng (1–5) och klusterprocent (0–100) ryms gott inom ett kolumnintervall.
+# Värden utanför klipps – de ligger ändå under/över hela normgruppen.
+NORM_STRIDE = 1024.0
+NORM_VALUE_RANGE = (-1.0, 1000.0)
+
+# Värden avrundas före packningen, i tabellen och i uppslaget. Då räknas
+# 47.0 och 47.00000000000001 (flyttalsbrus) som lika, och två olika värden
+# kan aldrig bli samma nyckel när kolumnens offset läggs på.
+NORM_DECIMALS = 9
+
+
+class _PackedNorms:
+    """Sorterade unika normvärden för D kolumner i en array, med antal per värde."""
+
+    __slots__ = ("keys", "below", "equal", "offsets", "sizes")
+
+    def __init__(self, keys, below, equal, offsets, sizes):
+        self.keys = keys        # (U,) värde + kolumn × NORM_STRIDE, stigande
+        self.below = below      # (U,) antal i kolumnen med lägre värde
+        self.equal = equal      # (U,) antal med exakt detta värde
+        self.offsets = offsets  # (D + 1,) kolumn j = keys[offsets[j]:offsets[j + 1]]
+        self.sizes = sizes      # (D,) antal värden (personer) per kolumn
+
+    @classmethod
+    def from_matrix(cls, M: np.ndarray) -> "_PackedNorms":
+        M = np.atleast_2d(np.asarray(M, dtype=float))
+        keys, below, equal, offsets, sizes = [], [], [], [0], []
+        for j in range(M.shape[1]):
+            column = np.round(M[:, j], NORM_DECIMALS)
+            uniq, counts = np.unique(column[~np.isnan(column)], return_counts=True)
+            keys.append(np.clip(uniq, *NORM_VALUE_RANGE) + j * NORM_STRIDE)
+            below.append(np.cumsum(counts) - counts)
+            equal.append(counts)
+            offsets.append(offsets[-1] + len(uniq))
+            sizes.append(int(counts.sum()))
+        return cls(
+            np.concatenate(keys) if keys else np.empty(0),
+            np.concatenate(below).astype(np.int64) if below else np.empty(0, dtype=np.int64),
+            np.concatenate(equal).astype(np.int64) if equal else np.empty(0, dtype=np.int64),
+            np.asarray(offsets, dtype=np.int64),
+            np.asarray(sizes, dtype=np.int64),
+        )
+
+    def ranks(self, M: np.ndarray) -> np.ndarray:
+        """
+        Percentil 0–100 per cell i (N, D) (mittrang: andel under + halva andelen
+        lika). NaN, eller en kolumn utan normvärden, ger NaN.
+        """
+        M = np.round(np.atleast_2d(np.asarray(M, dtype=float)), NORM_DECIMALS)
+        d = M.shape[1]
+        wanted = np.clip(M, *NORM_VALUE_RANGE) + np.arange(d) * NORM_STRIDE
+        i = np.searchsorted(self.keys, np.where(np.isnan(M), 0.0, wanted), side="left")
+
+        end = self.offsets[1:d + 1]
+        inside = i < end                               # annars: högre än hela kolumnen
+        j = np.minimum(i, max(len(self.keys) - 1, 0))
+        below = np.where(inside, self.below[j] if len(self.keys) else 0, self.sizes)
+        equal = np.where(inside & (self.keys[j] == wanted if len(self.keys) else False), self.equal[j], 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ranks = (below + 0.5 * equal) * 100.0 / self.sizes
+        return np.where(np.isnan(M) | (self.sizes == 0), np.nan, ranks)
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}_{name}": getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_arrays(cls, data, prefix: str) -> "_PackedNorms":
+        return cls(*(np.asarray(data[f"{prefix}_{name}"]) for name in cls.__slots__))
+
+
+class NormTable:
+    """Normgruppens fördelning per kompetens (1–5) och kluster (0..100 av max)."""
+
+    __slots__ = (
+        "version",            # hash av innehållet – ingår i report_data och därmed i PDF-cachenyckeln
+        "framework_version",
+        "built_at",
+        "size",               # antal personer i normgruppen
+        "competencies",       # kompetensnamn, samma ordning som fw.competencies
+        "clusters",           # klusternamn, samma ordning som fw.cluster_order
+        "_competency_norms",
+        "_cluster_norms",
+    )
+
+    def __init__(self, framework_version, built_at, size, competencies, clusters, competency_norms, cluster_norms):
+        self.framework_version = framework_version
+        self.built_at = built_at
+        self.size = int(size)
+        self.competencies = tuple(competencies)
+        self.clusters = tuple(clusters)
+        self._competency_norms: _PackedNorms = competency_norms
+        self._cluster_norms: _PackedNorms = cluster_norms
+
+        digest = hashlib.sha256(f"{NORM_FORMAT}:{framework_version}".encode())
+        for norms in (competency_norms, cluster_norms):
+            for name in _PackedNorms.__slots__:
+                digest.update(np.ascontiguousarray(getattr(norms, name)).tobytes())
+                digest.update(b"|")
+        self.version = digest.hexdigest()[:12]
+
+    # ── Uppslag ─────────────────────────
+
+    def competency_percentiles(self, X: np.ndarray) -> np.ndarray:
+        """(N, C) i fw.competencies-ordning -> percentiler (N, C)."""
+        return self._competency_norms.ranks(X)
+
+    def cluster_percentiles(self, cluster_pct: np.ndarray) -> np.ndarray:
+        """(N, K) klusterprocent (ScoreResult.cluster_pct) -> percentiler (N, K)."""
+        return self._cluster_norms.ranks(cluster_pct)
+
+    def matches(self, fw: CompiledFramework) -> bool:
+        return self.framework_version == fw.version
+
+    # ── Bygg, spara, läs ────────────────
+
+    @classmethod
+    def build(cls, fw: CompiledFramework, X: np.ndarray) -> "NormTable":
+        """Normgrupp X: (N, C) kompetenspoäng i fw.competencies-ordning, NaN där värde saknas."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        return cls(
+            framework_version=fw.version,
+            built_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            size=X.shape[0],
+            competencies=fw.competencies,
+            clusters=fw.cluster_order,
+            competency_norms=_PackedNorms.from_matrix(X),
+            cluster_norms=_PackedNorms.from_matrix(score_matrix(fw, X).cluster_pct),
+        )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez_compressed(
+                fh,
+                format=np.array(NORM_FORMAT),
+                framework_version=np.array(self.framework_version),
+                built_at=np.array(self.built_at),
+                size=np.array(self.size),
+                competencies=np.array(self.competencies),
+                clusters=np.array(self.clusters),
+                **self._competency_norms.arrays("competency"),
+                **self._cluster_norms.arrays("cluster"),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "NormTable":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format"]) != NORM_FORMAT:
+                raise ValueError(f"Normtabellen har format {int(data['format'])}, väntade {NORM_FORMAT}.")
+            return cls(
+                framework_version=str(data["framework_version"]),
+                built_at=str(data["built_at"]),
+                size=int(data["size"]),
+                competencies=[str(c) for c in data["competencies"]],
+                clusters=[str(c) for c in data["clusters"]],
+                competency_norms=_PackedNorms.from_arrays(data, "competency"),
+                cluster_norms=_PackedNorms.from_arrays(data, "cluster"),
+            )
+
+
+# ── Processens tabeller ─────────────────
+
+NORM_TABLE_CACHE_SIZE = 16  # inlästa tabeller per process (ramverk × version)
+
+# sökväg -> (mtime_ns, tabell eller None om filen inte gick att läsa), senast använda sist
+_tables: "OrderedDict[Path, Tuple[int, Optional[NormTable]]]" = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def norm_dir() -> Optional[Path]:
+    directory = getattr(settings, "REPORT_NORM_DIR", "")
+    return Path(directory) if directory else None
+
+
+def norm_table_path(framework: Framework) -> Optional[Path]:
+    """<REPORT_NORM_DIR>/<nyckel>-<poängversion>.npz, None om normer är avstängda."""
+    directory = norm_dir()
+    if directory is None:
+        return None
+    return directory / f"{framework.key}-{framework.compiled.version}.npz"
+
+
+def get_norm_table(framework: Framework) -> Optional[NormTable]:
+    """
+    Ramverkets normtabell, eller None (avstängt, ingen tabell för ramverkets
+    nuvarande version, eller oläslig). Läses om när filen byts ut.
+    """
+    path = norm_table_path(framework)
+    if path is None:
+        return None
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    with _tables_lock:
+        entry = _tables.get(path)
+        if entry is None or entry[0] != mtime:
+            try:
+                table: Optional[NormTable] = NormTable.load(path)
+            except (OSError, ValueError, KeyError):
+                logger.warning("Kunde inte läsa normtabellen %s.", path, exc_info=True)
+                table = None
+            entry = _tables[path] = (mtime, table)
+        _tables.move_to_end(path)
+        while len(_tables) > NORM_TABLE_CACHE_SIZE:
+            _tables.popitem(last=False)
+        table = entry[1]
+
+    if table is not None and not table.matches(framework.compiled):
+        return None
+    return table
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────
+# PDF-cache (innehållsadresserad, på disk)
+# ─────────────────────────────────────────
+#
+# Nyckeln är en hash av normaliserad report_data + mapping-flagga + backend +
+# en version av templates/CSS/layoutkod. Samma rapport ger alltid samma nyckel,
+# så den fungerar också som ETag. Filerna delas av alla workers på maskinen;
+# mtime används som LRU-ordning och bumpas vid varje träff.
+
+# Filer vars innehåll påverkar PDF:en. Ändras någon blir alla gamla nycklar ogiltiga.
+_APP_DIR = Path(__file__).resolve().parent
+_VERSION_GLOBS = (
+    "templates/reports/*.html",
+    "static/reports/css/*.css",
+    "charts.py",
+    "pdf_native.py",
+    "renderers.py",
+    "view_model.py",
+)
+
+
+@lru_cache(maxsize=1)
+def _template_version() -> str:
+    h = hashlib.sha256()
+    for pattern in _VERSION_GLOBS:
+        for path in sorted(_APP_DIR.glob(pattern)):
+            h.update(path.name.encode())
+            h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def template_version() -> str:
+    """Hash av allt som formar PDF:en (+ settings.REPORT_PDF_CACHE_VERSION). Räknas om i DEBUG."""
+    if settings.DEBUG:
+        _template_version.cache_clear()
+    return f"{getattr(settings, 'REPORT_PDF_CACHE_VERSION', '1')}:{_template_version()}"
+
+
+def pdf_cache_key(report_data: Dict[str, Any], show_mapping: bool, backend: str) -> str:
+    """Stabil nyckel för en renderad PDF. Oberoende av dict-ordning i report_data."""
+    payload = json.dumps(
+        {
+            "report": report_data,
+            "mapping": bool(show_mapping),
+            "backend": backend,
+            "version": template_version(),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max(0, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # LRU: senast använd = nyast mtime
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+
+        # Skriv till temp-fil + os.replace så att andra workers aldrig läser en halv PDF.
+        # Full disk o.dyl. ska inte stoppa nedladdningen – då blir det bara ingen cache.
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        except OSError:
+            logger.warning("Kunde inte skriva till PDF-cachen i %s.", self.directory, exc_info=True)
+            return
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("Kunde inte skriva till PDF-cachen i %s.", self.directory, exc_info=True)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Tar bort äldst använda filer tills cachen ryms i max_bytes."""
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*.pdf"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue  # borttagen av en annan worker
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": (hits / lookups) if lookups else None,
+        }
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*/*.pdf"):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_cache: Optional[PdfCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_cache() -> Optional[PdfCache]:
+    """Processens PDF-cache, eller None om den är avstängd (REPORT_PDF_CACHE_MAX_BYTES = 0)."""
+    global _cache
+    max_bytes = getattr(settings, "REPORT_PDF_CACHE_MAX_BYTES", 200 * 1024 * 1024)
+    if not max_bytes:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            directory = getattr(settings, "REPORT_PDF_CACHE_DIR", None) or os.path.join(
+                tempfile.gettempdir(), "b3-report-pdf-cache"
+            )
+            _cache = PdfCache(Path(directory), max_bytes)
+        return _cache
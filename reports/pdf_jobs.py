@@ -0,0 +1,264 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import PdfJob
+from .pdf_cache import get_pdf_cache, pdf_cache_key
+from .renderers import get_renderer
+
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────
+# PDF-jobbkö (databas + lokal worker-process)
+# ─────────────────────────────────────────
+#
+# Webbprocessen lägger bara in ett PdfJob och svarar direkt. `manage.py
+# pdf_worker` plockar jobb ur tabellen, renderar med högst N samtidigt och
+# skriver resultatet till disk. Ingen extern tjänst behövs – SQLite räcker,
+# och flera worker-processer kan köra mot samma tabell.
+#
+# Varje claim räknar upp attempts. Workern förnyar heartbeat_at för sina
+# pågående jobb; ett jobb vars heartbeat har slutat (workern kraschade eller
+# dödades) läggs tillbaka i kön, tills det tagits MAX_ATTEMPTS gånger – då
+# markeras det som misslyckat i stället för att fälla nästa worker också.
+# En långsam rendering i en levande worker har färsk heartbeat och rörs inte.
+
+HEARTBEAT_INTERVAL = 10   # sekunder (settings.REPORT_PDF_JOB_HEARTBEAT)
+STALE_AFTER = 60          # sekunder utan heartbeat (settings.REPORT_PDF_JOB_STALE_AFTER)
+MAX_ATTEMPTS = 3          # settings.REPORT_PDF_JOB_MAX_ATTEMPTS
+
+
+def _job_dir() -> Path:
+    directory = getattr(settings, "REPORT_PDF_JOB_DIR", None) or os.path.join(
+        tempfile.gettempdir(), "b3-report-pdf-jobs"
+    )
+    return Path(directory)
+
+
+def job_result_path(job: PdfJob) -> Path:
+    return _job_dir() / f"{job.id}.pdf"
+
+
+def enqueue_pdf_job(report_data: Dict[str, Any], show_mapping: bool, backend: Optional[str], session_key: str) -> PdfJob:
+    """Skapar ett jobb. Finns PDF:en redan i cachen blir jobbet klart direkt."""
+    renderer = get_renderer(backend)
+    key = pdf_cache_key(report_data, show_mapping, renderer.name)
+    job = PdfJob(
+        report_data=report_data,
+        show_mapping=show_mapping,
+        backend=renderer.name,
+        cache_key=key,
+        session_key=session_key,
+    )
+
+    cache = get_pdf_cache()
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        _write_result(job, cached)
+        job.status = PdfJob.DONE
+        job.finished_at = timezone.now()
+
+    job.save()
+    return job
+
+
+def read_job_result(job: PdfJob) -> Optional[bytes]:
+    try:
+        return job_result_path(job).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _write_result(job: PdfJob, pdf_bytes: bytes) -> None:
+    path = job_result_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(pdf_bytes)
+    os.replace(tmp, path)
+
+
+def _claim_next() -> Optional[PdfJob]:
+    """Tar äldsta köade jobbet. UPDATE ... WHERE status=queued gör det säkert mellan processer."""
+    for job_id in PdfJob.objects.filter(status=PdfJob.QUEUED).values_list("id", flat=True)[:5]:
+        now = timezone.now()
+        claimed = PdfJob.objects.filter(id=job_id, status=PdfJob.QUEUED).update(
+            status=PdfJob.RUNNING,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            return PdfJob.objects.get(id=job_id)
+    return None
+
+
+def _finish(job: PdfJob, **fields: Any) -> None:
+    # Bara den här claimen: har jobbet lagts tillbaka och tagits igen skriver inte den gamla över
+    PdfJob.objects.filter(id=job.id, status=PdfJob.RUNNING, attempts=job.attempts).update(
+        finished_at=timezone.now(), **fields
+    )
+
+
+def process_job(job: PdfJob) -> None:
+    """Renderar ett (redan claimat) jobb och sparar resultat eller fel."""
+    try:
+        cache = get_pdf_cache()
+        pdf_bytes = cache.get(job.cache_key) if cache is not None else None
+        metrics.inc("reports_pdf_cache_total", result="hit" if pdf_bytes is not None else "miss")
+        if pdf_bytes is None:
+            renderer = get_renderer(job.backend)
+            with metrics.in_flight("reports_pdf_renders_in_flight", backend=renderer.name), \
+                    metrics.timed("reports_pdf_render_seconds", backend=renderer.name):
+                if cache is None:
+                    pdf_bytes = renderer.render(job.report_data, show_mapping=job.show_mapping)
+                else:
+                    # Båda varianterna ur en rendering, så att den andra redan ligger i cachen
+                    variants = renderer.render_both(job.report_data)
+                    pdf_bytes = variants[job.show_mapping]
+            if cache is not None:
+                for variant, variant_bytes in variants.items():
+                    variant_key = (
+                        job.cache_key
+                        if variant == job.show_mapping
+                        else pdf_cache_key(job.report_data, variant, renderer.name)
+                    )
+                    cache.put(variant_key, variant_bytes)
+        _write_result(job, pdf_bytes)
+    except Exception as e:
+        logger.exception("PDF-jobb %s misslyckades.", job.id)
+        _finish(job, status=PdfJob.FAILED, error=str(e)[:2000])
+        return
+
+    _finish(job, status=PdfJob.DONE)
+
+
+def heartbeat(job_ids: Set[Any]) -> int:
+    """Markerar att jobben fortfarande renderas av en levande worker."""
+    if not job_ids:
+        return 0
+    return PdfJob.objects.filter(id__in=job_ids, status=PdfJob.RUNNING).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale_jobs(stale_after: timedelta, max_attempts: int = MAX_ATTEMPTS) -> Tuple[int, int]:
+    """
+    Jobb i 'running' utan heartbeat på stale_after (workern dog) läggs tillbaka
+    i kön. Jobb som redan tagits max_attempts gånger markeras som misslyckade.
+    Returnerar (tillbaka i kön, misslyckade).
+    """
+    cutoff = timezone.now() - stale_after
+    stale = PdfJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),  # null: claimat före heartbeat
+        status=PdfJob.RUNNING,
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=PdfJob.FAILED,
+        error=f"Renderingen avbröts {max_attempts} gånger (workern stannade).",
+        finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=PdfJob.QUEUED, started_at=None, heartbeat_at=None
+    )
+    return requeued, failed
+
+
+def purge_old_jobs(older_than: timedelta) -> int:
+    """Tar bort färdiga/misslyckade jobb och deras filer."""
+    old = PdfJob.objects.filter(
+        status__in=[PdfJob.DONE, PdfJob.FAILED],
+        created_at__lt=timezone.now() - older_than,
+    )
+    for job in old.only("id"):
+        try:
+            job_result_path(job).unlink()
+        except FileNotFoundError:
+            pass
+    deleted, _ = old.delete()
+    return deleted
+
+
+class PdfWorker:
+    """Kör jobb ur kön med högst `concurrency` renderingar samtidigt."""
+
+    def __init__(self, concurrency: int = 2, poll_interval: float = 0.5):
+        self.concurrency = max(1, int(concurrency))
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._running: Set[Any] = set()
+        self._lock = threading.Lock()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run_one(self, job: PdfJob) -> None:
+        try:
+            process_job(job)
+        finally:
+            connection.close()  # trådens egen DB-anslutning
+            with self._lock:
+                self._running.discard(job.id)
+
+    def _heartbeat(self) -> None:
+        with self._lock:
+            running = set(self._running)
+        heartbeat(running)
+
+    def _housekeeping(self) -> None:
+        requeued, failed = requeue_stale_jobs(
+            timedelta(seconds=getattr(settings, "REPORT_PDF_JOB_STALE_AFTER", STALE_AFTER)),
+            max(1, int(getattr(settings, "REPORT_PDF_JOB_MAX_ATTEMPTS", MAX_ATTEMPTS))),
+        )
+        if requeued:
+            logger.warning("Lade tillbaka %s PDF-jobb utan heartbeat i kön.", requeued)
+        if failed:
+            logger.error("%s PDF-jobb avbröts för många gånger och markerades som misslyckade.", failed)
+        purge_old_jobs(timedelta(seconds=getattr(settings, "REPORT_PDF_JOB_TTL", 24 * 3600)))
+
+    def run(self, once: bool = False) -> None:
+        last_housekeeping = 0.0
+        last_heartbeat = time.monotonic()
+        heartbeat_interval = getattr(settings, "REPORT_PDF_JOB_HEARTBEAT", HEARTBEAT_INTERVAL)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="pdf-job") as pool:
+            while not self._stop.is_set():
+                close_old_connections()
+
+                if time.monotonic() - last_heartbeat > heartbeat_interval:
+                    self._heartbeat()
+                    last_heartbeat = time.monotonic()
+
+                if time.monotonic() - last_housekeeping > 60:
+                    self._housekeeping()
+                    last_housekeeping = time.monotonic()
+
+                claimed = False
+                with self._lock:
+                    free = self.concurrency - len(self._running)
+                for _ in range(free):
+                    job = _claim_next()
+                    if job is None:
+                        break
+                    with self._lock:
+                        self._running.add(job.id)
+                    pool.submit(self._run_one, job)
+                    claimed = True
+
+                if not claimed:
+                    with self._lock:
+                        idle = not self._running
+                    if once and idle:
+                        break  # kön är tom och inget pågår
+                    self._stop.wait(self.poll_interval)
@@ -0,0 +1,746 @@
+import copy
+import io
+import os
+from functools import lru_cache
+from html import escape
+from typing import Any, Dict, List, Optional, Tuple
+
+from reportlab import rl_config
+from reportlab.graphics.shapes import Circle, Drawing, Group, Line, Path, PolyLine, Polygon, Rect, String
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import (
+    BaseDocTemplate,
+    Flowable,
+    Frame,
+    KeepTogether,
+    PageBreak,
+    PageTemplate,
+    Paragraph,
+    Spacer,
+    Table,
+    TableStyle,
+)
+
+from . import charts
+
+
+# ─────────────────────────────────────────
+# Inbyggd PDF-layout (reportlab, ingen browser)
+# ─────────────────────────────────────────
+#
+# Samma sektioner som _report_content.html: inledning, översikt (radar +
+# insikter), resultat per kluster, visuell mappning och avslutning.
+# Texterna speglar templaten – ändras den ena bör den andra följa med.
+
+FONT_DIR = os.path.join(os.path.dirname(__file__), "static", "reports", "fonts")
+ZEBRA_IMAGE = os.path.join(os.path.dirname(__file__), "static", "reports", "img", "zebra-top-140x32-transparent.png")
+
+PAGE_BG = colors.HexColor("#efe9e4")
+INK = colors.HexColor("#111111")
+MUTED = colors.Color(0, 0, 0, alpha=0.65)
+BRAND = colors.HexColor(charts.BRAND_COLOR)
+CARD_BG = colors.Color(1, 1, 1, alpha=0.35)
+CARD_LINE = colors.Color(0, 0, 0, alpha=0.08)
+DOT_OFF = colors.HexColor("#C1D5D1")
+
+# ASCII85 gör strömmarna 25 % större och kodas i ren Python; binära zlib-strömmar räcker
+rl_config.useA85 = 0
+
+_fonts_registered = False
+
+
+def _register_fonts() -> None:
+    global _fonts_registered
+    if _fonts_registered:
+        return
+    for name, filename in (
+        ("WorkSans", "WorkSans-Regular.ttf"),
+        ("WorkSans-SemiBold", "WorkSans-SemiBold.ttf"),
+        ("WorkSans-Bold", "WorkSans-Bold.ttf"),
+        ("B3Label", "B3Label.ttf"),
+    ):
+        pdfmetrics.registerFont(TTFont(name, os.path.join(FONT_DIR, filename)))
+    pdfmetrics.registerFontFamily("WorkSans", normal="WorkSans", bold="WorkSans-Bold")
+    _fonts_registered = True
+
+
+@lru_cache(maxsize=None)
+def _styles() -> Dict[str, ParagraphStyle]:
+    base = ParagraphStyle("body", fontName="WorkSans", fontSize=9.5, leading=14.5, textColor=INK, spaceAfter=6)
+    return {
+        "body": base,
+        "lead": ParagraphStyle("lead", parent=base, fontSize=11, leading=16),
+        "label": ParagraphStyle("label", parent=base, fontName="B3Label", fontSize=10, textColor=BRAND, spaceAfter=8),
+        "title": ParagraphStyle("title", parent=base, fontName="WorkSans-Bold", fontSize=22, leading=27, spaceAfter=12),
+        "title_xl": ParagraphStyle(
+            "title_xl", parent=base, fontName="WorkSans-Bold", fontSize=24, leading=29, alignment=TA_CENTER, spaceAfter=8
+        ),
+        "subtitle": ParagraphStyle("subtitle", parent=base, alignment=TA_CENTER, spaceAfter=14),
+        "section": ParagraphStyle("section", parent=base, fontName="WorkSans-Bold", fontSize=13, leading=17, spaceBefore=8),
+        "card_title": ParagraphStyle("card_title", parent=base, fontName="WorkSans-Bold", fontSize=13, leading=16),
+        "small": ParagraphStyle("small", parent=base, fontSize=8.5, leading=12, spaceAfter=2),
+        "small_bold": ParagraphStyle("small_bold", parent=base, fontName="WorkSans-SemiBold", fontSize=8.5, leading=12, spaceAfter=2),
+        "row": ParagraphStyle("row", parent=base, fontSize=9, leading=12, spaceAfter=0),
+        "pill": ParagraphStyle("pill", parent=base, fontSize=8.5, leading=11, spaceAfter=0),
+    }
+
+
+class _Paragraph(Paragraph):
+    """Paragraph som minns radbrytningen per bredd – samma stycke mäts flera gånger av Table/KeepTogether."""
+
+    # Allt som Paragraph.wrap()/breakLines() skriver på instansen
+    _WRAP_STATE = ("width", "height", "_wrapWidths", "blPara", "frags", "_width_max", "_splitLongWordCount", "_hyphenations")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wraps: Dict[float, Dict[str, Any]] = {}
+
+    def wrap(self, availWidth, availHeight):
+        state = self._wraps.get(availWidth)
+        if state is not None:
+            self.__dict__.update(state)
+            return self.width, self.height
+        width, height = super().wrap(availWidth, availHeight)
+        if width:
+            self._wraps[availWidth] = {k: self.__dict__[k] for k in self._WRAP_STATE if k in self.__dict__}
+        return width, height
+
+
+@lru_cache(maxsize=4096)
+def _parsed_paragraph(markup: str, style: ParagraphStyle) -> _Paragraph:
+    return _Paragraph(markup, style)
+
+
+def _para(markup: str, style: ParagraphStyle) -> Paragraph:
+    """
+    Paragraph ur cache: ramverkets texter (kompetenser, beskrivningar, rubriker) är desamma i
+    varje rapport, så markup-parsning och radbrytning görs en gång per process. Varje anrop får
+    en egen grund kopia eftersom platypus sätter attribut (canv m.fl.) på flowablen när den ritas.
+    """
+    return copy.copy(_parsed_paragraph(markup, style))
+
+
+def _p(text: str, style: ParagraphStyle) -> Paragraph:
+    return _para(escape(text or ""), style)
+
+
+def _organization(report_data: Dict[str, Any]) -> Dict[str, str]:
+    """Organisationens namn och genitiv ur ramverket, escapade för Paragraph-markup."""
+    framework = report_data.get("framework") or {}
+    return {
+        "name": escape(framework.get("organization", "")),
+        "genitive": escape(framework.get("organization_genitive", "")),
+    }
+
+
+def _paragraphs(text: str, style: ParagraphStyle) -> List[Paragraph]:
+    """Motsvarar |linebreaks: tomrad = nytt stycke, enkel radbrytning = <br/>."""
+    out: List[Paragraph] = []
+    for block in (text or "").split("\n\n"):
+        block = block.strip()
+        if block:
+            out.append(_para("<br/>".join(escape(line) for line in block.split("\n")), style))
+    return out
+
+
+# ── Små grafiska element ────────────────
+
+class ScaleDots(Flowable):
+    """Fem pluppar (1–5) med halvsteg, som .b3-scale i templaten."""
+
+    def __init__(self, half_steps: Optional[int], accent, size: float = 9, gap: float = 5):
+        super().__init__()
+        self.half_steps = half_steps
+        self.accent = accent
+        self.size = size
+        self.gap = gap
+        self.width = 5 * size + 4 * gap
+        self.height = size
+
+    def draw(self) -> None:
+        # Pluppraden är samma geometri i hela rapporten; färgerna sätts utanför så att
+        # en form-XObject per (halvsteg, storlek) räcker per dokument
+        c = self.canv
+        c.setStrokeColor(DOT_OFF)
+        c.setFillColor(self.accent)
+        c.setLineWidth(1.2)
+        name = f"ScaleDots_{self.half_steps}_{self.size:g}_{self.gap:g}"
+        if not c.hasForm(name):
+            c.beginForm(name, -1, -1, self.width + 1, self.height + 1)
+            self._draw_dots(c)
+            c.endForm()
+        c.doForm(name)
+
+    def _draw_dots(self, c) -> None:
+        r = self.size / 2
+        for i in range(5):
+            step = (i + 1) * 2
+            x = r + i * (self.size + self.gap)
+            if self.half_steps is not None and self.half_steps >= step:
+                c.circle(x, r, r, stroke=1, fill=1)
+            elif self.half_steps is not None and self.half_steps == step - 1:
+                c.circle(x, r, r, stroke=1, fill=0)
+                c.wedge(x - r, 0, x + r, self.size, 90, 180, stroke=0, fill=1)
+            else:
+                c.circle(x, r, r, stroke=1, fill=0)
+
+
+class PageMarker(Flowable):
+    """Osynlig markör: skriver in sidnumret (0-baserat) där den hamnar i marks[name]."""
+
+    def __init__(self, name: str, marks: Dict[str, int]):
+        super().__init__()
+        self.name = name
+        self.marks = marks
+        self.width = self.height = 0
+
+    def draw(self) -> None:
+        self.marks[self.name] = self.canv.getPageNumber() - 1
+
+
+class Donut(Flowable):
+    """Totalprocent för ett kluster (.donut)."""
+
+    def __init__(self, pct: Optional[float], text: str, accent, size: float = 64):
+        super().__init__()
+        self.pct = pct
+        self.text = text
+        self.accent = accent
+        self.width = self.height = size
+
+    def draw(self) -> None:
+        c = self.canv
+        s = self.width
+        ring = 7
+        c.setLineWidth(ring)
+        c.setStrokeColor(colors.Color(0, 0, 0, alpha=0.10))
+        c.circle(s / 2, s / 2, s / 2 - ring / 2, stroke=1, fill=0)
+        if self.pct:
+            c.setStrokeColor(self.accent)
+            extent = -360.0 * max(0.0, min(100.0, self.pct)) / 100.0
+            c.arc(ring / 2, ring / 2, s - ring / 2, s - ring / 2, 90, extent)
+
+        c.setFillColor(MUTED)
+        c.setFont("WorkSans", 7)
+        c.drawCentredString(s / 2, s / 2 + 4, "Totalt:")
+        c.setFillColor(INK)
+        c.setFont("WorkSans-Bold", 12)
+        c.drawCentredString(s / 2, s / 2 - 9, self.text)
+
+
+class CompetencyBar(Flowable):
+    """Kompetensstapel 0–5 med skalsiffror (.comp-bar)."""
+
+    def __init__(self, pct: float, accent, width: float = 150):
+        super().__init__()
+        self.pct = pct or 0.0
+        self.accent = accent
+        self.width = width
+        self.height = 18
+
+    def draw(self) -> None:
+        c = self.canv
+        bar_y, bar_h = 10, 6
+        # Spår och skalsiffror är lika för alla staplar med samma bredd: en form-XObject per dokument
+        name = f"CompetencyBar_{self.width:g}"
+        if not c.hasForm(name):
+            c.beginForm(name, -4, -2, self.width + 4, self.height)
+            c.setFillColor(colors.Color(0, 0, 0, alpha=0.08))
+            c.roundRect(0, bar_y, self.width, bar_h, 3, stroke=0, fill=1)
+            c.setFillColor(MUTED)
+            c.setFont("WorkSans", 6.5)
+            for tick in range(6):
+                c.drawCentredString(self.width * tick / 5.0, 0, str(tick))
+            c.endForm()
+        c.doForm(name)
+
+        fill_w = self.width * max(0.0, min(100.0, self.pct)) / 100.0
+        if fill_w > 0:
+            c.setFillColor(self.accent)
+            c.roundRect(0, bar_y, fill_w, bar_h, 3, stroke=0, fill=1)
+
+
+def _radar_point(p):
+    """SVG-koordinater (y nedåt) -> reportlab (y uppåt)."""
+    return p[0], charts.RADAR_HEIGHT - p[1]
+
+
+@lru_cache(maxsize=64)
+def _radar_backdrop(labels: Tuple[str, ...]) -> Group:
+    """Rutnät, axlar och etiketter beror bara på klustren – byggs en gång och delas mellan rapporterna."""
+    layout = charts.RadarLayout(labels, [0.0] * len(labels), [""] * len(labels))
+    H = charts.RADAR_HEIGHT
+    pt = _radar_point
+    g = Group()
+    grid_color = colors.Color(0, 0, 0, alpha=0.10)
+
+    for pts in layout.grid:
+        path = Path(strokeColor=grid_color, strokeWidth=1, fillColor=None)
+        for i, (start, corner, end) in enumerate(charts.rounded_polygon_segments(pts, charts.RADAR_CORNER_RADIUS)):
+            (sx, sy), (qx, qy), (ex, ey) = pt(start), pt(corner), pt(end)
+            if i == 0:
+                path.moveTo(sx, sy)
+            else:
+                path.lineTo(sx, sy)
+            # Kvadratisk kurva -> kubisk
+            path.curveTo(
+                sx + 2 / 3 * (qx - sx), sy + 2 / 3 * (qy - sy),
+                ex + 2 / 3 * (qx - ex), ey + 2 / 3 * (qy - ey),
+                ex, ey,
+            )
+        path.closePath()
+        g.add(path)
+
+    cx, cy = pt(layout.center)
+    for axis in layout.axes:
+        ax, ay = pt(axis)
+        g.add(Line(cx, cy, ax, ay, strokeColor=colors.Color(0, 0, 0, alpha=0.06), strokeWidth=1))
+
+    line_height = charts.RADAR_LABEL_FONT_SIZE * 1.2
+    for x, top, anchor, lines in layout.labels:
+        for j, line in enumerate(lines):
+            baseline = H - (top + charts.RADAR_LABEL_FONT_SIZE + j * line_height)
+            g.add(String(
+                x, baseline, line,
+                fontName="WorkSans-Bold", fontSize=charts.RADAR_LABEL_FONT_SIZE,
+                fillColor=colors.HexColor("#222222"), textAnchor=anchor,
+            ))
+    return g
+
+
+def _radar_drawing(report_data: Dict[str, Any], width: float) -> Optional[Drawing]:
+    """Radarn ritad med reportlab-grafik från samma geometri som SVG-versionen."""
+    labels, values, cluster_colors = charts.radar_values_for(report_data)
+    if len(labels) < 3:
+        return None
+
+    layout = charts.RadarLayout(labels, values, cluster_colors)
+    H = charts.RADAR_HEIGHT
+    scale = width / charts.RADAR_WIDTH
+    pt = _radar_point
+
+    d = Drawing(charts.RADAR_WIDTH, H)
+    d.add(_radar_backdrop(labels))
+
+    flat: List[float] = []
+    for p in layout.points:
+        flat.extend(pt(p))
+    d.add(Polygon(flat, fillColor=colors.Color(2 / 255, 128 / 255, 129 / 255, alpha=0.14), strokeColor=None))
+    d.add(PolyLine(flat + flat[:2], strokeColor=BRAND, strokeWidth=2.6, strokeLineJoin=1))
+
+    for p, (text, bx, by, badge_w, color) in zip(layout.points, layout.badges):
+        x, y = pt(p)
+        d.add(Circle(x, y, charts.RADAR_RING_RADIUS, fillColor=colors.white,
+                     strokeColor=colors.Color(0, 0, 0, alpha=0.10), strokeWidth=1.2))
+        d.add(Circle(x, y, charts.RADAR_DOT_RADIUS, fillColor=colors.HexColor(color), strokeColor=None))
+        d.add(Rect(bx, H - by - charts.RADAR_BADGE_HEIGHT, badge_w, charts.RADAR_BADGE_HEIGHT, rx=6, ry=6,
+                   fillColor=colors.white, strokeColor=colors.Color(0, 0, 0, alpha=0.10), strokeWidth=1))
+        d.add(String(x, H - by - charts.RADAR_BADGE_HEIGHT / 2 - 3.5, text, fontName="WorkSans-Bold",
+                     fontSize=10, fillColor=INK, textAnchor="middle"))
+
+    d.scale(scale, scale)
+    d.width = charts.RADAR_WIDTH * scale
+    d.height = H * scale
+    return d
+
+
+def _card(rows: List[List[Any]], col_widths: List[float], accent=None, padding: float = 12) -> Table:
+    t = Table(rows, colWidths=col_widths)
+    style = [
+        ("BACKGROUND", (0, 0), (-1, -1), CARD_BG),
+        ("BOX", (0, 0), (-1, -1), 0.6, CARD_LINE),
+        ("ROUNDEDCORNERS", [10, 10, 10, 10]),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("LEFTPADDING", (0, 0), (-1, -1), padding),
+        ("RIGHTPADDING", (0, 0), (-1, -1), padding),
+        ("TOPPADDING", (0, 0), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+    ]
+    if accent is not None:
+        style.append(("LINEBEFORE", (0, 0), (0, -1), 3, accent))
+    t.setStyle(TableStyle(style))
+    return t
+
+
+# ── Sektioner ───────────────────────────
+
+SCALE_TEXTS = [
+    "Detta beteende ligger i nuläget <b>långt ifrån</b> ditt naturliga sätt att agera och kan <b>kräva mer</b> "
+    "medveten ansträngning och energi att använda.",
+    "Detta beteende känns <b>mindre naturligt</b> för dig och kan i många situationer upplevas som "
+    "<b>mer energikrävande</b> än energigivande.",
+    "Detta beteende kan du <b>använda vid behov</b> och upplevs ofta som (över tid) <b>energimässigt neutralt</b>, "
+    "ibland naturligt, ibland mindre.",
+    "Detta beteende <b>ligger nära</b> ditt naturliga sätt att agera och ger dig i många sammanhang sannolikt "
+    "<b>energi att använda</b>.",
+    "Detta beteende är <b>mycket naturligt</b> för dig och upplevs i många situationer som <b>energigivande</b> "
+    "och <b>lätt att agera utifrån</b>.",
+]
+
+
+def _intro_section(report_data: Dict[str, Any], st: Dict[str, ParagraphStyle], width: float) -> List[Flowable]:
+    org = _organization(report_data)
+    story: List[Flowable] = [
+        Spacer(1, 20),
+        _para("INLEDNING", st["label"]),
+        _para("Om självskattning och naturligt beteende", st["title"]),
+        _para(
+            "Denna rapport bygger enbart på <b>din egen skattning</b> av hur du brukar agera i olika arbetssituationer.",
+            st["lead"],
+        ),
+        _para(
+            "Resultaten ska därför inte ses som ett facit eller som en beskrivning av hur du kan eller bör bete dig i alla "
+            "sammanhang. De speglar i stället de beteenden som i nuläget faller dig mest naturligt, samt de områden som "
+            "oftast tar mest energi i ditt ledarskap.",
+            st["body"],
+        ),
+        _para(
+            "Eftersom olika beteenden fyller olika funktioner är det varken möjligt eller eftersträvansvärt att ligga högt "
+            "på allt. Rapporten visar i stället vilka arbetssätt som kommer lätt för dig och var du i vissa situationer kan "
+            "behöva en mer medveten anpassning, beroende på sammanhang och krav i rollen.",
+            st["body"],
+        ),
+        _para(
+            "Rapporten är ett verktyg för självinsikt och reflektion – inte en värdering av prestation eller förmåga. Den "
+            "kan hjälpa dig att förstå vilka beteenden som kommer mer naturligt för dig, och vilka som kan kräva mer "
+            f"energi att använda. Tillsammans utgör dessa en grund för fortsatt utveckling inom ramen för {org['genitive']} ledarskap.",
+            st["body"],
+        ),
+        _para("Tolkning av skalan", st["section"]),
+        _para("Skalan beskriver i vilken grad olika beteenden upplevs som naturliga och energigivande för dig.", st["body"]),
+    ]
+
+    dots_w = 5 * 12 + 4 * 7 + 4
+    rows = [[ScaleDots(level * 2, BRAND, size=12, gap=7), _para(text, st["small"])]
+            for level, text in enumerate(SCALE_TEXTS, start=1)]
+    story.append(_card(rows, [dots_w + 24, width - dots_w - 24]))
+    return story
+
+
+def _pill_list(items: List[Dict[str, Any]], st: Dict[str, ParagraphStyle], width: float) -> Table:
+    rows = [[_p(u.get("name", ""), st["pill"])] for u in items]
+    t = Table(rows, colWidths=[width])
+    t.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, -1), colors.Color(1, 1, 1, alpha=0.8)),
+        ("ROUNDEDCORNERS", [8, 8, 8, 8]),
+        ("LINEBELOW", (0, 0), (-1, -2), 3, PAGE_BG),
+        ("LEFTPADDING", (0, 0), (-1, -1), 8),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ]))
+    return t
+
+
+def _overview_section(report_data: Dict[str, Any], st: Dict[str, ParagraphStyle], width: float) -> List[Flowable]:
+    story: List[Flowable] = [
+        PageBreak(),
+        Spacer(1, 20),
+        _para("Översikt över dina<br/>ledarskapsbeteenden", st["title_xl"]),
+        _para(
+            "Denna rapport bygger helt på din egen skattning av hur du<br/>mest naturligt agerar i olika arbetssituationer.",
+            st["subtitle"],
+        ),
+    ]
+
+    radar = _radar_drawing(report_data, width * 0.9)
+    if radar is not None:
+        story.append(radar)
+        story.append(Spacer(1, 10))
+
+    insights = report_data.get("insights") or {}
+    most, needs = insights.get("most_natural"), insights.get("needs_development")
+    if not (most and needs):
+        return story
+
+    cards = (
+        (most, "Ledarbeteende som ligger nära ditt naturliga sätt att leda",
+         "Beteenden som ofta upplevs som energigivande", insights.get("top_energy") or []),
+        (needs, "Ledarbeteende som ibland kräver mer fokus och medvetenhet",
+         "Beteenden som kan upplevas som mer energikrävande", insights.get("low_energy") or []),
+    )
+    inner = width - 2 * 14
+    for cluster, heading, pill_heading, pills in cards:
+        accent = colors.HexColor(charts.cluster_color(cluster))
+        rows: List[List[Any]] = [
+            [_p(heading, st["small_bold"])],
+            [_p(cluster.get("title", ""), st["card_title"])],
+        ]
+        if cluster.get("description"):
+            rows.append([_paragraphs(cluster["description"], st["small"])])
+        rows.append([_p(pill_heading, st["small_bold"])])
+        if pills:
+            rows.append([_pill_list(pills, st, inner)])
+        story.append(KeepTogether([_card(rows, [width], accent=accent, padding=14), Spacer(1, 10)]))
+
+    return story
+
+
+def _results_section(report_data: Dict[str, Any], st: Dict[str, ParagraphStyle], width: float) -> List[Flowable]:
+    story: List[Flowable] = [
+        PageBreak(),
+        Spacer(1, 20),
+        _para(f"Resultat på {_organization(report_data)['genitive']}<br/>ledarskapsbeteenden", st["title_xl"]),
+        _para(
+            "Resultaten visas på en femgradig skala (1–5) där varje ledarbeteende <br/>presenteras tillsammans med "
+            "tillhörande beteenden som praktiseras i vardagen.",
+            st["subtitle"],
+        ),
+    ]
+
+    underbehaviors = report_data.get("b3_underbehaviors") or []
+    dots_w = 5 * 9 + 4 * 5
+    for cluster in report_data.get("b3_clusters") or []:
+        accent = colors.HexColor(charts.cluster_color(cluster))
+
+        if cluster.get("total_score") is not None and cluster.get("pct_total") is not None:
+            donut = Donut(cluster["pct_total"], f'{cluster.get("pct_total_text", 0)}%', accent)
+        else:
+            donut = Donut(None, "–", accent)
+
+        head: List[Flowable] = [_p(cluster.get("title", ""), st["card_title"])]
+        if cluster.get("percentile") is not None:
+            size = (report_data.get("norms") or {}).get("size", 0)
+            head.append(_p(f"Percentil {cluster['percentile']:.0f} jämfört med normgruppen ({size} personer)", st["small"]))
+        if cluster.get("description"):
+            head.extend(_paragraphs(cluster["description"], st["small"]))
+
+        inner = width - 2 * 12
+        header = Table([[donut, head]], colWidths=[donut.width + 16, inner - donut.width - 16])
+        header.setStyle(TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("LEFTPADDING", (0, 0), (-1, -1), 0),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+        ]))
+
+        rows: List[List[Any]] = []
+        for u in underbehaviors:
+            if u.get("cluster") != cluster.get("name"):
+                continue
+            steps = u.get("score_5_half_steps")
+            scale = ScaleDots(steps, accent) if steps is not None else _p("Ingen data", st["small"])
+            rows.append([_p(u.get("name", ""), st["row"]), scale])
+
+        parts: List[List[Any]] = [[header]]
+        if rows:
+            lst = Table(rows, colWidths=[inner - dots_w - 12, dots_w + 12])
+            lst.setStyle(TableStyle([
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("LINEABOVE", (0, 0), (-1, -1), 0.4, CARD_LINE),
+                ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+                ("TOPPADDING", (0, 0), (-1, -1), 5),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+            ]))
+            parts.append([lst])
+
+        t = _card(parts, [width], accent=accent)
+        story.append(KeepTogether([t, Spacer(1, 12)]))
+
+    return story
+
+
+def _mapping_section(report_data: Dict[str, Any], st: Dict[str, ParagraphStyle], width: float) -> List[Flowable]:
+    org = _organization(report_data)
+    story: List[Flowable] = [
+        PageBreak(),
+        Spacer(1, 20),
+        _para("VISUELL MAPPNING", st["label"]),
+        _para("Inledning till visuell översikt av mappning och kompetensresultat", st["title"]),
+        _para(
+            f"I rapporten visas även hur dina resultat från TQ:s kompetenser har mappats till {org['genitive']} ledarbeteenden.",
+            st["lead"],
+        ),
+        _para(
+            "Självskattningen mäter ett antal underliggande beteenden och kompetenser, vilka har analyserats och kopplats "
+            f"till de specifika ledarbeteenden som ingår i {org['genitive']} ledarmodell. Denna mappning har genomförts i "
+            f"nära samarbete med {org['name']} för att säkerställa relevans och validitet.",
+            st["body"],
+        ),
+        _para(
+            "Syftet är att skapa en transparent och spårbar koppling mellan vad verktyget faktiskt mäter, och hur "
+            f"resultaten översätts till {org['genitive']} ledarbeteenden.",
+            st["body"],
+        ),
+        _para(
+            "Som appendix finns därför en översiktlig visualisering av hur mappningen är uppbyggd. Den visar vilka "
+            "TQ-kompetenser som ligger till grund för respektive ledarskapsbeteende, så att du tydligt kan se hur dina "
+            f"resultat hänger ihop och hur de kan tolkas i relation till {org['genitive']} ledaramverk.",
+            st["body"],
+        ),
+        _para(
+            "För ytterligare transparens presenteras även en översikt av dina resultat på TQ:s kompetenser, tillsammans "
+            "med tillhörande definitioner för varje kompetens.",
+            st["body"],
+        ),
+    ]
+
+    underbehaviors = report_data.get("b3_underbehaviors") or []
+    bar_w = 150
+    for cluster in report_data.get("b3_clusters") or []:
+        accent = colors.HexColor(charts.cluster_color(cluster))
+        # Klusterrubriken hålls ihop med första underbeteendet (ingen ensam rubrik sist på sidan)
+        header: List[Flowable] = [
+            Spacer(1, 8),
+            _card([[_p(cluster.get("title", ""), st["card_title"])]], [width], accent=accent),
+            Spacer(1, 6),
+        ]
+
+        for u in underbehaviors:
+            if u.get("cluster") != cluster.get("name"):
+                continue
+
+            steps = u.get("score_5_half_steps")
+            scale = ScaleDots(steps, accent) if steps is not None else _p("Ingen data", st["small"])
+            rows: List[List[Any]] = [
+                [_p(u.get("name", ""), st["row"]), [_p("Ditt resultat", st["small"]), scale]],
+                [[_p("Bakomliggande TQ-kompetenser", st["small_bold"]),
+                  _p("Kompetenserna nedan bidrar till resultatet ovan", st["small"])], ""],
+            ]
+            for comp in u.get("mapped_competencies") or []:
+                rows.append([
+                    [_p(comp.get("label", ""), st["small_bold"]), _p(comp.get("description", ""), st["small"])],
+                    CompetencyBar(comp.get("pct") or 0.0, accent, width=bar_w),
+                ])
+
+            t = Table(rows, colWidths=[width - bar_w - 24, bar_w + 24])
+            t.setStyle(TableStyle([
+                ("BACKGROUND", (0, 0), (-1, -1), CARD_BG),
+                ("BOX", (0, 0), (-1, -1), 0.6, CARD_LINE),
+                ("ROUNDEDCORNERS", [10, 10, 10, 10]),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("SPAN", (0, 1), (1, 1)),
+                ("LINEBELOW", (0, 0), (-1, 0), 0.4, CARD_LINE),
+                ("LEFTPADDING", (0, 0), (-1, -1), 12),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 12),
+                ("TOPPADDING", (0, 0), (-1, -1), 5),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+            ]))
+            story.append(KeepTogether(header + [t, Spacer(1, 8)]))
+            header = []
+
+    return story
+
+
+def _closing_section(report_data: Dict[str, Any], st: Dict[str, ParagraphStyle], width: float) -> List[Flowable]:
+    insights = report_data.get("insights") or {}
+    most, needs = insights.get("most_natural"), insights.get("needs_development")
+    if not (most and needs):
+        return []
+
+    summary_top = (
+        "Din självskattning visar att det ledarbeteende som i nuläget faller dig mest naturligt är "
+        f"<b>{escape(most.get('title', ''))}</b>. {escape(insights.get('most_natural_one_liner') or '')}"
+    )
+    summary_low = (
+        f"Resultatet visar samtidigt att <b>{escape(needs.get('title', ''))}</b> är det ledarbeteende som i nuläget "
+        "kan kräva mer medvetenhet och energi, beroende på sammanhang och krav i rollen. "
+        f"{escape(insights.get('needs_development_one_liner') or '')}"
+    )
+
+    story: List[Flowable] = [
+        PageBreak(),
+        Spacer(1, 20),
+        _para("AVSLUTNING", st["label"]),
+        _para("Summering och reflektion", st["title"]),
+        _para(
+            "Nedan följer en kort sammanfattning av resultatet, samt några frågor som kan hjälpa dig att knyta ihop insikterna.",
+            st["lead"],
+        ),
+        _para("Sammanfattning av ditt resultat", st["section"]),
+        _para(summary_top, st["body"]),
+        _para(summary_low, st["body"]),
+        _para("Frågor att ta med dig", st["section"]),
+    ]
+
+    for key in ("most_natural_questions", "needs_development_questions"):
+        for q in insights.get(key) or []:
+            story.append(Paragraph(escape(q), st["body"], bulletText="•"))
+        story.append(Spacer(1, 6))
+
+    story.append(Spacer(1, 16))
+    story.append(_card([
+        [_p("Tack för att du besvarat självskattningen och tagit del av rapporten!", st["section"])],
+        [_p(
+            "Vi hoppas att denna rapport har bidragit med värdefulla insikter och skapat en tydligare bild av ditt "
+            "ledarskap och dina naturliga beteendemönster.", st["body"],
+        )],
+        [_p(
+            "Resultaten är avsedda att fungera som ett stöd i fortsatt reflektion, både i vardagen och i dialog kring "
+            "ledarskapets olika sammanhang.", st["body"],
+        )],
+    ], [width], padding=16))
+    return story
+
+
+# ── Dokument ────────────────────────────
+
+def _draw_page(canv, doc) -> None:
+    """Beige bakgrund + zebra-list överst på varje sida (som .zebra-header i PDF-CSS:en)."""
+    # Samma på alla sidor: ritas in i en form-XObject första gången och återanvänds sedan
+    if not canv.hasForm("PageBackground"):
+        w, h = A4
+        canv.beginForm("PageBackground")
+        canv.setFillColor(PAGE_BG)
+        canv.rect(0, 0, w, h, stroke=0, fill=1)
+        if os.path.exists(ZEBRA_IMAGE):
+            strip_h = 34
+            strip_w = strip_h * 140 / 32
+            x = 0.0
+            while x < w:
+                canv.drawImage(ZEBRA_IMAGE, x, h - strip_h, strip_w, strip_h, mask="auto")
+                x += strip_w
+        canv.endForm()
+    canv.doForm("PageBackground")
+
+
+def build_report_pdf(
+    report_data: Dict[str, Any],
+    show_mapping: bool = True,
+    marks: Optional[Dict[str, int]] = None,
+) -> bytes:
+    """
+    Bygger hela rapporten som PDF-bytes, utan browser.
+    marks fylls (om angiven) med första sidan för "mapping" och "closing".
+    """
+    _register_fonts()
+    st = _styles()
+
+    buf = io.BytesIO()
+    margin_x, margin_top, margin_bottom = 20 * mm, 22 * mm, 16 * mm
+    doc = BaseDocTemplate(
+        buf,
+        pagesize=A4,
+        leftMargin=margin_x,
+        rightMargin=margin_x,
+        topMargin=margin_top,
+        bottomMargin=margin_bottom,
+        title="Kompetensrapport",
+        author=report_data.get("full_name") or "",
+    )
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="content",
+                  leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
+    doc.addPageTemplates([PageTemplate(id="report", frames=[frame], onPage=_draw_page)])
+
+    width = doc.width
+    story: List[Flowable] = []
+    story.extend(_intro_section(report_data, st, width))
+    story.extend(_overview_section(report_data, st, width))
+    story.extend(_results_section(report_data, st, width))
+    if marks is None:
+        marks = {}
+    if show_mapping:
+        # Sektionerna börjar med PageBreak, så markören hamnar överst på sektionens första sida
+        mapping = _mapping_section(report_data, st, width)
+        story.extend(mapping[:1] + [PageMarker("mapping", marks)] + mapping[1:])
+    closing = _closing_section(report_data, st, width)
+    if closing:
+        story.extend(closing[:1] + [PageMarker("closing", marks)] + closing[1:])
+
+    doc.build(story)
+    return buf.getvalue()
@@ -0,0 +1,327 @@
+import io
+import logging
+import mimetypes
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type
+from urllib.parse import urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import render_to_string
+
+from .browser_pool import get_browser_pool
+from .timing import NULL_TIMER, stage_timer
+from .view_model import report_context
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext
+
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────
+# PDF-renderare
+# ─────────────────────────────────────────
+#
+# report_pdf_download pratar bara med PdfRenderer-gränssnittet. Vilken
+# backend som används styrs av settings.REPORT_PDF_BACKEND eller ?backend=.
+
+
+class PdfRenderer:
+    """Gemensamt gränssnitt: report_data in, PDF-bytes ut."""
+
+    name = ""
+    cpu_bound = False  # True = renderingen håller GIL:en; bulk-export kör den då i egna processer
+
+    def render(self, report_data: Dict[str, Any], show_mapping: bool = True, request=None) -> bytes:
+        raise NotImplementedError
+
+    def render_full(self, report_data: Dict[str, Any], request=None) -> Tuple[bytes, Optional[range]]:
+        """Full PDF + sidorna (0-baserat) som hör till mappningssektionen, om de går att avgöra."""
+        pdf_bytes = self.render(report_data, show_mapping=True, request=request)
+        return pdf_bytes, find_mapping_pages(pdf_bytes)
+
+    def render_both(self, report_data: Dict[str, Any], request=None) -> Dict[bool, bytes]:
+        """
+        Båda varianterna ur EN rendering: {True: med mappning, False: utan}.
+        Utan-varianten klipps ur den fulla med pypdf. Går mappningssidorna inte
+        att avgöra renderas den separat i stället.
+        """
+        full, mapping_pages = self.render_full(report_data, request=request)
+        if mapping_pages is None:
+            logger.info("Hittade inte mappningssidorna i %s-PDF:en, renderar utan mappning separat.", self.name)
+            return {True: full, False: self.render(report_data, show_mapping=False, request=request)}
+        return {True: full, False: drop_pages(full, mapping_pages)}
+
+    async def arender(self, report_data: Dict[str, Any], show_mapping: bool = True, request=None) -> bytes:
+        """Async-vyer: standard är att köra render() i en tråd så att event loopen är fri."""
+        return await sync_to_async(self.render, thread_sensitive=False)(
+            report_data, show_mapping=show_mapping, request=request
+        )
+
+    async def arender_both(self, report_data: Dict[str, Any], request=None) -> Dict[bool, bytes]:
+        return await sync_to_async(self.render_both, thread_sensitive=False)(report_data, request=request)
+
+
+# ── Sidklippning (en rendering, två varianter) ──
+
+# Sektionsetiketterna i både _report_content.html och pdf_native.py
+MAPPING_SECTION_LABEL = "VISUELL MAPPNING"
+CLOSING_SECTION_LABEL = "AVSLUTNING"
+
+
+def _starts_with_label(text: str, label: str) -> bool:
+    """Sidan börjar med etiketten, dvs. sektionen började på en ny sida."""
+    before, found, _ = text.partition(label)
+    return bool(found) and not before.strip()
+
+
+def find_mapping_pages(pdf_bytes: bytes) -> Optional[range]:
+    """
+    Mappningssektionens sidor i en full PDF, utifrån sektionsetiketterna i texten.
+    None om sektionen inte börjar och slutar på sidgränser (då går den inte att klippa bort säkert).
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    texts = [(page.extract_text() or "") for page in reader.pages]
+
+    start = next((i for i, t in enumerate(texts) if MAPPING_SECTION_LABEL in t), None)
+    if start is None or not _starts_with_label(texts[start], MAPPING_SECTION_LABEL):
+        return None
+
+    end = len(texts)
+    for i in range(start + 1, len(texts)):
+        if CLOSING_SECTION_LABEL in texts[i]:
+            if not _starts_with_label(texts[i], CLOSING_SECTION_LABEL):
+                return None
+            end = i
+            break
+    return range(start, end)
+
+
+def drop_pages(pdf_bytes: bytes, pages: range) -> bytes:
+    """Ny PDF utan de angivna sidorna (typsnitt och bilder delas, inget renderas om)."""
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    writer = PdfWriter()
+    for i, page in enumerate(reader.pages):
+        if i not in pages:
+            writer.add_page(page)
+    if reader.metadata:
+        writer.add_metadata(dict(reader.metadata))
+
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def without_mapping_pages(pdf_bytes: bytes) -> Optional[bytes]:
+    """Full PDF -> samma PDF utan mappningssidorna, None om de inte går att hitta."""
+    mapping_pages = find_mapping_pages(pdf_bytes)
+    return drop_pages(pdf_bytes, mapping_pages) if mapping_pages is not None else None
+
+
+# ── Chromium (Playwright) ───────────────
+
+# ✅ Sätt desktop-viewport direkt på context (viktigare än på page)
+PDF_CONTEXT_OPTIONS = {
+    "viewport": {"width": 1440, "height": 900},
+    "device_scale_factor": 1,   # undvik konstiga skalningar
+}
+
+
+# Låtsas-origin för PDF-sidan: dokumentet och /static/ besvaras direkt från
+# processen via page.route, så Chromium aldrig behöver gå via gunicorn.
+PDF_BASE_URL = "http://report.local/"
+
+
+# Endast dessa filtyper får PDF-sidan hämta från /static/
+PDF_ALLOWED_ASSET_TYPES = (".css", ".js", ".ttf", ".otf", ".woff", ".woff2", ".svg", ".png", ".jpg", ".jpeg")
+
+# path -> bytes (None = finns inte). Statiska filer ändras bara vid deploy.
+_STATIC_ASSET_CACHE: Dict[str, Optional[bytes]] = {}
+
+
+def _read_static_file(path: str) -> Optional[bytes]:
+    """Läser en fil under STATIC_URL från disk (collectstatic först, annars app-static)."""
+    static_prefix = "/" + settings.STATIC_URL.strip("/") + "/"
+    if not path.startswith(static_prefix) or not path.lower().endswith(PDF_ALLOWED_ASSET_TYPES):
+        return None
+    rel = path[len(static_prefix):]
+
+    candidates: List[str] = []
+    if settings.STATIC_ROOT:
+        candidates.append(os.path.join(settings.STATIC_ROOT, rel))
+    found = finders.find(rel)
+    if found:
+        candidates.append(found)
+
+    for full_path in candidates:
+        if os.path.isfile(full_path):
+            with open(full_path, "rb") as fh:
+                return fh.read()
+    return None
+
+
+def _get_static_asset(path: str) -> Optional[bytes]:
+    """Som _read_static_file, men cachat i minnet (utom i DEBUG så att ändringar syns direkt)."""
+    if settings.DEBUG:
+        return _read_static_file(path)
+    if path not in _STATIC_ASSET_CACHE:
+        _STATIC_ASSET_CACHE[path] = _read_static_file(path)
+    return _STATIC_ASSET_CACHE[path]
+
+
+async def _render_pdf_async(context: "BrowserContext", html: str, timer=NULL_TIMER) -> bytes:
+    """Renderar färdig HTML till PDF i en (pool-)context – ingen extra HTTP-runda mot oss själva."""
+    offline = getattr(settings, "REPORT_PDF_OFFLINE", True)
+
+    async def _handle_route(route):
+        url = route.request.url
+        if not url.startswith(PDF_BASE_URL):
+            # Offline-läge: allt externt stoppas direkt i stället för att vänta på nätet
+            if offline:
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+            return
+
+        path = urlparse(url).path
+        if path == "/":
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=html)
+            return
+
+        body = _get_static_asset(path)
+        if body is None:
+            await route.fulfill(status=404, body="")
+            return
+
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        await route.fulfill(status=200, content_type=content_type, body=body)
+
+    with timer.stage("page"):
+        page = await context.new_page()
+        await page.route("**/*" if offline else PDF_BASE_URL + "**", _handle_route)
+
+        # ✅ Superviktigt: gör detta innan goto
+        await page.emulate_media(media="screen")
+
+    # ✅ Ladda sidan EN gång, i rätt viewport + screen
+    with timer.stage("goto"):
+        await page.goto(PDF_BASE_URL, wait_until="load")
+
+    # Sidan sätter själv window.__REPORT_READY__ när typsnitten är klara
+    with timer.stage("ready"):
+        try:
+            await page.wait_for_function(
+                "() => window.__REPORT_READY__ === true",
+                timeout=getattr(settings, "REPORT_PDF_READY_TIMEOUT", 10) * 1000,
+            )
+        except Exception:
+            logger.warning("PDF-sidan signalerade aldrig __REPORT_READY__, renderar ändå.")
+
+    with timer.stage("pdf"):
+        pdf_bytes = await page.pdf(
+            format="A4",
+            print_background=True,
+            margin={"top": "0", "right": "0", "bottom": "0", "left": "0"},
+            prefer_css_page_size=True,
+            scale=1,  # ✅ stoppa auto-krympning
+        )
+
+    return pdf_bytes
+
+
+class ChromiumRenderer(PdfRenderer):
+    """Renderar reports/report_pdf.html i en varm Chromium ur browser-poolen."""
+
+    name = "chromium"
+
+    def _html(self, report_data: Dict[str, Any], show_mapping: bool, request=None) -> str:
+        ctx = report_context(report_data, show_mapping)
+        return render_to_string("reports/report_pdf.html", ctx, request=request)
+
+    def render(self, report_data: Dict[str, Any], show_mapping: bool = True, request=None) -> bytes:
+        timer = stage_timer(request)
+        with timer.stage("html"):
+            html = self._html(report_data, show_mapping, request)
+
+        # Varm browser ur poolen i stället för en ny Chromium per nedladdning
+        return get_browser_pool().run(
+            lambda browser_ctx: _render_pdf_async(browser_ctx, html, timer),
+            context_options=PDF_CONTEXT_OPTIONS,
+            timeout=getattr(settings, "REPORT_PDF_TIMEOUT", 60),
+            timer=timer,
+        )
+
+    async def arender(self, report_data: Dict[str, Any], show_mapping: bool = True, request=None) -> bytes:
+        timer = stage_timer(request)
+        with timer.stage("html"):
+            html = await sync_to_async(self._html)(report_data, show_mapping, request)
+
+        # Ingen tråd hålls under renderingen – vi väntar bara på poolens loop
+        return await get_browser_pool().arun(
+            lambda browser_ctx: _render_pdf_async(browser_ctx, html, timer),
+            context_options=PDF_CONTEXT_OPTIONS,
+            timeout=getattr(settings, "REPORT_PDF_TIMEOUT", 60),
+            timer=timer,
+        )
+
+    async def arender_both(self, report_data: Dict[str, Any], request=None) -> Dict[bool, bytes]:
+        full = await self.arender(report_data, show_mapping=True, request=request)
+        with stage_timer(request).stage("slice"):  # sökning + klippning är ett steg
+            without_mapping = await sync_to_async(without_mapping_pages, thread_sensitive=False)(full)
+        if without_mapping is None:
+            logger.info("Hittade inte mappningssidorna i chromium-PDF:en, renderar utan mappning separat.")
+            without_mapping = await self.arender(report_data, show_mapping=False, request=request)
+        return {True: full, False: without_mapping}
+
+
+# ── Inbyggd (reportlab) ─────────────────
+
+class NativeRenderer(PdfRenderer):
+    """Lägger ut rapporten direkt med reportlab – ingen browser alls."""
+
+    name = "native"
+    cpu_bound = True
+
+    def render(self, report_data: Dict[str, Any], show_mapping: bool = True, request=None) -> bytes:
+        from .pdf_native import build_report_pdf
+
+        return build_report_pdf(report_data, show_mapping=show_mapping)
+
+    def render_full(self, report_data: Dict[str, Any], request=None) -> Tuple[bytes, Optional[range]]:
+        from .pdf_native import build_report_pdf
+
+        # Layouten vet själv var sektionerna hamnar – ingen textsökning behövs
+        marks: Dict[str, int] = {}
+        pdf_bytes = build_report_pdf(report_data, show_mapping=True, marks=marks)
+        if "mapping" not in marks:
+            return pdf_bytes, None
+        end = marks.get("closing")
+        if end is None:
+            from pypdf import PdfReader
+
+            end = len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+        return pdf_bytes, range(marks["mapping"], end)
+
+
+PDF_RENDERERS: Dict[str, Type[PdfRenderer]] = {
+    ChromiumRenderer.name: ChromiumRenderer,
+    NativeRenderer.name: NativeRenderer,
+}
+
+_renderers: Dict[str, PdfRenderer] = {}
+
+
+def get_renderer(name: Optional[str] = None) -> PdfRenderer:
+    """Renderare per namn; okänt eller tomt namn ger standard-backenden från settings."""
+    if not name or name not in PDF_RENDERERS:
+        name = getattr(settings, "REPORT_PDF_BACKEND", ChromiumRenderer.name)
+    if name not in _renderers:
+        _renderers[name] = PDF_RENDERERS[name]()
+    return _renderers[name]
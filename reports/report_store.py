@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+
+from .ingest import SCORE_DTYPE, widen_scores
+
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────
+# Rapportlager (kompakt, på disk)
+# ─────────────────────────────────────────
+#
+# En uppladdning sparas en gång som råvärden: namn, kompetens-labels, N × L
+# poäng (float32) och ramverksversion. Sessionen håller bara rapportens id – hela
+# report_data (underbeteenden, uträkningar, insikter) byggs vid behov ur
+# råvärdena och cachas i processen. Id:t är en hash av innehållet, så samma
+# fil två gånger ger samma post.
+
+REPORT_ID_LENGTH = 32
+
+
+class StoredReport:
+    """
+    En uppladdad fil: råvärden per kandidat. values är (N, L) float32 med NaN där
+    värde saknas – row() och widen_scores() ger filens float64-värden att räkna med.
+    """
+
+    __slots__ = ("id", "names", "labels", "values", "framework_version")
+
+    def __init__(self, report_id: str, names: Sequence[str], labels: Sequence[str], values: np.ndarray, framework_version: str):
+        self.id = report_id
+        self.names = list(names)
+        self.labels = list(labels)
+        self.values = np.asarray(values, dtype=SCORE_DTYPE).reshape(len(self.names), len(self.labels))
+        self.values.setflags(write=False)
+        self.framework_version = framework_version
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def row(self, index: int) -> np.ndarray:
+        """Kandidatens värden som float64 (samma tal som i filen)."""
+        return widen_scores(self.values[index])
+
+    def to_json(self) -> str:
+        # NaN -> null, så att filen är ren JSON; värdena som i Excel-filen (inte float32-brus)
+        values = widen_scores(self.values)
+        return json.dumps(
+            {
+                "framework": self.framework_version,
+                "names": self.names,
+                "labels": self.labels,
+                "values": np.where(np.isnan(values), None, values).tolist(),
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, report_id: str, payload: str) -> "StoredReport":
+        data = json.loads(payload)
+        values = np.array(data["values"], dtype=float)  # null -> NaN
+        return cls(report_id, data["names"], data["labels"], values, data["framework"])
+
+
+def _valid_id(report_id: str) -> bool:
+    return (
+        isinstance(report_id, str)
+        and len(report_id) == REPORT_ID_LENGTH
+        and all(ch in "0123456789abcdef" for ch in report_id)
+    )
+
+
+class ReportStore:
+    def __init__(self, directory: Path, ttl: int, memory_items: int = 32):
+        self.directory = Path(directory)
+        self.ttl = int(ttl)
+        self.memory_items = max(0, int(memory_items))
+        self._memory: "OrderedDict[str, StoredReport]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _path(self, report_id: str) -> Path:
+        return self.directory / report_id[:2] / f"{report_id}.json"
+
+    def _remember(self, report: StoredReport) -> None:
+        if not self.memory_items:
+            return
+        with self._lock:
+            self._memory[report.id] = report
+            self._memory.move_to_end(report.id)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def put(self, names: List[str], labels: List[str], values: np.ndarray, framework_version: str) -> StoredReport:
+        """Sparar råvärdena och returnerar posten (med id)."""
+        payload = StoredReport("", names, labels, values, framework_version).to_json()
+        report_id = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:REPORT_ID_LENGTH]
+        report = StoredReport(report_id, names, labels, values, framework_version)
+
+        path = self._path(report_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+        self._remember(report)
+        self._maybe_purge()
+        return report
+
+    def get(self, report_id: Optional[str]) -> Optional[StoredReport]:
+        """Posten, eller None om id:t är okänt/utgånget."""
+        if not _valid_id(report_id):
+            return None
+
+        with self._lock:
+            report = self._memory.get(report_id)
+            if report is not None:
+                self._memory.move_to_end(report_id)
+        if report is not None:
+            return report
+
+        path = self._path(report_id)
+        try:
+            payload = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # används = lever vidare
+        except OSError:
+            pass
+
+        report = StoredReport.from_json(report_id, payload)
+        self._remember(report)
+        return report
+
+    def purge(self) -> int:
+        """Tar bort poster som inte använts på ttl sekunder."""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue  # borttagen av en annan worker
+        if removed:
+            with self._lock:
+                self._memory.clear()
+        return removed
+
+    def _maybe_purge(self) -> None:
+        # Högst en genomsökning i timmen per process
+        now = time.monotonic()
+        if now - self._last_purge < 3600:
+            return
+        self._last_purge = now
+        self.purge()
+
+
+_store: Optional[ReportStore] = None
+_store_lock = threading.Lock()
+
+
+def get_report_store() -> ReportStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            directory = getattr(settings, "REPORT_STORE_DIR", None) or os.path.join(
+                tempfile.gettempdir(), "b3-report-store"
+            )
+            _store = ReportStore(
+                Path(directory),
+                ttl=getattr(settings, "REPORT_STORE_TTL", 7 * 24 * 3600),
+                memory_items=getattr(settings, "REPORT_STORE_MEMORY_ITEMS", 32),
+            )
+        return _store
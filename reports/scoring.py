@@ -0,0 +1,149 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+
+# ─────────────────────────────────────────
+# Vektoriserad poängsättning
+# ─────────────────────────────────────────
+#
+# Ramverket (underbeteenden → kompetenser, kluster, vikter) kompileras en gång
+# till indexmatriser. En kandidat är en rad i X (N × C, NaN = saknad kompetens),
+# så en eller tiotusen kandidater räknas med samma kolumnoperationer.
+#
+# Summorna läggs ihop i definitionsordning, term för term, precis som den
+# radvisa beräkningen gjorde. En matrisprodukt summerar i annan ordning och kan
+# ge t.ex. 47.00000000000001 i stället för 47.0 – och därmed 48 % i stället för
+# 47 % efter uppåtavrundningen. Med samma ordning blir resultatet bitidentiskt.
+
+HEAVY_WEIGHT = 2.0
+NORMAL_WEIGHT = 1.0
+MAX_SCORE = 5.0
+
+
+class CompiledFramework:
+    __slots__ = (
+        "competencies",       # C kompetensnamn (första förekomst-ordning)
+        "competency_index",   # namn -> kolumn i X
+        "underbehaviors",     # U definitioner (originaldicten)
+        "cluster_order",      # K klusternamn i definitionsordning
+        "cluster_index",      # klusternamn -> index i cluster_order
+        "ub_cluster",         # (U,) klusterindex per underbeteende
+        "ub_weights",         # (U,) 1.0 eller 2.0
+        "ub_members",         # (U, M) kompetensindex i definitionsordning, -1 = utfyllnad
+        "cluster_members",    # (K, P) underbeteendeindex i definitionsordning, -1 = utfyllnad
+        "version",            # hash av definitionen – ändras när ramverket ändras
+    )
+
+    def __init__(self, b3_underbehaviors_def: Sequence[Dict[str, Any]]):
+        competencies: List[str] = []
+        cluster_order: List[str] = []
+        for beh in b3_underbehaviors_def:
+            c = beh.get("cluster")
+            if c and c not in cluster_order:
+                cluster_order.append(c)
+            for comp in beh.get("competencies", []):
+                if comp not in competencies:
+                    competencies.append(comp)
+
+        self.competencies = tuple(competencies)
+        self.competency_index = {name: i for i, name in enumerate(competencies)}
+        self.underbehaviors = tuple(b3_underbehaviors_def)
+        self.cluster_order = tuple(cluster_order)
+        self.cluster_index = {name: k for k, name in enumerate(cluster_order)}
+        self.version = framework_version(b3_underbehaviors_def)
+
+        n_comp, n_ub, n_cl = len(competencies), len(self.underbehaviors), len(cluster_order)
+
+        self.ub_cluster = np.full(n_ub, -1, dtype=np.intp)
+        self.ub_weights = np.empty(n_ub)
+        members: List[List[int]] = []
+        cluster_members: List[List[int]] = [[] for _ in range(n_cl)]
+
+        for u, beh in enumerate(self.underbehaviors):
+            members.append([self.competency_index[comp] for comp in beh.get("competencies", [])])
+
+            raw_weight = float(beh.get("weight", NORMAL_WEIGHT))
+            self.ub_weights[u] = HEAVY_WEIGHT if raw_weight >= HEAVY_WEIGHT else NORMAL_WEIGHT
+
+            k = self.cluster_index.get(beh.get("cluster"))
+            if k is not None:
+                self.ub_cluster[u] = k
+                cluster_members[k].append(u)
+
+        self.ub_members = _padded(members)
+        self.cluster_members = _padded(cluster_members)
+
+        for arr in (self.ub_cluster, self.ub_weights, self.ub_members, self.cluster_members):
+            arr.setflags(write=False)
+
+
+def _padded(rows: List[List[int]]) -> np.ndarray:
+    """Listor av olika längd -> (len(rows), max längd), utfyllt med -1."""
+    out = np.full((len(rows), max((len(r) for r in rows), default=0)), -1, dtype=np.intp)
+    for i, r in enumerate(rows):
+        out[i, :len(r)] = r
+    return out
+
+
+def _ordered_sum(values: np.ndarray, members: np.ndarray):
+    """
+    values (N, A), members (B, M) -> (summor, antal) (N, B): Σ values[:, members[b]]
+    utan NaN. Termerna läggs till en position i taget, i definitionsordning.
+    """
+    sums = np.zeros((values.shape[0], members.shape[0]))
+    counts = np.zeros_like(sums)
+    for idx in members.T:
+        rows = idx >= 0
+        col = values[:, idx[rows]]
+        has = ~np.isnan(col)
+        sums[:, rows] += np.where(has, col, 0.0)
+        counts[:, rows] += has
+    return sums, counts
+
+
+def framework_version(b3_underbehaviors_def: Sequence[Dict[str, Any]]) -> str:
+    """Kort, stabil hash av en ramverksdefinition (oberoende av dict-ordning)."""
+    payload = json.dumps(list(b3_underbehaviors_def), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class ScoreResult:
+    """Resultatmatriser för N kandidater. NaN = kunde inte räknas (saknade värden)."""
+
+    __slots__ = ("under", "cluster_total", "cluster_weight_sum", "cluster_max", "cluster_mean", "cluster_pct")
+
+    def __init__(self, under, cluster_total, cluster_weight_sum, cluster_max, cluster_mean, cluster_pct):
+        self.under = under                          # (N, U) medel 1–5
+        self.cluster_total = cluster_total          # (N, K) Σ(under × vikt)
+        self.cluster_weight_sum = cluster_weight_sum  # (N, K) Σ vikt (bara underbeteenden med värde)
+        self.cluster_max = cluster_max              # (N, K) 5 × Σ vikt
+        self.cluster_mean = cluster_mean            # (N, K) total / Σ vikt
+        self.cluster_pct = cluster_pct              # (N, K) 0..100
+
+
+def score_matrix(fw: CompiledFramework, X: np.ndarray) -> ScoreResult:
+    """
+    X: (N, C) kompetenspoäng i fw.competencies-ordning, NaN där värde saknas.
+    Underbeteende = medel av de kompetenser som finns; kluster = Σ(under × vikt).
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+
+    sums, counts = _ordered_sum(X, fw.ub_members)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        under = np.where(counts > 0, sums / counts, np.nan)
+
+        # under × vikt är exakt (vikt 1 eller 2); saknade underbeteenden (NaN) hoppas över
+        total, _ = _ordered_sum(under * fw.ub_weights, fw.cluster_members)
+        weight_sum, _ = _ordered_sum(np.where(np.isnan(under), np.nan, fw.ub_weights), fw.cluster_members)
+
+        scored = weight_sum > 0
+        total = np.where(scored, total, np.nan)
+        cluster_max = np.where(scored, MAX_SCORE * weight_sum, np.nan)
+        mean = total / np.where(scored, weight_sum, np.nan)
+        pct = total / cluster_max * 100.0
+
+    return ScoreResult(under, total, weight_sum, cluster_max, mean, pct)
@@ -1,3 +1,904 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import warnings
+import zipfile
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import bulk_export, charts, metrics
+from .bulk_export import bulk_filename, stream_pdf_zip
+from .cohort import PCT_BINS, ColumnStats, ranked
+from .framework import FrameworkError, get_framework, load_framework
+from .ingest import UNREADABLE_MESSAGE, ExcelIngestError, read_candidates, widen_scores
+from .models import PdfJob, Report
+from .norms import NORM_DECIMALS, NormTable, get_norm_table, norm_table_path
+from .pdf_cache import PdfCache, pdf_cache_key
+from .pdf_jobs import _claim_next, enqueue_pdf_job, heartbeat, process_job, read_job_result, requeue_stale_jobs
+from .renderers import CLOSING_SECTION_LABEL, MAPPING_SECTION_LABEL, find_mapping_pages, get_renderer
+from .report_store import ReportStore, get_report_store
+from .scoring import score_matrix
+from .views import _build_report_data, _fmt, calculate_b3_underbehaviors_and_clusters, resolve_columns
+
+
+# ─────────────────────────────────────────
+# Poängsättning
+# ─────────────────────────────────────────
+
+def _random_candidates(competencies, n: int, seed: int = 7, missing: float = 0.05) -> np.ndarray:
+    """(n, C) slumpade poäng med två decimaler, som i Excel-exporten. NaN = tom cell."""
+    rng = np.random.default_rng(seed)
+    X = np.round(rng.uniform(1.0, 5.0, size=(n, len(competencies))), 2)
+    X[rng.random(X.shape) < missing] = np.nan
+    return X
+
+
+def _baseline_scores(definition, values: Dict[str, float]) -> Dict[str, Any]:
+    """Den ursprungliga radvisa beräkningen (före score_matrix), som referens."""
+    under: List[Optional[float]] = []
+    weights: List[float] = []
+    cluster_order: List[str] = []
+    for beh in definition:
+        comp_values = [values[c] for c in beh.get("competencies", []) if c in values]
+        under.append(sum(comp_values) / len(comp_values) if comp_values else None)
+        weights.append(2.0 if float(beh.get("weight", 1.0)) >= 2.0 else 1.0)
+        if beh.get("cluster") not in cluster_order:
+            cluster_order.append(beh.get("cluster"))
+
+    clusters = []
+    for name in cluster_order:
+        items = [
+            (under[u], weights[u])
+            for u, beh in enumerate(definition)
+            if beh.get("cluster") == name and under[u] is not None
+        ]
+        if not items:
+            clusters.append(None)
+            continue
+        total = sum(score * w for score, w in items)
+        max_total = sum(5.0 * w for _, w in items)
+        pct = total / max_total * 100.0
+        clusters.append({
+            "total": total,
+            "max_total": max_total,
+            "mean": total / sum(w for _, w in items),
+            "pct": pct,
+            "pct_text": min(100, int(math.ceil(pct))),
+        })
+    return {"under": under, "clusters": clusters}
+
+
+class ScoringParityTests(SimpleTestCase):
+    """score_matrix och rapportens kluster ska bli exakt som den radvisa beräkningen."""
+
+    N = 2000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.framework = get_framework()
+        cls.fw = cls.framework.compiled
+        cls.X = _random_candidates(cls.fw.competencies, cls.N)
+
+    def _values(self, row: np.ndarray) -> Dict[str, float]:
+        return {c: float(v) for c, v in zip(self.fw.competencies, row) if not math.isnan(v)}
+
+    def test_score_matrix_matches_row_by_row(self):
+        result = score_matrix(self.fw, self.X)
+        for i, row in enumerate(self.X):
+            expected = _baseline_scores(self.fw.underbehaviors, self._values(row))
+            for u, score in enumerate(expected["under"]):
+                got = result.under[i, u]
+                self.assertEqual(None if math.isnan(got) else float(got), score)
+            for k, cluster in enumerate(expected["clusters"]):
+                if cluster is None:
+                    self.assertTrue(math.isnan(result.cluster_total[i, k]))
+                    continue
+                self.assertEqual(result.cluster_total[i, k], cluster["total"])
+                self.assertEqual(result.cluster_max[i, k], cluster["max_total"])
+                self.assertEqual(result.cluster_mean[i, k], cluster["mean"])
+                self.assertEqual(result.cluster_pct[i, k], cluster["pct"])
+
+    def test_report_percent_and_totals_match_row_by_row(self):
+        for row in self.X:
+            expected = _baseline_scores(self.fw.underbehaviors, self._values(row))
+            _, clusters, *_ = calculate_b3_underbehaviors_and_clusters(row, self.framework)
+            for cluster, exp in zip(clusters, expected["clusters"]):
+                if exp is None:
+                    self.assertIsNone(cluster["total_score"])
+                    continue
+                self.assertEqual(cluster["pct_total_text"], exp["pct_text"])
+                self.assertEqual(cluster["pct_total_ratio"], exp["total"] / exp["max_total"])
+                self.assertEqual(_fmt(cluster["total_score"]), _fmt(exp["total"]))
+
+
+class ColumnResolutionTests(SimpleTestCase):
+    def test_blank_cells_share_one_header_resolution(self):
+        framework = get_framework()
+        labels = list(framework.compiled.competencies)
+        X = _random_candidates(labels, 50, missing=0.1)
+
+        resolve_columns.cache_clear()
+        for i, row in enumerate(X):
+            report_data = _build_report_data(f"Kandidat {i}", labels, row, framework)
+            self.assertEqual(len(report_data["competencies"]), int(np.count_nonzero(~np.isnan(row))))
+        self.assertEqual(resolve_columns.cache_info().misses, 1)
+
+
+# ─────────────────────────────────────────
+# Excel-inläsning
+# ─────────────────────────────────────────
+
+def _workbook(rows: Sequence[Sequence[Any]], active_sheet_rows: Optional[Sequence[Sequence[Any]]] = None) -> io.BytesIO:
+    """Riktig .xlsx skriven av openpyxl (strängar som inlineStr). Med active_sheet_rows blir ett andra ark aktivt."""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    for row in rows:
+        wb.active.append(list(row))
+    if active_sheet_rows is not None:
+        other = wb.create_sheet("Annat")
+        for row in active_sheet_rows:
+            other.append(list(row))
+        wb.active = 1
+    out = io.BytesIO()
+    wb.save(out)
+    out.seek(0)
+    out.name = "kandidater.xlsx"
+    return out
+
+
+def _rewrite_sheet(workbook: io.BytesIO, edit) -> io.BytesIO:
+    """Samma arbetsbok med första arkets XML ändrad av edit(str) -> str."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(workbook) as src, zipfile.ZipFile(out, "w") as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = edit(data.decode("utf-8")).encode("utf-8")
+            dst.writestr(item, data)
+    out.seek(0)
+    out.name = workbook.name
+    return out
+
+
+_HEADER = ["First Name", "Last Name", "Competency Score: Drive (STIVE)", "Item 1", "Competency Score: Networking (STIVE)"]
+
+
+class IngestTests(SimpleTestCase):
+    def test_reads_names_labels_and_scores(self):
+        names, labels, values = read_candidates(_workbook([
+            _HEADER,
+            ["Anna", "Berg", 3.35, "x", 4],
+            ["Bo", None, 2.1, None, 4.99],
+        ]))
+        self.assertEqual(names, ["Anna Berg", "Bo"])
+        self.assertEqual(labels, ["Drive", "Networking"])
+        self.assertEqual(values.dtype, np.float32)
+        self.assertEqual(widen_scores(values).tolist(), [[3.35, 4.0], [2.1, 4.99]])  # exakt filens tal
+
+    def test_widen_scores_restores_two_decimal_values(self):
+        exact = np.round(np.random.default_rng(3).uniform(0.0, 100.0, size=5000), 2)
+        np.testing.assert_array_equal(widen_scores(exact.astype(np.float32)), exact)
+
+    def test_non_numeric_and_empty_cells_are_missing(self):
+        names, _, values = read_candidates(_workbook([
+            _HEADER,
+            ["Anna", None, datetime(2026, 1, 1), None, "#N/A"],  # datum, fel
+            ["Bo", None, "abc", None, True],
+            ["Cia", None, "2.5", None, None],  # text som går att tolka som tal räknas
+            [None, None, None, "bara item-kolumnen", None],  # inget vi använder: hoppas över
+            ["Dan"],  # kort rad
+        ]))
+        self.assertEqual(names, ["Anna", "Bo", "Cia", "Dan"])
+        self.assertTrue(np.isnan(values[:2]).all())
+        self.assertEqual(values[2, 0], 2.5)
+        self.assertTrue(np.isnan(values[2, 1]))
+        self.assertTrue(np.isnan(values[3]).all())
+
+    def test_reads_the_first_sheet(self):
+        names, _, _ = read_candidates(_workbook([_HEADER, ["Anna", "Berg", 3, None, 4]], active_sheet_rows=[["annat"]]))
+        self.assertEqual(names, ["Anna Berg"])
+
+    def test_missing_competency_columns(self):
+        with self.assertRaisesMessage(ExcelIngestError, "Competency Score:"):
+            read_candidates(_workbook([["First Name"], ["Anna"]]))
+
+    def test_empty_sheet(self):
+        with self.assertRaisesMessage(ExcelIngestError, "tom"):
+            read_candidates(_workbook([]))
+        with self.assertRaisesMessage(ExcelIngestError, "tom"):
+            read_candidates(_workbook([_HEADER]))
+
+    def test_not_a_zip(self):
+        f = io.BytesIO(b"inte en excel-fil")
+        f.name = "test.xlsx"
+        with self.assertRaisesMessage(ExcelIngestError, UNREADABLE_MESSAGE):
+            read_candidates(f)
+
+    def test_broken_rows_after_header(self):
+        workbook = _workbook([_HEADER, ["Anna", "Berg", 3, None, 4]])
+        # Trasig XML efter headern
+        broken = _rewrite_sheet(workbook, lambda xml: xml.replace("</sheetData>", "<row><c></sheetData>"))
+        with self.assertRaisesMessage(ExcelIngestError, UNREADABLE_MESSAGE):
+            read_candidates(broken)
+        # Avklippt fil
+        workbook.seek(0)
+        cut = io.BytesIO(workbook.getvalue()[: len(workbook.getvalue()) // 2])
+        cut.name = "test.xlsx"
+        with self.assertRaisesMessage(ExcelIngestError, UNREADABLE_MESSAGE):
+            read_candidates(cut)
+
+
+# ─────────────────────────────────────────
+# Normtabeller
+# ─────────────────────────────────────────
+
+def _brute_force_percentiles(norm: np.ndarray, M: np.ndarray) -> np.ndarray:
+    """Mittrang kolumn för kolumn: andel under + halva andelen lika, NaN där värde saknas."""
+    norm, M = np.round(norm, NORM_DECIMALS), np.round(M, NORM_DECIMALS)
+    out = np.full(M.shape, np.nan)
+    for j in range(M.shape[1]):
+        column = norm[:, j][~np.isnan(norm[:, j])]
+        for i, v in enumerate(M[:, j]):
+            if not np.isnan(v) and len(column):
+                out[i, j] = (np.count_nonzero(column < v) + 0.5 * np.count_nonzero(column == v)) * 100.0 / len(column)
+    return out
+
+
+class NormTableTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.framework = get_framework()
+        cls.fw = cls.framework.compiled
+        cls.norm_group = _random_candidates(cls.fw.competencies, 300, seed=3)
+        cls.table = NormTable.build(cls.fw, cls.norm_group)
+
+    def test_competency_ranks_match_brute_force(self):
+        Q = _random_candidates(self.fw.competencies, 40, seed=11)
+        Q[0] = self.norm_group[0]  # exakt lika värden som i normgruppen
+        Q[1] = 0.5                 # under hela gruppen
+        Q[2] = 5.5                 # över hela gruppen
+        np.testing.assert_array_equal(
+            self.table.competency_percentiles(Q), _brute_force_percentiles(self.norm_group, Q)
+        )
+
+    def test_cluster_ranks_match_brute_force(self):
+        Q = _random_candidates(self.fw.competencies, 40, seed=12)
+        norm_pct = score_matrix(self.fw, self.norm_group).cluster_pct
+        pct = score_matrix(self.fw, Q).cluster_pct
+        np.testing.assert_array_equal(self.table.cluster_percentiles(pct), _brute_force_percentiles(norm_pct, pct))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "norms.npz"
+            self.table.save(path)
+            loaded = NormTable.load(path)
+        self.assertEqual(loaded.version, self.table.version)
+        self.assertEqual(loaded.size, 300)
+        self.assertTrue(loaded.matches(self.fw))
+        Q = _random_candidates(self.fw.competencies, 10, seed=13)
+        np.testing.assert_array_equal(loaded.competency_percentiles(Q), self.table.competency_percentiles(Q))
+
+    def test_tables_are_per_framework(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(REPORT_NORM_DIR=tmp):
+            other_path = Path(tmp) / "acme.yaml"
+            shutil.copy(self.framework.path, other_path)
+            other = load_framework(other_path)
+
+            self.assertIsNone(get_norm_table(self.framework))
+            self.table.save(norm_table_path(self.framework))
+            self.assertEqual(norm_table_path(self.framework).name, f"b3-{self.fw.version}.npz")
+            self.assertEqual(get_norm_table(self.framework).version, self.table.version)
+            self.assertIsNone(get_norm_table(other))  # samma poängsättning, men ingen egen tabell
+
+        with override_settings(REPORT_NORM_DIR=""):
+            self.assertIsNone(get_norm_table(self.framework))
+
+
+# ─────────────────────────────────────────
+# Rapportlager
+# ─────────────────────────────────────────
+
+class ReportStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.names = ["Anna Berg", "Bo Ek"]
+        self.labels = ["Drive", "Networking"]
+        self.values = np.array([[3.35, np.nan], [4.0, 2.1]], dtype=np.float32)
+
+    def test_round_trip(self):
+        report = ReportStore(self.dir, ttl=3600).put(self.names, self.labels, self.values, "v1")
+        self.assertTrue(self.dir.joinpath(report.id[:2], f"{report.id}.json").exists())
+
+        loaded = ReportStore(self.dir, ttl=3600).get(report.id)  # ny process: läses från disk
+        self.assertEqual((loaded.id, loaded.names, loaded.labels, loaded.framework_version), (report.id, self.names, self.labels, "v1"))
+        np.testing.assert_array_equal(loaded.values, self.values)
+        self.assertEqual(loaded.row(0)[0], 3.35)
+        self.assertTrue(np.isnan(loaded.row(0)[1]))
+
+    def test_id_is_content_hash(self):
+        store = ReportStore(self.dir, ttl=3600)
+        report = store.put(self.names, self.labels, self.values, "v1")
+        self.assertEqual(store.put(self.names, self.labels, self.values, "v1").id, report.id)
+        self.assertNotEqual(store.put(self.names, self.labels, self.values, "v2").id, report.id)
+        self.assertNotEqual(store.put(self.names, self.labels, self.values + 1, "v1").id, report.id)
+
+    def test_unknown_and_invalid_ids(self):
+        store = ReportStore(self.dir, ttl=3600)
+        self.assertIsNone(store.get("0" * 32))
+        for bad in (None, "", "../../etc/passwd", "A" * 32, "0" * 31):
+            self.assertIsNone(store.get(bad))
+
+    def test_purge_removes_expired_reports(self):
+        store = ReportStore(self.dir, ttl=60, memory_items=0)
+        old = store.put(self.names, self.labels, self.values, "v1")
+        fresh = store.put(self.names, self.labels, self.values, "v2")
+        path = self.dir / old.id[:2] / f"{old.id}.json"
+        expired = time.time() - 120
+        os.utime(path, (expired, expired))
+
+        self.assertEqual(store.purge(), 1)
+        self.assertIsNone(store.get(old.id))
+        self.assertIsNotNone(store.get(fresh.id))
+
+    def test_get_keeps_a_report_alive(self):
+        store = ReportStore(self.dir, ttl=60, memory_items=0)
+        report = store.put(self.names, self.labels, self.values, "v1")
+        path = self.dir / report.id[:2] / f"{report.id}.json"
+        expired = time.time() - 120
+        os.utime(path, (expired, expired))
+
+        self.assertIsNotNone(store.get(report.id))  # läst = används
+        self.assertEqual(store.purge(), 0)
+
+
+# ─────────────────────────────────────────
+# PDF utan mappning (en rendering, sidklippning)
+# ─────────────────────────────────────────
+
+def _page_texts(pdf_bytes: bytes) -> List[str]:
+    from pypdf import PdfReader
+
+    return [page.extract_text() or "" for page in PdfReader(io.BytesIO(pdf_bytes)).pages]
+
+
+class MappingPagesTests(SimpleTestCase):
+    def test_sliced_pdf_drops_exactly_the_mapping_pages(self):
+        framework = get_framework()
+        labels = list(framework.compiled.competencies)
+        report_data = _build_report_data("Anna Berg", labels, _random_candidates(labels, 1, seed=17)[0], framework)
+        renderer = get_renderer("native")
+
+        full, mapping_pages = renderer.render_full(report_data)
+        self.assertIsNotNone(mapping_pages)
+        self.assertEqual(find_mapping_pages(full), mapping_pages)  # textsökningen hittar samma sidor
+        full_texts = _page_texts(full)
+        self.assertGreater(len(mapping_pages), 0)
+        self.assertLess(mapping_pages.stop, len(full_texts))  # avslutningen ligger efter
+
+        both = renderer.render_both(report_data)
+        self.assertEqual(_page_texts(both[True]), full_texts)
+        sliced = _page_texts(both[False])
+        kept = [text for i, text in enumerate(full_texts) if i not in mapping_pages]
+        self.assertEqual(sliced, kept)
+        self.assertFalse(any(MAPPING_SECTION_LABEL in text for text in sliced))
+        self.assertIn(CLOSING_SECTION_LABEL, sliced[mapping_pages.start])  # avslutningen direkt efter resultaten
+
+        # Samma sidor som en separat rendering utan mappning
+        self.assertEqual(sliced, _page_texts(renderer.render(report_data, show_mapping=False)))
+
+
+# ─────────────────────────────────────────
+# PDF-cache
+# ─────────────────────────────────────────
+
+class PdfCacheTests(SimpleTestCase):
+    def test_key_is_stable_and_covers_inputs(self):
+        a = {"full_name": "Anna", "b3_clusters": [{"pct_total": 47.0}], "avg_score": 3.1}
+        b = {"avg_score": 3.1, "b3_clusters": [{"pct_total": 47.0}], "full_name": "Anna"}
+        key = pdf_cache_key(a, True, "native")
+        self.assertEqual(key, pdf_cache_key(b, True, "native"))
+        self.assertNotEqual(key, pdf_cache_key(a, False, "native"))
+        self.assertNotEqual(key, pdf_cache_key(a, True, "chromium"))
+        self.assertNotEqual(key, pdf_cache_key({**a, "avg_score": 3.2}, True, "native"))
+
+    def test_put_get_and_evict(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PdfCache(Path(tmp), max_bytes=1500)
+            self.assertIsNone(cache.get("a" * 64))
+            cache.put("a" * 64, b"%PDF" + b"a" * 996)
+            self.assertEqual(cache.get("a" * 64)[:4], b"%PDF")
+            cache.put("b" * 64, b"%PDF" + b"b" * 996)  # ryms inte båda – den äldsta försvinner
+            self.assertIsNone(cache.get("a" * 64))
+            self.assertIsNotNone(cache.get("b" * 64))
+            self.assertEqual(cache.stats()["hits"], 2)
+
+
+# ─────────────────────────────────────────
+# Jobbkö för PDF
+# ─────────────────────────────────────────
+
+class PdfJobTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        overrides = override_settings(REPORT_PDF_JOB_DIR=self.tmp.name, REPORT_PDF_CACHE_MAX_BYTES=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        framework = get_framework()
+        labels = list(framework.compiled.competencies)
+        row = _random_candidates(labels, 1, seed=21)[0]
+        self.report_data = _build_report_data("Anna Berg", labels, row, framework)
+
+    def test_enqueue_claim_and_render(self):
+        job = enqueue_pdf_job(self.report_data, True, "native", "session-1")
+        self.assertEqual(job.status, PdfJob.QUEUED)
+
+        claimed = _claim_next()
+        self.assertEqual(claimed.id, job.id)
+        self.assertIsNone(_claim_next())  # redan claimat
+
+        process_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertTrue(read_job_result(job).startswith(b"%PDF"))
+
+    def test_failed_render_is_recorded(self):
+        job = enqueue_pdf_job(self.report_data, True, "native", "session-1")
+        with mock.patch("reports.renderers.NativeRenderer.render", side_effect=RuntimeError("trasig layout")), \
+                self.assertLogs("reports.pdf_jobs", level="ERROR"):
+            process_job(_claim_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.FAILED)
+        self.assertEqual(job.error, "trasig layout")
+        self.assertIsNone(read_job_result(job))
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = enqueue_pdf_job(self.report_data, True, "native", "session-1")
+        _claim_next()
+        self.assertEqual(requeue_stale_jobs(timedelta(seconds=60)), (0, 0))  # färsk heartbeat: rörs inte
+        self.assertEqual(requeue_stale_jobs(timedelta(seconds=-1)), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.QUEUED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_heartbeat_keeps_a_slow_render_running(self):
+        job = enqueue_pdf_job(self.report_data, True, "native", "session-1")
+        _claim_next()
+        PdfJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(heartbeat({job.id}), 1)
+        self.assertEqual(requeue_stale_jobs(timedelta(seconds=60)), (0, 0))
+        PdfJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(requeue_stale_jobs(timedelta(seconds=60)), (1, 0))
+
+    def test_job_fails_after_max_attempts(self):
+        job = enqueue_pdf_job(self.report_data, True, "native", "session-1")
+        for attempt in range(1, 4):
+            claimed = _claim_next()
+            self.assertEqual(claimed.attempts, attempt)
+            requeued, failed = requeue_stale_jobs(timedelta(seconds=-1), max_attempts=3)
+        self.assertEqual((requeued, failed), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.FAILED)
+        self.assertIn("3 gånger", job.error)
+        self.assertIsNone(_claim_next())
+
+    def test_requeued_claim_does_not_overwrite_the_new_one(self):
+        enqueue_pdf_job(self.report_data, True, "native", "session-1")
+        first = _claim_next()
+        requeue_stale_jobs(timedelta(seconds=-1))
+        second = _claim_next()
+        process_job(first)  # den gamla workern blir klar ändå
+        second.refresh_from_db()
+        self.assertEqual(second.status, PdfJob.RUNNING)
+        process_job(second)
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.attempts), (PdfJob.DONE, 2))
+
+
+# ─────────────────────────────────────────
+# Bulk-export
+# ─────────────────────────────────────────
+
+def _collect(chunks) -> bytes:
+    async def run() -> bytes:
+        return b"".join([chunk async for chunk in chunks])
+
+    return asyncio.run(run())
+
+
+@override_settings(REPORT_PDF_CACHE_MAX_BYTES=0)
+class BulkExportTests(SimpleTestCase):
+    def setUp(self):
+        framework = get_framework()
+        labels = list(framework.compiled.competencies)
+        rows = _random_candidates(labels, 3, seed=31)
+        self.entries = [
+            (bulk_filename(i, 4, name), partial(_build_report_data, name, labels, rows[i - 1], framework))
+            for i, name in enumerate(["Anna Berg", "Bo Ek", "Åsa Öberg"], start=1)
+        ]
+
+        def broken():
+            raise ValueError("trasig rad")
+
+        self.entries.append((bulk_filename(4, 4, "Cia Lind"), broken))
+
+    def _check_zip(self, data: bytes) -> None:
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertIsNone(zf.testzip())
+            names = zf.namelist()
+            self.assertEqual(sorted(names), ["1_anna-berg.pdf", "2_bo-ek.pdf", "3_asa-oberg.pdf", "FEL.txt"])
+            self.assertEqual(names[-1], "FEL.txt")
+            for name in names[:-1]:
+                self.assertTrue(zf.read(name).startswith(b"%PDF"))
+            self.assertIn("4_cia-lind.pdf", zf.read("FEL.txt").decode("utf-8"))
+
+    @override_settings(REPORT_BULK_PARALLELISM=1)
+    def test_zip_has_one_pdf_per_entry(self):
+        with self.assertLogs("reports.bulk_export", level="ERROR"):
+            self._check_zip(_collect(stream_pdf_zip(self.entries, get_renderer("native"))))
+
+    @override_settings(REPORT_BULK_PARALLELISM=2, REPORT_BULK_PROCESS_IDLE=0.2)
+    def test_process_pool_shuts_down_when_idle(self):
+        self.addCleanup(bulk_export.shutdown_render_processes)
+        with self.assertLogs("reports.bulk_export", level="ERROR"):
+            self._check_zip(_collect(stream_pdf_zip(self.entries, get_renderer("native"))))
+        self.assertIsNotNone(bulk_export._processes)
+        for _ in range(100):
+            if bulk_export._processes is None:
+                break
+            time.sleep(0.05)
+        self.assertIsNone(bulk_export._processes)
+
+
+# ─────────────────────────────────────────
+# Metrics
+# ─────────────────────────────────────────
+
+def _dead_pid() -> int:
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    return child.pid
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        overrides = override_settings(REPORT_METRICS_DIR=tmp.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for patcher in (
+            mock.patch("reports.metrics._process", None),  # ingen egen processfil i testerna
+            mock.patch("reports.metrics._collect_jobs"),   # kön ligger i databasen
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _process(self, flush_interval: float = 60.0) -> metrics.ProcessMetrics:
+        return metrics.ProcessMetrics(self.dir, flush_interval)
+
+    def _lines(self) -> List[str]:
+        return metrics.render_metrics().splitlines()
+
+    def test_updates_stay_in_memory_until_flushed(self):
+        process = self._process(flush_interval=0.05)
+        process.add("reports_uploads_total", 1, (("result", "ok"),))
+        self.assertFalse(process.path.exists())  # add() skriver aldrig själv
+        for _ in range(100):
+            if process.path.exists():
+                break
+            time.sleep(0.02)
+        self.assertTrue(process.path.exists())  # bakgrundstråden skrev filen
+
+    def test_two_processes_are_summed(self):
+        a, b = self._process(), self._process()
+        view = (("view", "upload"),)
+        a.add("reports_uploads_total", 2, (("result", "ok"),))
+        b.add("reports_uploads_total", 3, (("result", "ok"),))
+        b.add("reports_uploads_total", 1, (("result", "error"),))
+        a.add("reports_pdf_renders_in_flight", 1, (("backend", "native"),))
+        for value in (0.004, 0.3):
+            a.observe("reports_request_seconds", value, view)
+        b.observe("reports_request_seconds", 7.0, view)
+        b.observe("reports_request_seconds", 120.0, view)  # över största bucketen
+        a.flush()
+        b.flush()
+
+        lines = self._lines()
+        self.assertIn('reports_uploads_total{result="ok"} 5', lines)
+        self.assertIn('reports_uploads_total{result="error"} 1', lines)
+        self.assertIn('reports_pdf_renders_in_flight{backend="native"} 1', lines)
+        self.assertIn("# TYPE reports_request_seconds histogram", lines)
+        self.assertIn('reports_request_seconds_bucket{view="upload",le="0.005"} 1', lines)
+        self.assertIn('reports_request_seconds_bucket{view="upload",le="0.25"} 1', lines)
+        self.assertIn('reports_request_seconds_bucket{view="upload",le="0.5"} 2', lines)
+        self.assertIn('reports_request_seconds_bucket{view="upload",le="10"} 3', lines)
+        self.assertIn('reports_request_seconds_bucket{view="upload",le="60"} 3', lines)
+        self.assertIn('reports_request_seconds_bucket{view="upload",le="+Inf"} 4', lines)
+        self.assertIn('reports_request_seconds_sum{view="upload"} 127.304', lines)
+        self.assertIn('reports_request_seconds_count{view="upload"} 4', lines)
+
+    def test_dead_processes_are_archived_without_losing_counters(self):
+        live = self._process()
+        live.add("reports_uploads_total", 1, (("result", "ok"),))
+        live.flush()
+
+        def write_dead(name: str, uploads: float, seconds: float) -> Path:
+            path = self.dir / f"{name}.json"
+            path.write_text(json.dumps({"pid": _dead_pid(), "values": {
+                "reports_uploads_total": [[[["result", "ok"]], uploads]],
+                "reports_pdf_renders_in_flight": [[[["backend", "native"]], 1.0]],
+                "reports_request_seconds": [[[["view", "upload"]], [1] + [0] * 13 + [seconds, 1]]],
+            }}), encoding="utf-8")
+            return path
+
+        first = write_dead("1-dead", 4, 0.001)
+        lines = self._lines()
+        self.assertFalse(first.exists())
+        self.assertTrue((self.dir / "archive.json").exists())
+        self.assertIn('reports_uploads_total{result="ok"} 5', lines)
+        self.assertNotIn('reports_pdf_renders_in_flight{backend="native"} 1', lines)  # gauges dör med processen
+
+        write_dead("2-dead", 10, 0.002)
+        self.assertIn('reports_uploads_total{result="ok"} 15', self._lines())
+        lines = self._lines()  # arkivet räknas bara en gång
+        self.assertIn('reports_uploads_total{result="ok"} 15', lines)
+        self.assertIn('reports_request_seconds_count{view="upload"} 2', lines)
+        self.assertIn('reports_request_seconds_bucket{view="upload",le="0.005"} 2', lines)
+
+
+# ─────────────────────────────────────────
+# Gruppsammanställning
+# ─────────────────────────────────────────
+
+class CohortStatsTests(SimpleTestCase):
+    def test_column_stats_match_numpy(self):
+        M = np.random.default_rng(5).uniform(0.0, 100.0, size=(97, 4))
+        M[::7, 1] = np.nan
+        M[:, 3] = np.nan  # kolumn utan värden
+        stats = ColumnStats(M, PCT_BINS)
+
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN-kolumnen
+            np.testing.assert_allclose(stats.mean, np.nanmean(M, axis=0))
+            np.testing.assert_allclose(stats.std, np.nanstd(M, axis=0))
+            np.testing.assert_allclose(stats.min, np.nanmin(M, axis=0))
+            np.testing.assert_allclose(stats.max, np.nanmax(M, axis=0))
+            for q, got in zip((0.25, 0.5, 0.75), (stats.q1, stats.median, stats.q3)):
+                np.testing.assert_allclose(got, np.nanquantile(M, q, axis=0))
+
+        self.assertEqual(stats.count.tolist(), [97, 83, 97, 0])
+        for j in range(3):
+            column = M[:, j][~np.isnan(M[:, j])]
+            self.assertEqual(stats.histogram[j].tolist(), np.histogram(column, PCT_BINS)[0].tolist())
+        self.assertEqual(stats.row(3)["mean"], None)
+
+    def test_ranked_keeps_framework_order_on_ties(self):
+        top, low = ranked([3.0, np.nan, 4.0, 3.0, 1.0], 2)
+        self.assertEqual(top, [2, 0])
+        self.assertEqual(low, [4, 0])
+
+
+class BenchCommandTests(SimpleTestCase):
+    def test_unknown_backend_is_an_error(self):
+        with mock.patch("reports.management.commands.bench.run_benchmarks") as run:
+            with self.assertRaisesMessage(CommandError, "Okänd PDF-renderare: wkhtml"):
+                call_command("bench", sizes="1", backends="native,wkhtml", stdout=io.StringIO())
+        run.assert_not_called()
+
+
+# ─────────────────────────────────────────
+# Ramverk
+# ─────────────────────────────────────────
+
+B3_YAML = Path(__file__).resolve().parent / "frameworks" / "b3.yaml"
+PLAIN_STATIC = {"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}  # utan collectstatic
+
+
+def _acme_yaml() -> str:
+    """b3.yaml med eget namn och en ändrad vikt – samma kolumner, annan poängsättning."""
+    text = B3_YAML.read_text(encoding="utf-8")
+    text = text.replace("name: B3 ledarskap", "name: Acme ledarskap", 1)
+    return text.replace("    weight: 2\n", "    weight: 1\n", 1)
+
+
+def _candidate_workbook(competencies: Sequence[str], n: int, seed: int = 3) -> io.BytesIO:
+    values = _random_candidates(competencies, n, seed=seed, missing=0.0)
+    header = ["First Name", "Last Name"] + [f"Competency Score: {c} (STIVE)" for c in competencies]
+    return _workbook([header] + [[f"Kandidat{i}", "Test"] + row.tolist() for i, row in enumerate(values)])
+
+
+class FrameworkDefinitionTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def _write(self, key: str, text: str) -> Path:
+        path = self.dir / f"{key}.yaml"
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def test_malformed_definitions_raise(self):
+        broken = {
+            "syntax": ("clusters: [\n", "ogiltig YAML"),
+            "cluster": (
+                _acme_yaml().replace("  - cluster: Affärs- och värderingsdrivet ledarskap\n", "  - cluster: Okänt\n", 1),
+                "underbehaviors[0].cluster: 'Okänt' finns inte under clusters",
+            ),
+            "weight": (_acme_yaml().replace("    weight: 2\n", "    weight: 3\n", 1), "underbehaviors[1].weight: måste vara"),
+            "extra": (_acme_yaml() + "\nextra: 1\n", "okända nycklar: extra"),
+        }
+        for key, (text, message) in broken.items():
+            with self.subTest(key), self.assertRaisesMessage(FrameworkError, message):
+                load_framework(self._write(key, text))
+
+    def test_edited_file_is_reloaded(self):
+        path = self._write("acme", _acme_yaml())
+        with override_settings(REPORT_FRAMEWORK_DIR=str(self.dir)), \
+                mock.patch.dict("reports.framework._frameworks", clear=True):
+            first = get_framework("acme")
+            self.assertIs(get_framework("acme"), first)
+
+            def edit(text: str, step: int) -> None:
+                path.write_text(text, encoding="utf-8")
+                stat = path.stat()
+                os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step * 1_000_000_000))
+
+            edit(_acme_yaml().replace("name: Acme ledarskap", "name: Acme ledarskap 2"), 1)
+            second = get_framework("acme")
+            self.assertEqual(second.name, "Acme ledarskap 2")
+            self.assertNotEqual(second.version, first.version)
+            self.assertEqual(second.compiled.version, first.compiled.version)  # bara texter ändrade
+
+            # Trasig fil: det senast fungerande ramverket används
+            edit("clusters: [\n", 2)
+            with self.assertLogs("reports.framework", level="ERROR"):
+                self.assertIs(get_framework("acme"), second)
+
+    def test_cluster_colors_come_from_the_framework(self):
+        acme = load_framework(self._write("acme", _acme_yaml().replace('color: "#42BBC1"', 'color: "#123456"')))
+        labels = list(acme.compiled.competencies)
+        report_data = _build_report_data("Anna Berg", labels, _random_candidates(labels, 1)[0], acme)
+        self.assertEqual(report_data["b3_clusters"][0]["color"], "#123456")
+        self.assertIn('fill="#123456"', charts.chart_context(report_data)["radar_svg"])
+
+        # Utan color: märkesfärgen
+        plain = load_framework(self._write("plain", re.sub(r'\n    color: "#[0-9A-F]{6}"', "", _acme_yaml())))
+        report_data = _build_report_data("Anna Berg", labels, _random_candidates(labels, 1)[0], plain)
+        self.assertEqual(charts.radar_values_for(report_data)[2], (charts.BRAND_COLOR,) * 5)
+
+    def test_invalid_color_is_rejected(self):
+        path = self._write("acme", _acme_yaml().replace('color: "#42BBC1"', "color: turkos"))
+        with self.assertRaisesMessage(FrameworkError, "color: måste vara en färg"):
+            load_framework(path)
+
+
+class UploadTestCase(TestCase):
+    """Vyer mot ett eget rapportlager och en egen ramverkskatalog (b3 + acme) i tmp."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        frameworks = Path(tmp.name) / "frameworks"
+        frameworks.mkdir()
+        shutil.copy(B3_YAML, frameworks / "b3.yaml")
+        (frameworks / "acme.yaml").write_text(_acme_yaml(), encoding="utf-8")
+
+        overrides = override_settings(
+            REPORT_FRAMEWORK_DIR=str(frameworks),
+            REPORT_STORE_DIR=str(Path(tmp.name) / "store"),
+            REPORT_NORM_DIR="",
+            STORAGES=PLAIN_STATIC,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for patcher in (
+            mock.patch("reports.report_store._store", None),  # rapportlagret i tmp-katalogen
+            mock.patch.dict("reports.framework._frameworks", clear=True),  # ramverken ur tmp-katalogen
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class FrameworkSelectionTests(UploadTestCase):
+    def test_switching_framework_rescores_without_touching_saved_reports(self):
+        b3, acme = get_framework("b3"), get_framework("acme")
+        self.assertNotEqual(b3.compiled.version, acme.compiled.version)
+
+        upload = _candidate_workbook(b3.compiled.competencies, 3)
+        response = self.client.post(reverse("report_upload"), {"file": upload, "framework": "b3"})
+        self.assertEqual(response.status_code, 200)
+        permalink = response.context["report_permalink"]
+        b3_totals = [c["total_score"] for c in response.context["b3_clusters"]]
+        saved = list(Report.objects.order_by("row_index").values_list("pk", "framework", "framework_version"))
+        self.assertEqual(len(saved), 3)
+        self.assertEqual({row[1:] for row in saved}, {("b3", b3.compiled.version)})
+
+        # En annan session byter ramverk på samma fil
+        other = Client()
+        upload.seek(0)
+        other.post(reverse("report_upload"), {"file": upload, "framework": "b3"})
+        response = other.get(reverse("report_upload"), {"framework": "acme"})
+        self.assertEqual(response.context["current_framework"].key, "acme")
+        self.assertNotEqual([c["total_score"] for c in response.context["b3_clusters"]], b3_totals)
+        self.assertIsNone(response.context["report_permalink"])  # inga acme-rader – en GET skriver inget
+
+        self.assertEqual(
+            list(Report.objects.order_by("row_index").values_list("pk", "framework", "framework_version")), saved
+        )
+        response = self.client.get(permalink)
+        self.assertEqual(response.context["framework"]["key"], "b3")
+        self.assertEqual([c["total_score"] for c in response.context["b3_clusters"]], b3_totals)
+
+        # Samma fil uppladdad med acme: egna rader, de gamla orörda
+        upload.seek(0)
+        response = other.post(reverse("report_upload"), {"file": upload, "framework": "acme"})
+        self.assertEqual(Report.objects.filter(framework="acme", framework_version=acme.compiled.version).count(), 3)
+        self.assertEqual(Report.objects.filter(framework="b3").count(), 3)
+        self.assertNotEqual(response.context["report_permalink"], permalink)
+
+
+# ─────────────────────────────────────────
+# Permalänkar
+# ─────────────────────────────────────────
+
+@override_settings(REPORT_PDF_CACHE_MAX_BYTES=0)
+class PermalinkTests(UploadTestCase):
+    def setUp(self):
+        super().setUp()
+        competencies = get_framework("b3").compiled.competencies
+        self.client.post(reverse("report_upload"), {"file": _candidate_workbook(competencies, 2), "framework": "b3"})
+        self.saved = Report.objects.get(row_index=1)
+
+    def test_permalink_renders_the_saved_report_without_a_session(self):
+        response = Client().get(reverse("report_permalink", args=[self.saved.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["full_name"], self.saved.full_name)
+        self.assertEqual(response.context["framework"]["key"], "b3")
+        self.assertEqual(response.context["report_permalink"], reverse("report_permalink", args=[self.saved.pk]))
+
+        response = Client().get(reverse("report_permalink_pdf", args=[self.saved.pk]), {"backend": "native"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(response.content.startswith(b"%PDF"))
+
+    def test_permalink_survives_an_expired_upload(self):
+        store = get_report_store()
+        store.ttl = -1  # allt i lagret är utgånget
+        self.assertEqual(store.purge(), 1)
+        self.assertIsNone(store.get(self.saved.upload_id))
+        response = Client().get(reverse("report_permalink", args=[self.saved.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_id_is_404(self):
+        missing = uuid.uuid4()
+        self.assertEqual(self.client.get(reverse("report_permalink", args=[missing])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("report_permalink_pdf", args=[missing])).status_code, 404)
+        self.assertEqual(self.client.get("/r/inte-ett-id/").status_code, 404)
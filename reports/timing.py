@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, List, Tuple
+
+
+# ─────────────────────────────────────────
+# Tidtagning per steg (Server-Timing)
+# ─────────────────────────────────────────
+#
+# Med settings.REPORT_TIMING på får varje request en StageTimer. Vyer och
+# renderare omsluter sina steg med `stage_timer(request).stage("namn")`, och
+# middleware skriver stegen som Server-Timing-header + en loggrad. Med
+# REPORT_TIMING av läggs middleware inte ens in (se settings.py) och
+# stage_timer() ger en no-op – inget mäts och inget allokeras. Middleware
+# finns i middleware.py.
+
+class StageTimer:
+    __slots__ = ("stages", "started")
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []  # (namn, ms) i den ordning de blev klara
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - t0) * 1000.0))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def header(self, total_ms: float) -> str:
+        """'parse;dur=12.3, render;dur=40.1, total;dur=60.0' – visas i webbläsarens devtools."""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages]
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+
+class _NullTimer:
+    """Används när tidtagning är av: stage() är en delad nullcontext."""
+
+    __slots__ = ()
+    stages: Tuple = ()
+    _stage = nullcontext()
+
+    def stage(self, name: str):
+        return self._stage
+
+
+NULL_TIMER = _NullTimer()
+
+
+def stage_timer(request) -> "StageTimer | _NullTimer":
+    """Requestens timer, eller NULL_TIMER om tidtagning är av (eller request saknas)."""
+    return getattr(request, "stage_timer", NULL_TIMER) if request is not None else NULL_TIMER
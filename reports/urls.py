@@ -1,9 +1,27 @@
 from django.urls import path
 from . import views
-from .views import upload_view, report_pdf_page, report_pdf_download
+from .views import (
+    upload_view,
+    report_pdf_page,
+    report_pdf_download,
+    report_permalink,
+    report_permalink_pdf,
+    report_pdf_bulk,
+    report_cohort,
+    report_pdf_job_create,
+    report_pdf_job_status,
+    report_pdf_job_download,
+)
 
 urlpatterns = [
     path("", upload_view, name="report_upload"),
     path("pdf/page/", report_pdf_page, name="report_pdf_page"),
     path("pdf/download/", report_pdf_download, name="report_pdf_download"),
-]
\ No newline at end of file
+    path("r/<uuid:report_id>/", report_permalink, name="report_permalink"),
+    path("r/<uuid:report_id>/pdf/", report_permalink_pdf, name="report_permalink_pdf"),
+    path("cohort/", report_cohort, name="report_cohort"),
+    path("pdf/bulk/", report_pdf_bulk, name="report_pdf_bulk"),
+    path("pdf/jobs/", report_pdf_job_create, name="report_pdf_job_create"),
+    path("pdf/jobs/<uuid:job_id>/", report_pdf_job_status, name="report_pdf_job_status"),
+    path("pdf/jobs/<uuid:job_id>/download/", report_pdf_job_download, name="report_pdf_job_download"),
+]
@@ -0,0 +1,146 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.utils.html import escape
+from django.template.defaultfilters import linebreaks_filter, slugify
+from django.utils.safestring import SafeString, mark_safe
+
+from . import charts
+
+
+# ─────────────────────────────────────────
+# View model för rapport-templates
+# ─────────────────────────────────────────
+#
+# report_data är platt (JSON i cache/jobb). Innan den renderas grupperas
+# underbeteendena under sina kluster och skalprickarna förrenderas, så att
+# _report_content.html bara loopar över det som faktiskt skrivs ut – i
+# stället för kluster × alla underbeteenden med filter, två gånger.
+# Statiska texter (klusterbeskrivningar, frågor, one-liners,
+# kompetensbeskrivningar) renderas en gång per ramverksversion.
+
+# ── Skalprickar ─────────────────────────
+
+@lru_cache(maxsize=None)
+def dots_html(half_steps: Optional[int]) -> SafeString:
+    """Fem prickar för ett halvsteg 0–10 (3.5 -> 7), eller 'Ingen data'."""
+    if half_steps is None:
+        return mark_safe('<span class="no-data">Ingen data</span>')
+    spans = []
+    for i in range(1, 6):
+        step = 2 * i
+        if half_steps >= step:
+            state = " is-on"
+        elif half_steps == step - 1:
+            state = " is-half"
+        else:
+            state = ""
+        spans.append(f'<span class="dot dot--small{state}"></span>')
+    return mark_safe("".join(spans))
+
+
+# ── Textfragment per ramverksversion ────
+
+FRAGMENT_VERSIONS = 4  # så många ramverksversioner hålls i minnet samtidigt
+
+_fragments: "OrderedDict[str, Dict[Tuple[str, str], SafeString]]" = OrderedDict()
+_fragments_lock = threading.Lock()
+
+
+def fragment(framework_version: str, kind: str, key: str, build: Callable[[], str]) -> SafeString:
+    """Förrenderad, statisk text. build() körs en gång per (version, kind, key)."""
+    with _fragments_lock:
+        by_version = _fragments.get(framework_version)
+        if by_version is None:
+            by_version = _fragments[framework_version] = {}
+            while len(_fragments) > FRAGMENT_VERSIONS:
+                _fragments.popitem(last=False)
+        else:
+            _fragments.move_to_end(framework_version)
+        html = by_version.get((kind, key))
+    if html is None:
+        html = mark_safe(build())
+        with _fragments_lock:
+            by_version[(kind, key)] = html
+    return html
+
+
+def _questions_html(questions: List[str]) -> str:
+    # Frågorna innehåller avsiktligt HTML (<strong> m.m.) – samma som |safe i templaten
+    return "".join(f"<li>{q}</li>" for q in questions)
+
+
+# ── Gruppering ──────────────────────────
+
+def _competency_rows(version: str, u: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "label": comp.get("label"),
+            "pct": comp.get("pct"),
+            "description_html": fragment(
+                version, "competency", comp.get("name") or "", lambda comp=comp: escape(comp.get("description", ""))
+            ),
+        }
+        for comp in u.get("mapped_competencies", [])
+    ]
+
+
+def cluster_groups(report_data: Dict[str, Any], show_mapping: bool = True) -> List[Dict[str, Any]]:
+    """Klustren i ordning, var och ett med sina underbeteenden och förrenderade prickar."""
+    version = report_data.get("framework_version", "")
+
+    by_cluster: Dict[Any, List[Dict[str, Any]]] = {}
+    for u in report_data.get("b3_underbehaviors", []):
+        row = {
+            "name": u.get("name"),
+            "dots_html": dots_html(u.get("score_5_half_steps")),
+        }
+        if show_mapping:
+            row["competencies"] = _competency_rows(version, u)
+            row["spacer"] = u.get("spacer")  # sidbrytning enligt ramverksfilen
+        by_cluster.setdefault(u.get("cluster"), []).append(row)
+
+    groups = []
+    for cluster in report_data.get("b3_clusters", []):
+        name = cluster.get("name")
+        description = cluster.get("description") or ""
+        groups.append({
+            "cluster": cluster,
+            "slug": cluster.get("slug", ""),
+            "title_slug": fragment(version, "title_slug", name, lambda: slugify(cluster.get("title", ""))),
+            "description_html": (
+                fragment(version, "cluster_description", name, lambda: linebreaks_filter(description))
+                if description else ""
+            ),
+            "underbehaviors": by_cluster.get(name, []),
+        })
+    return groups
+
+
+def _insight_fragments(report_data: Dict[str, Any]) -> Dict[str, Any]:
+    version = report_data.get("framework_version", "")
+    insights = report_data.get("insights") or {}
+    ctx: Dict[str, Any] = {}
+    for side, kind in (("most_natural", "top"), ("needs_development", "low")):
+        cluster = insights.get(side) or {}
+        name = cluster.get("name") or ""
+        ctx[f"{side}_slug"] = cluster.get("slug", "")
+
+        one_liner = insights.get(f"{side}_one_liner") or ""
+        ctx[f"{side}_one_liner_html"] = fragment(version, f"one_liner_{kind}", name, lambda: escape(one_liner))
+
+        questions = insights.get(f"{side}_questions") or []
+        ctx[f"{side}_questions_html"] = fragment(version, f"questions_{kind}", name, lambda: _questions_html(questions))
+    return ctx
+
+
+def report_context(report_data: Dict[str, Any], show_mapping: bool = True) -> Dict[str, Any]:
+    """Hela template-contexten för en rapport: report_data + diagram + grupperad view model."""
+    ctx = dict(report_data)
+    ctx.update(charts.chart_context(report_data))
+    ctx.update(_insight_fragments(report_data))
+    ctx["cluster_groups"] = cluster_groups(report_data, show_mapping)
+    ctx["show_mapping"] = show_mapping
+    return ctx
@@ -1,543 +1,56 @@
-import asyncio
+import logging
 import re
-from typing import Dict, Any, List, Optional, Tuple
-from urllib.parse import urlparse
+import uuid
+from functools import lru_cache, partial
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 import math
 
-import pandas as pd
+import numpy as np
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import HttpResponse
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.http import require_POST
 
-from playwright.async_api import async_playwright
-
+from . import metrics
+from .bulk_export import BulkEntry, bulk_filename, stream_pdf_zip
+from .cohort import TEAM_TOP_N, cohort_stats, ranked
 from .forms import ExcelUploadForm
+from .framework import Framework, FrameworkError, available_frameworks, default_framework_key, get_framework
+from .ingest import ExcelIngestError, read_candidates, widen_scores
+from .metrics import track_view
+from .models import PdfJob, Report
+from .norms import NormTable, get_norm_table
+from .pdf_cache import get_pdf_cache, pdf_cache_key
+from .pdf_jobs import enqueue_pdf_job, read_job_result
+from .renderers import get_renderer
+from .report_store import StoredReport, get_report_store
+from .scoring import CompiledFramework, score_matrix
+from .timing import stage_timer
+from .view_model import report_context
 
 
-# ─────────────────────────────────────────
-# B3-underbeteenden ↔ TQ-kompetenser
-# ─────────────────────────────────────────
-
-
-UNDERBEHAVIOR_HEAVY_WEIGHT = 2.0
-UNDERBEHAVIOR_NORMAL_WEIGHT = 1.0
-COMPETENCY_HEAVY_WEIGHT = 1.0
-
-B3_UNDERBEHAVIORS = [
-    # ─────────────────────────────────────────
-    # Affärs- och värderingsdrivet ledarskap
-    # ─────────────────────────────────────────
-    {
-        "cluster": "Affärs- och värderingsdrivet ledarskap",
-        "name": "Jag driver försäljning och bygger långsiktiga kundrelationer",
-        "competencies": ["Developing relationships", "Results orientation"],
-        "weighted_competencies": ["Results orientation"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-    {
-        "cluster": "Affärs- och värderingsdrivet ledarskap",
-        "name": "Jag följer upp mål och agerar snabbt när något behöver justeras",
-        "competencies": ["Adaptability", "Reliability"],
-        "weighted_competencies": ["Adaptability"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-    {
-        "cluster": "Affärs- och värderingsdrivet ledarskap",
-        "name": "Jag kommunicerar öppet och tydligt så att alla vet vad som gäller",
-        "competencies": ["Written communication"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Affärs- och värderingsdrivet ledarskap",
-        "name": "Jag lyfter och bekräftar medarbetare för att skapa engagemang och tillit",
-        "competencies": ["Engaging others"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Affärs- och värderingsdrivet ledarskap",
-        "name": "Jag attraherar rätt kompetens och formar team som matchar kundernas behov",
-        "competencies": ["Delegating", "Customer focus"],
-        "weighted_competencies": ["Customer focus"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Affärs- och värderingsdrivet ledarskap",
-        "name": "Jag stöttar teamet och visar riktning – både i medvind och motvind",
-        "competencies": ["Resilience", "Supporting others"],
-        "weighted_competencies": ["Supporting others"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-
-    # ─────────────────────────────────────────
-    # Kommunicera precist och tydligt
-    # ─────────────────────────────────────────
-
-    {
-        "cluster": "Kommunicera precist och tydligt",
-        "name": "Jag använder ett enkelt och tydligt språk för att undvika missförstånd",
-        "competencies": ["Written communication"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Kommunicera precist och tydligt",
-        "name": "Jag tar initiativ till samtal även när det är svårt, och förklarar syftet",
-        "competencies": ["Managing conflicts"],
-        "weighted_competencies": ["Managing conflicts"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-    {
-        "cluster": "Kommunicera precist och tydligt",
-        "name": "Jag lyfter fram det som fungerar och sprider goda exempel",
-        "competencies": ["Engaging others"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Kommunicera precist och tydligt",
-        "name": "Jag leder genom dialog och bjuder in till reflektion och gemensam förståelse",
-        "competencies": ["Directing others", "Organisational awareness"],
-        "weighted_competencies": ["Organisational awareness"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-    {
-        "cluster": "Kommunicera precist och tydligt",
-        "name": "Jag kommunicerar med respekt, mod och tydlighet för att skapa trygghet",
-        "competencies": ["Interpersonal communication", "Dealing with ambiguity"],
-        "weighted_competencies": ["Interpersonal communication"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-
-    # ─────────────────────────────────────────
-    # Bygg och främja en prestationsdriven kultur
-    # ─────────────────────────────────────────
-    {
-        "cluster": "Bygg och främja en prestationsdriven kultur",
-        "name": "Jag bygger team med kompletterande styrkor och kundfokus",
-        "competencies": ["Delegating", "Customer focus"],
-        "weighted_competencies": ["Delegating"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-    {
-        "cluster": "Bygg och främja en prestationsdriven kultur",
-        "name": "Jag skapar utrymme för idéer och initiativ",
-        "competencies": ["Embracing diversity", "Optimizing processes"],
-        "weighted_competencies": ["Embracing diversity"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Bygg och främja en prestationsdriven kultur",
-        "name": "Jag kommunicerar öppet och tydligt",
-        "competencies": ["Written communication"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Bygg och främja en prestationsdriven kultur",
-        "name": "Jag skapar trygghet där olika perspektiv ryms",
-        "competencies": ["Embracing diversity"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Bygg och främja en prestationsdriven kultur",
-        "name": "Jag bjuder in till engagemang genom dialog och samarbete",
-        "competencies": ["Networking", "Driving vision and purpose"],
-        "weighted_competencies": ["Networking"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Bygg och främja en prestationsdriven kultur",
-        "name": "Jag stärker kulturen genom att visa att vi står tillsammans – både i med- och motgång",
-        "competencies": ["Driving vision and purpose", "Results orientation"],
-        "weighted_competencies": ["Results orientation"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-
-    # ─────────────────────────────────────────
-    # Driva mot ambitiösa och mätbara resultatmål
-    # ─────────────────────────────────────────
-    {
-        "cluster": "Driva mot måldrivna och ambitiösa mål",
-        "name": "Jag förankrar mål så att alla förstår och känner motivation",
-        "competencies": ["Engaging others", "Driving vision and purpose"],
-        "weighted_competencies": ["Engaging others"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-    {
-        "cluster": "Driva mot måldrivna och ambitiösa mål",
-        "name": "Jag följer upp och stöttar för att nå förväntat resultat",
-        "competencies": ["Directing others", "Supporting others"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Driva mot måldrivna och ambitiösa mål",
-        "name": "Jag samarbetar över gränser för att nå gemensamma mål",
-        "competencies": ["Networking"],
-        "weighted_competencies": ["Networking"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-    {
-        "cluster": "Driva mot måldrivna och ambitiösa mål",
-        "name": "Jag skapar tydliga arbetssätt som ger fokus och framdrift",
-        "competencies": ["Drive", "Optimizing processes"],
-        "weighted_competencies": ["Optimizing processes"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Driva mot måldrivna och ambitiösa mål",
-        "name": "Jag gör mål hanterbara och hjälper teamet att prioritera rätt",
-        "competencies": ["Resilience", "Organizing and prioritizing"],
-        "weighted_competencies": ["Organizing and prioritizing"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Driva mot måldrivna och ambitiösa mål",
-        "name": "Jag ser till helheten och agerar långsiktigt, även när det är kortsiktigt utmanande.",
-        "competencies": ["Strategic focus", "Drive"],
-        "weighted_competencies": ["Strategic focus"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-
-    # ─────────────────────────────────────────
-    # Rekrytera, utveckla och behåll rätt förmågor och personer
-    # ─────────────────────────────────────────
-    {
-        "cluster": "Rekrytera, utveckla och behåll rätt förmågor och personer",
-        "name": "Jag hittar personer som stärker teamet affärsmässigt, kulturellt och kompetensmässigt",
-        "competencies": ["Delegating", "Customer focus"],
-        "weighted_competencies": ["Delegating"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-    {
-        "cluster": "Rekrytera, utveckla och behåll rätt förmågor och personer",
-        "name": "Jag får medarbetare att växa genom att se potential och främja lärande",
-        "competencies": ["Supporting others"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Rekrytera, utveckla och behåll rätt förmågor och personer",
-        "name": "Jag skapar tydlighet i rollen som konsult och kollega",
-        "competencies": ["Written communication"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Rekrytera, utveckla och behåll rätt förmågor och personer",
-        "name": "Jag förtydligar vad som förväntas i uppdrag och kultur",
-        "competencies": ["Written communication"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Rekrytera, utveckla och behåll rätt förmågor och personer",
-        "name": "Jag bygger delaktighet genom gemenskap, respekt och goda förebilder",
-        "competencies": ["Embracing diversity", "Developing relationships"],
-        "weighted_competencies": ["Embracing diversity"],
-        "weight": UNDERBEHAVIOR_NORMAL_WEIGHT,
-    },
-    {
-        "cluster": "Rekrytera, utveckla och behåll rätt förmågor och personer",
-        "name": "Jag ser till att vi har rätt personer på bussen och är modig att fatta beslut när en roll inte är rätt för individen eller teamet",
-        "competencies": ["Decisiveness", "Organisational awareness"],
-        "weighted_competencies": ["Decisiveness"],
-        "weight": UNDERBEHAVIOR_HEAVY_WEIGHT,
-    },
-]
-
-
-COMP_ALIASES = {
-    "customer focus": ["customer focus", "customerfocus"],
-    "managing conflicts": ["managing conflict", "managing conflicts"],
-    "optimizing processes": ["optimising processes", "optimizing processes"],
-    "organizing and prioritizing": ["organising and prioritising", "organizing and prioritizing"],
-    "driving vision and purpose": ["driving vision & purpose", "driving vision and purpose", "driving vision purpose"],
-    "developing relationships": ["developing relationships", "developing relationship"],
-    "results orientation": ["results orientation", "result orientation"],
-}
-
-COMPETENCY_UI = {
-    "Developing relationships": {
-        "sv": "Utveckla relationer",
-        "desc": "Utvecklar och upprätthåller positiva relationer, relaterar väl till ett brett spektrum av människor.",
-    },
-    "Results orientation": {
-        "sv": "Resultatorientering",
-        "desc": "Strävar efter att uppnå resultat och överträffa förväntningar med ihärdighet och beslutsamhet.",
-    },
-    "Adaptability": {
-        "sv": "Anpassningsförmåga",
-        "desc": "Anpassar sitt arbetssätt effektivt till förändrade situationer, människor och möjligheter.",
-    },
-    "Reliability": {
-        "sv": "Pålitlighet",
-        "desc": "Uppvisar fokus på att leverera det som krävs, i rätt tid och med hög kvalitet.",
-    },
-    "Written communication": {
-        "sv": "Skriftlig kommunikation",
-        "desc": "Skriver tydligt och koncist på ett sätt som säkerställer att budskapet fungerar för målgruppen.",
-    },
-    "Engaging others": {
-        "sv": "Engagera andra",
-        "desc": "Visar entusiasm och passion för att inspirera och engagera andra.",
-    },
-    "Delegating": {
-        "sv": "Delegera",
-        "desc": "Delegerar arbete på ett lämpligt sätt med hänsyn till kompetens, erfarenhet och tillgänglighet.",
-    },
-    "Customer focus": {
-        "sv": "Kundfokus",
-        "desc": "Försöker förstå kundernas behov och arbetar hårt för att de ska tillgodoses.",
-    },
-    "Resilience": {
-        "sv": "Uthållighet",
-        "desc": "Fungerar bra under press och kommer snabbt igen efter motgångar.",
-    },
-    "Supporting others": {
-        "sv": "Stödja andra",
-        "desc": "Stödjer andra i utmaningar och hjälper dem som har svårt att klara sig själva.",
-    },
-    "Managing conflicts": {
-        "sv": "Hantera konflikter",
-        "desc": "Hanterar och löser konflikter och meningsskiljaktigheter taktfullt men ändå bestämt.",
-    },
-    "Interpersonal communication": {
-        "sv": "Personlig kommunikation",
-        "desc": "Kommunicerar effektivt och engagerande på ett professionellt sätt.",
-    },
-    "Organisational awareness": {
-        "sv": "Organisatorisk medvetenhet",
-        "desc": "Förstår hur verksamheten fungerar och bedömer påverkan på sig själv, team och organisation.",
-    },
-    "Dealing with ambiguity": {
-        "sv": "Hantera otydlighet",
-        "desc": "Svarar bra på otydliga situationer och förblir effektiv vid osäkerhet.",
-    },
-    "Networking": {
-        "sv": "Nätverka",
-        "desc": "Arbetar upp ett användbart nätverk både inom och utanför organisationen.",
-    },
-    "Driving vision and purpose": {
-        "sv": "Driva vision och syfte",
-        "desc": "Definierar och kommunicerar en tydlig vision som motiverar andra.",
-    },
-    "Optimizing processes": {
-        "sv": "Processoptimering",
-        "desc": "Identifierar förbättringar och effektiviserar processer och arbetssätt.",
-    },
-    "Drive": {
-        "sv": "Drivkraft",
-        "desc": "Mycket motiverad och driven, tar sig an krävande mål med energi och entusiasm.",
-    },
-    "Organizing and prioritizing": {
-        "sv": "Organisera och prioritera",
-        "desc": "Planerar och prioriterar effektivt, skapar struktur och fokus för att nå resultat.",
-    },
-    "Strategic focus": {
-        "sv": "Strategiskt fokus",
-        "desc": "Har ett strategiskt förhållningssätt och agerar långsiktigt med helheten i åtanke.",
-    },
-    "Decisiveness": {
-        "sv": "Beslutsamhet",
-        "desc": "Fattar beslut vid rätt tid på ett tydligt och välgrundat sätt.",
-    },
-    "Embracing diversity": {
-        "sv": "Kulturell medvetenhet",
-        "desc": "Visar intresse för olika perspektiv och kulturer och drar nytta av mångfald.",
-    },
-    "Directing others": {
-        "sv": "Leda andra",
-        "desc": "Ger tydlig riktning och stöd för att säkerställa att andra når sina mål.",
-    },
-}
-
-B3_CLUSTER_DEFS = {
-    "Affärs- och värderingsdrivet ledarskap": {
-        "title": "Affärs- och värderingsdrivet ledarskap",
-        "description": (
-            "På B3 innebär det att vi leder med både hjärta och fokus på att skapa kundvärde "
-            "och lönsamhet, samtidigt som vi bygger en kultur där våra värderingar styr hur "
-            "vi agerar i relation till kunder, kollegor och affären. Det handlar om att ta "
-            "ansvar för helheten, att vara tydlig med mål och riktning, och att alltid balansera "
-            "affärsmässighet med omtanke.\n\n"
-            "Det betyder också att vi vågar visa mod, fatta beslut och stå upp för våra "
-            "värderingar, även när det är tufft. Genom att skapa trygghet för våra kunder och "
-            "kollegor, oavsett situation, bygger vi förtroende och långsiktighet."
-        ),
-    },
-
-    "Kommunicera precist och tydligt": {
-        "title": "Kommunicera precist och tydligt",
-        "description": (
-            "På B3 innebär det att vi använder ett klart, enkelt och begripligt språk, både "
-            "internt och externt. Vi tar initiativ till dialog även i svåra situationer, lyfter "
-            "det som fungerar för att förstärka vår goda kultur och står bakom gemensamma "
-            "beslut. Kommunikation är nyckeln till tillit, samarbete och gemensam riktning."
-        ),
-    },
-
-    "Bygg och främja en prestationsdriven kultur": {
-        "title": "Bygg och främja en prestationsdriven kultur",
-        "description": (
-            "På B3 innebär det att vi sätter höga förväntningar, uppmuntrar ansvarstagande och "
-            "ger utrymme för initiativ. Vi bygger team utifrån både kompetens och kulturmatch, "
-            "främjar transparens i beslut och skapar en trygg miljö där olika perspektiv får "
-            "utrymme."
-        ),
-    },
-
-    "Driva mot måldrivna och ambitiösa mål": {
-        "title": "Driva mot ambitiösa och mätbara resultatmål",
-        "description": (
-            "På B3 innebär det att vi sätter tydliga mål, skapar engagemang kring dem och "
-            "arbetar systematiskt för att nå dem. Vi följer upp regelbundet, justerar vid "
-            "behov och samarbetar över gränser för att säkerställa leverans och lönsamhet."
-        ),
-    },
-
-    "Rekrytera, utveckla och behåll rätt förmågor och personer": {
-        "title": "Rekrytera, utveckla och behålla rätt förmågor och personer",
-        "description": (
-            "På B3 innebär det att vi är noga med att rekrytera rätt kompetens, värdera "
-            "kulturmatch och vilja till utveckling. Vi sätter tydliga förväntningar, bygger "
-            "en lärandekultur och skapar en inkluderande arbetsmiljö där människor kan växa "
-            "och bidra."
-        ),
-    },
-}
-
-B3_CLUSTER_QUESTIONS = {
-  "Affärs- och värderingsdrivet ledarskap": {
-    "top": [
-      "I vilka situationer använder du affärsfokus och värderingar som en tydlig kompass i beslut?",
-      "Hur säkerställer du balans mellan kundvärde/lönsamhet och omtanke om människor i vardagen?",
-      "När du är som mest effektiv i detta beteende, vad gör du konkret som skapar trygghet och förtroende?"
-    ],
-    "low": [
-      "I vilka lägen blir det svårast att hålla ihop kundvärde, lönsamhet och värderingar samtidigt?",
-      "Vilka beslut eller samtal drar du dig för när det krävs mod och tydlighet?",
-      "Vad skulle vara ett litet, konkret steg för att bli tydligare med mål och riktning kommande vecka?"
-    ],
-  },
-
-  "Kommunicera precist och tydligt": {
-    "top": [
-      "Hur märks det i din kommunikation att du skapar tydlighet och minskar missförstånd?",
-      "När tar du initiativ till dialog i svåra frågor, och vad gör att det fungerar bra?",
-      "Hur bidrar du till gemensam riktning genom att lyfta det som fungerar och stå bakom beslut?"
-    ],
-    "low": [
-      "I vilka situationer blir ditt budskap lätt otydligt eller för “mycket på en gång”?",
-      "När undviker du dialog i svåra frågor, och vad skulle underlätta att ta den tidigare?",
-      "Vilken enkel struktur (syfte, beslut, nästa steg) kan du testa för att öka tydlighet i kommande kommunikation?"
-    ],
-  },
-
-  "Bygg och främja en prestationsdriven kultur": {
-    "top": [
-      "Hur sätter du förväntningar som skapar ansvar och framdrift utan att skapa otrygghet?",
-      "Hur bygger du team utifrån både kompetens och kulturmatch i praktiken?",
-      "Vad gör du för att skapa en trygg miljö där olika perspektiv faktiskt får utrymme?"
-    ],
-    "low": [
-      "Var brister tydliggörandet oftast: vid förväntningar, uppmuntran till ansvarstagande och initiativ eller tydlighet vid beslut? ",
-      "Vilket beteende från dig skulle mest bidra till mer transparens och trygghet i teamet?",
-      "Vilket litet initiativ kan du ta för att stärka ansvarstagande och initiativ i gruppen kommande vecka?"
-    ],
-  },
-
-  "Driva mot måldrivna och ambitiösa mål": {
-    "top": [
-      "Hur gör du mål tydliga så att andra förstår dem och känner engagemang?",
-      "Hur följer du upp systematiskt och justerar utan att tappa fart?",
-      "Hur samarbetar du över gränser för att säkra leverans och lönsamhet?"
-    ],
-    "low": [
-      "När blir målbilden otydlig, och vad behöver du göra annorlunda för att förankra den?",
-      "Hur ofta följer du upp idag, och vad skulle vara en rimlig uppföljningsrytm framåt?",
-      "Vilket samarbete över gränser skulle ge störst effekt om du initierade det nu?"
-    ],
-  },
-
-  "Rekrytera, utveckla och behåll rätt förmågor och personer": {
-    "top": [
-      "Hur fångar du både kompetens, kulturmatch och utvecklingsvilja i en rekrytering? ",
-      "Hur skapar du tydliga förväntningar som hjälper andra att växa?",
-      "Hur bidrar du till en inkluderande lärandekultur i vardagen?"
-    ],
-    "low": [
-      "Var uppstår störst osäkerhet: vid rekrytering, förväntningar, utveckling eller att fatta svåra beslut? ",
-      "Hur tydlig är du i rollers förväntningar, och vad skulle göra det tydligare? ",
-      "Vilken konkret insats kan du göra för att stärka lärande och utveckling i teamet den här månaden?"
-    ],
-  },
-}
-
-B3_CLUSTER_ONE_LINERS = {
-    "Affärs- och värderingsdrivet ledarskap": {
-        "top": "Det innebär troligen att du ofta leder med både kundvärde och omtanke i fokus, tar ansvar för helheten och skapar trygghet genom tydlighet och värderingsstyrda beslut.",
-        "low": "Det kan innebära att du ibland behöver lägga mer medvetenhet på att balansera affärsfokus med omtanke, tydlig riktning och värderingsstyrda beslut i vardagen.",
-    },
-    "Kommunicera precist och tydligt": {
-        "top": "Det innebär troligen att du ofta skapar tydlighet och tillit genom ett klart språk, medveten dialog och genom att förstärka det som fungerar i samarbeten och beslut, samt genom att våga ta dialog även när samtalen är svåra.",
-        "low": "Det kan innebära att du ibland behöver vara mer medveten i att skapa tydlighet, ta dialog i svåra lägen och förankra gemensamma beslut för att minska missförstånd.",
-    },
-    "Bygg och främja en prestationsdriven kultur": {
-        "top": "Det innebär troligen att du ofta driver ansvarstagande och initiativ genom höga förväntningar, transparens och en trygg miljö där olika perspektiv får plats.",
-        "low": "Det kan innebära att du ibland behöver vara tydligare med förväntningar, uppmuntra ansvarstagande och uppföljning i större utsträckning för att skapa driv, initiativ och en hållbar prestationskultur.",
-    },
-    "Driva mot måldrivna och ambitiösa mål": {
-        "top": "Det innebär troligen att du ofta skapar engagemang kring tydliga mål, följer upp systematiskt och samarbetar över gränser för att säkra leverans och lönsamhet.",
-        "low": "Det kan innebära att du ibland behöver jobba mer strukturerat med målsättning, uppföljning och samordning för att för att säkra leverans och lönsamhet.",
-    },
-    "Rekrytera, utveckla och behåll rätt förmågor och personer": {
-        "top": "Det innebär troligen att du ofta bygger starka team genom att värdera kompetens och kulturmatch, skapa tydlighet och främja lärande så att människor kan växa och bidra.",
-        "low": "Det kan innebära att du ibland behöver lägga mer fokus på att skapa tydlighet i rollen, utveckla människor och säkra rätt match mellan roll, kompetens och kultur. ",
-    },
-}
-
+logger = logging.getLogger(__name__)
 
 
 # ─────────────────────────────────────────
 # Helpers
 # ─────────────────────────────────────────
 
-def _extract_competency_values(df: pd.DataFrame) -> Dict[str, float]:
-    """Plockar ut kompetenser från första raden i Excel och returnerar {label: score}."""
-    row = df.iloc[0]
+def _competency_values(labels: Sequence[str], row: Sequence[Optional[float]]) -> Dict[str, float]:
+    """En kandidatrad -> {label: score}, utan saknade värden."""
     competency_values: Dict[str, float] = {}
-
-    for col in df.columns:
-        if isinstance(col, str) and col.startswith("Competency Score:"):
-            label = col.replace("Competency Score:", "").strip()
-            label = label.replace("(STIVE)", "").strip()
-
-            try:
-                competency_values[label] = float(row[col])
-            except (TypeError, ValueError):
-                continue
-
+    for label, v in zip(labels, row):
+        if v is not None and not math.isnan(v):
+            competency_values[label] = float(v)
     return competency_values
 
-def _build_cluster_calc_line(
-    items_used: List[Dict[str, Any]],
-    result: Optional[float],
-    denominator: Optional[float] = None
-) -> str:
-    """
-    Ex:
-    - gamla: (UB1 3.03×2 + UB2 1.42×1 + ...) / (2+1+...) = 2.78
-    - nya:    (UB1 3.03×2 + UB2 1.42×1 + ...) / 6 = 3.76
-    """
-    if not items_used or result is None:
-        return "Ingen uträkning (saknar underbeteenden)."
-
-    left = " + ".join([
-        f'{x["underbehavior"]} {_fmt(x["score"])}×{_fmt(x["weight"],0)}'
-        for x in items_used
-    ])
-
-    if denominator is None:
-        # fallback till gamla beteendet om du någonsin vill återanvända funktionen
-        wsum = " + ".join([f'{_fmt(x["weight"],0)}' for x in items_used])
-        return f"({left}) / ({wsum}) = {_fmt(result)}"
-
-    return f"({left}) / {_fmt(float(denominator), 0)} = {_fmt(result)}"
+def _report_values(labels: Sequence[str], row: Sequence[Optional[float]]) -> Dict[str, Optional[float]]:
+    """En kandidatrad -> {label: score} för Report: hela headern, None där cellen är tom."""
+    return {label: (None if v is None or math.isnan(v) else float(v)) for label, v in zip(labels, row)}
 
 def round_to_half(value: Optional[float]) -> Optional[float]:
     """
@@ -554,75 +67,115 @@ def _norm(s: str) -> str:
     s = re.sub(r"\s+", " ", s)
     return s
 
-def _build_lookup(competency_values: Dict[str, float]) -> Dict[str, float]:
-    """
-    Bygger en normaliserad lookup av Excel-kompetenser, så vi kan matcha stabilt.
-    """
-    lookup: Dict[str, float] = {}
-    for k, v in competency_values.items():
-        lookup[_norm(str(k))] = v
-    return lookup
+# ─────────────────────────────────────────
+# Kolumnmatchning (Excel-header -> kompetens)
+# ─────────────────────────────────────────
+#
+# Alla exporter från samma leverantör har samma header, så matchningen görs en
+# gång per header-signatur och cachas. Resultatet är också en tabell som visar
+# hur varje kompetens hittades (exact / alias / fuzzy / missing).
+
+COLUMN_RESOLVER_CACHE_SIZE = 64
 
-def _find_score(lookup: Dict[str, float], target: str) -> Optional[float]:
+
+class ColumnResolution:
+    __slots__ = ("competency", "column", "label", "kind", "candidates")
+
+    def __init__(self, competency: str, column: int, label: Optional[str], kind: str, candidates: Tuple[str, ...] = ()):
+        self.competency = competency   # kanoniskt namn i ramverket
+        self.column = column           # index i labels, -1 = saknas
+        self.label = label             # Excel-label som användes
+        self.kind = kind               # "exact" | "alias" | "fuzzy" | "missing"
+        self.candidates = candidates   # alla labels som fuzzy-matchade (fler än en = tvetydigt)
+
+    @property
+    def ambiguous(self) -> bool:
+        return len(self.candidates) > 1
+
+
+def _resolve_competency(
+    lookup: Dict[str, int], labels: Sequence[str], target: str, aliases: Dict[str, Tuple[str, ...]]
+) -> ColumnResolution:
     t = _norm(target)
 
     # 1) Direkt match
     if t in lookup:
-        return lookup[t]
+        j = lookup[t]
+        return ColumnResolution(target, j, labels[j], "exact")
 
     # 2) Alias-lista
-    for canon, variants in COMP_ALIASES.items():
-        if t == canon:
-            for var in variants:
-                nv = _norm(var)
-                if nv in lookup:
-                    return lookup[nv]
-
-    # 3) “contains” fallback (snäll men kan rädda små skillnader)
-    for k, v in lookup.items():
-        if t in k or k in t:
-            return v
-
-    return None
-
-def _simple_average(values: List[float]) -> Optional[float]:
-    if not values:
-        return None
-    return sum(values) / len(values)
-
-def _weighted_average(pairs: List[Tuple[float, float]]) -> Optional[float]:
+    for var in aliases.get(t, ()):
+        nv = _norm(var)
+        if nv in lookup:
+            j = lookup[nv]
+            return ColumnResolution(target, j, labels[j], "alias")
+
+    # 3) “contains” fallback (snäll men kan rädda små skillnader) – första träffen vinner,
+    #    men alla träffar sparas så att tvetydiga matchningar syns
+    hits = [j for k, j in lookup.items() if t in k or k in t]
+    if hits:
+        return ColumnResolution(target, hits[0], labels[hits[0]], "fuzzy", tuple(labels[j] for j in hits))
+
+    return ColumnResolution(target, -1, None, "missing")
+
+
+@lru_cache(maxsize=COLUMN_RESOLVER_CACHE_SIZE)
+def resolve_columns(
+    competencies: Tuple[str, ...],
+    labels: Tuple[str, ...],
+    aliases: Tuple[Tuple[str, Tuple[str, ...]], ...] = (),
+) -> Tuple[ColumnResolution, ...]:
     """
-    pairs = [(score, weight), ...]
-    returnerar viktat medel (normaliserat) => håller sig i 1–5
+    Matchar ramverkets kompetenser mot en header (labels). Cachas per
+    (kompetenser, header, alias) – aliasen är Framework.aliases.
     """
-    if not pairs:
-        return None
-    w_sum = sum(score * w for score, w in pairs)
-    w_tot = sum(w for _, w in pairs)
-    if w_tot == 0:
-        return None
-    return w_sum / w_tot
+    lookup = {_norm(str(label)): j for j, label in enumerate(labels)}
+    alias_map = dict(aliases)
+    resolution = tuple(_resolve_competency(lookup, labels, comp, alias_map) for comp in competencies)
+
+    for r in resolution:
+        if r.ambiguous:
+            logger.warning(
+                "Tvetydig kolumnmatchning för %r: %s (använder %r)",
+                r.competency, ", ".join(repr(c) for c in r.candidates), r.label,
+            )
+    return resolution
 
-def _fmt(n: Optional[float], decimals: int = 2) -> str:
-    if n is None:
-        return "—"
-    return f"{n:.{decimals}f}"
 
-def _build_under_calc_line(comp_debug: List[Dict[str, Any]], result: Optional[float]) -> str:
+def _competency_columns(framework: Framework, labels: Sequence[str]) -> np.ndarray:
+    """Ramverkets kompetenser -> kolumnindex i labels (-1 = saknas)."""
+    resolution = resolve_columns(framework.compiled.competencies, tuple(labels), framework.aliases)
+    return np.array([r.column for r in resolution], dtype=np.intp)
+
+def _competency_matrix(fw: CompiledFramework, values: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Excel-värden (N × L) -> X (N × C) i fw.competencies-ordning, NaN = saknas."""
+    X = np.full((values.shape[0], len(fw.competencies)), np.nan)
+    found = columns >= 0
+    X[:, found] = widen_scores(values[:, columns[found]])
+    return X
+
+def _competency_row(framework: Framework, labels: Sequence[str], row: Sequence[Optional[float]]) -> np.ndarray:
     """
-    Ex: (Delegating 3.58×2 + Customer focus 1.93×1) / (2+1) = 3.03
+    En kandidatrad (hela headern, NaN/None = tom cell) -> rad i fw.competencies-ordning.
+    Kolumnerna matchas mot hela headern, så alla rader i en fil delar samma
+    cachade matchning – oavsett vilka celler som är tomma.
     """
-    if not comp_debug or result is None:
-        return "Ingen uträkning (saknar värden)."
+    values = np.asarray([row], dtype=float).reshape(1, len(labels))
+    return _competency_matrix(framework.compiled, values, _competency_columns(framework, labels))[0]
 
-    left = " + ".join([f'{c["competency"]} {_fmt(c["score"])}×{_fmt(c["weight"],0)}' for c in comp_debug])
-    wsum = " + ".join([f'{_fmt(c["weight"],0)}' for c in comp_debug])
+def _opt(v: float) -> Optional[float]:
+    """NaN (saknas) -> None, annars vanlig float för templates/session."""
+    v = float(v)
+    return None if math.isnan(v) else v
 
-    return f"({left}) / ({wsum}) = {_fmt(result)}"
+def _fmt(n: Optional[float], decimals: int = 2) -> str:
+    if n is None:
+        return "—"
+    return f"{n:.{decimals}f}"
 
 def calculate_b3_underbehaviors_and_clusters(
-    competency_values: Dict[str, float],
-    b3_underbehaviors_def: List[Dict[str, Any]],
+    row: np.ndarray,
+    framework: Framework,
 ) -> Tuple[
     List[Dict[str, Any]],  # underbehaviors
     List[Dict[str, Any]],  # clusters
@@ -639,72 +192,57 @@ def calculate_b3_underbehaviors_and_clusters(
         pct_total        = ratio 0..1  (perfekt för donut)
         pct_total_percent= 0..100      (perfekt för text/radar om du vill)
     - mapped_competencies: [{name, score}] för UI-kompetensraderna (bar-grafen).
+    row är kandidatens poäng i fw.competencies-ordning (NaN = saknas), se _competency_row.
     """
 
-    lookup = _build_lookup(competency_values)
+    fw = framework.compiled
+    result = score_matrix(fw, row[np.newaxis, :])
+
+    comp_scores = [_opt(v) for v in row]
+    under_scores = [_opt(v) for v in result.under[0]]
 
     underbehaviors: List[Dict[str, Any]] = []
     cluster_items: Dict[str, List[Dict[str, Any]]] = {}
 
-    # Klusterordning (behåller den ordning du definierat i B3_UNDERBEHAVIORS)
-    cluster_order: List[str] = []
-    for beh in b3_underbehaviors_def:
-        c = beh.get("cluster")
-        if c and c not in cluster_order:
-            cluster_order.append(c)
-
-    # 1) Underbeteenden
-    for beh in b3_underbehaviors_def:
+    # 1) Underbeteenden (poängen kommer ur result.under, resten är visning)
+    for u, beh in enumerate(fw.underbehaviors):
+        comps = beh.get("competencies", [])
         comp_debug: List[Dict[str, Any]] = []
-        comp_values: List[float] = []
         missing: List[str] = []
 
-        comps = beh.get("competencies", [])
-
-        # Hämta scores för beräkningen (med din alias-matchning)
-        for comp in comps:
-            v = _find_score(lookup, comp)
-            if v is None:
-                missing.append(comp)
-                continue
-            v = float(v)
-            comp_values.append(v)
-
-            comp_debug.append({
-                "competency": comp,
-                "score": v,
-                "weight": 1.0,
-                "weighted": v,
-            })
-
         # ✅ Detta är NYCKELN: bygg en lista som UI kan loopa över
         # Den innehåller ALLA kompetenser (även de som saknar score => None)
         mapped_competencies: List[Dict[str, Any]] = []
 
         for comp in comps:
-            v = _find_score(lookup, comp)
-            ui = COMPETENCY_UI.get(comp, {})
+            score_val = comp_scores[fw.competency_index[comp]]
+            ui = framework.competency(comp)
 
-            score_val = float(v) if v is not None else None
-            pct = (score_val / 5.0) * 100.0 if score_val is not None else 0.0
+            if score_val is None:
+                missing.append(comp)
+            else:
+                comp_debug.append({
+                    "competency": comp,
+                    "score": score_val,
+                    "weight": 1.0,
+                    "weighted": score_val,
+                })
 
             mapped_competencies.append({
                 "name": comp,
-                "label": ui.get("sv", comp),
-                "description": ui.get("desc", ""),
+                "label": ui.label,
+                "description": ui.description,
                 "score": score_val,
-                "pct": pct,
+                "pct": (score_val / 5.0) * 100.0 if score_val is not None else 0.0,
             })
 
-        under_score = _simple_average(comp_values)
+        under_score = under_scores[u]
 
         under_half = round_to_half(under_score)
         under_half_steps = int(under_half * 2) if under_half is not None else None
         under_rounded = int(round(under_score)) if under_score is not None else None
 
-        raw_weight = float(beh.get("weight", 1.0))
-        under_weight = 2.0 if raw_weight >= 2.0 else 1.0
-
+        under_weight = float(fw.ub_weights[u])
 
         if comp_debug and under_score is not None:
             left = " + ".join([f'{c["competency"]} {_fmt(c["score"])}' for c in comp_debug])
@@ -728,6 +266,7 @@ def calculate_b3_underbehaviors_and_clusters(
 
             "weight": under_weight,
             "missing": missing,
+            "spacer": framework.spacers.get(beh.get("name")),
 
             # debug kan du ta bort sen, men behåller så länge
             "calc_debug": {
@@ -745,39 +284,30 @@ def calculate_b3_underbehaviors_and_clusters(
         underbehaviors.append(item)
         cluster_items.setdefault(item["cluster"], []).append(item)
 
-    # 2) Kluster (huvudbeteenden)
+    # 2) Kluster (huvudbeteenden) – summor och procent kommer ur result.cluster_*
     clusters: List[Dict[str, Any]] = []
 
-    for cluster_name in cluster_order:
-        cluster_ui = B3_CLUSTER_DEFS.get(cluster_name, {})
-        cluster_title = cluster_ui.get("title", cluster_name)
-        cluster_desc = cluster_ui.get("description", "")
+    for k, cluster_name in enumerate(fw.cluster_order):
+        cluster_ui = framework.cluster(cluster_name)
+        cluster_title = cluster_ui.title
+        cluster_desc = cluster_ui.description
         items = [x for x in cluster_items.get(cluster_name, []) if x.get("score_5") is not None]
 
-        total_score: Optional[float] = None
-        max_total: Optional[float] = None
-        pct_ratio: Optional[float] = None       # 0..1
-        pct_percent: Optional[float] = None     # 0..100
-        pct_percent_text: int = 0
-
-        if items:
-            total_score = sum((x["score_5"] * x["weight"]) for x in items if x.get("score_5") is not None)
-            max_total = sum((5.0 * x["weight"]) for x in items)
-
-            if max_total and max_total > 0:
-                pct_ratio = total_score / max_total
-                pct_percent = pct_ratio * 100.0
-                pct_percent_text = min(100, int(math.ceil(pct_percent)))
+        total_score = _opt(result.cluster_total[0, k])
+        max_total = _opt(result.cluster_max[0, k])
+        score_5_mean = _opt(result.cluster_mean[0, k])
+        pct_percent = _opt(result.cluster_pct[0, k])                             # 0..100
+        pct_ratio = total_score / max_total if pct_percent is not None else None  # 0..1
+        pct_percent_text = min(100, int(math.ceil(pct_percent))) if pct_percent is not None else 0
 
         items_used = [
             {
                 "underbehavior": x["name"],
-                "score": x.get("score_5"),
+                "score": x["score_5"],
                 "weight": x["weight"],
-                "weighted": (x.get("score_5") * x["weight"]) if x.get("score_5") is not None else None,
+                "weighted": x["score_5"] * x["weight"],
             }
             for x in items
-            if x.get("score_5") is not None
         ]
 
         if total_score is not None and items_used:
@@ -786,14 +316,12 @@ def calculate_b3_underbehaviors_and_clusters(
         else:
             human_cluster_line = "Ingen uträkning (saknar underbeteenden)."
 
-        weight_sum = sum(x["weight"] for x in items) if items else None
-        score_5_mean = (total_score / weight_sum) if (total_score is not None and weight_sum) else None
-
-
         clusters.append({
             "name": cluster_name,
             "title": cluster_title,
             "description": cluster_desc,
+            "slug": cluster_ui.slug,
+            "color": cluster_ui.color,
 
             "total_score": total_score,
             "max_total": max_total,
@@ -862,7 +390,7 @@ def calculate_b3_underbehaviors_and_clusters(
         if not cluster:
             return []
         cluster_name = cluster.get("name")
-        return B3_CLUSTER_QUESTIONS.get(cluster_name, {}).get(kind, [])[:3]
+        return list(framework.questions(cluster_name, kind)[:3])
 
     
 
@@ -870,7 +398,7 @@ def calculate_b3_underbehaviors_and_clusters(
         if not cluster:
             return ""
         cluster_name = cluster.get("name")
-        return B3_CLUSTER_ONE_LINERS.get(cluster_name, {}).get(kind, "")
+        return framework.one_liner(cluster_name, kind)
 
     insights = {
         "most_natural": most_natural,
@@ -892,250 +420,795 @@ def calculate_b3_underbehaviors_and_clusters(
 
 
 
-async def _render_pdf_async(url: str, cookie_name: str, cookie_value: Optional[str]) -> bytes:
-    """Renderar en URL till PDF via Playwright, med session-cookie så vi inte blir redirectade."""
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=["--no-sandbox", "--disable-setuid-sandbox"] if not settings.DEBUG else []
-        )
+# ─────────────────────────────────────────
+# Views
+# ─────────────────────────────────────────
 
-        # ✅ Sätt desktop-viewport direkt på context (viktigare än på page)
-        context = await browser.new_context(
-            viewport={"width": 1440, "height": 900},
-            device_scale_factor=1,   # undvik konstiga skalningar
-        )
+def _build_report_data(
+    full_name: str, labels: Sequence[str], row: Sequence[Optional[float]], framework: Framework
+) -> Dict[str, Any]:
+    """
+    Allt som rapport-templates och PDF-renderare behöver för en kandidat.
+    labels är filens hela header och row kandidatens rad (NaN/None = tom cell).
+    """
+    competency_values = _competency_values(labels, row)
+    competency_row = _competency_row(framework, labels, row)
+
+    # (valfritt att ha kvar) enkel lookup om du vill, men du behöver inte för underbeteenden nu
+    def _norm_key(s: str) -> str:
+        return (s or "").strip().lower().replace("&", "and")
+
+    competency_lookup = {_norm_key(k): float(v) for k, v in competency_values.items()}
+
+    labels = list(competency_values.keys())
+    values = list(competency_values.values())
+    avg_score = (sum(values) / len(values)) if values else None
+
+    competencies_list = [{
+        "name": k,
+        "score_5": float(v),
+        "score_5_rounded": int(round(float(v))),
+    } for k, v in competency_values.items()]
+
+    if avg_score is not None:
+        if avg_score >= 3.5:
+            summary_text = "Ditt genomsnittliga resultat ligger på en hög nivå."
+        elif avg_score >= 2.5:
+            summary_text = "Ditt genomsnittliga resultat ligger på en medelnivå."
+        else:
+            summary_text = "Ditt genomsnittliga resultat ligger på en lägre nivå."
+    else:
+        summary_text = "Inga kompetensvärden hittades i filen."
+
+    (
+        b3_underbehaviors,
+        b3_clusters,
+        calc_explain_text,
+        under_compare_rows,
+        cluster_compare_rows,
+        insights,
+    ) = calculate_b3_underbehaviors_and_clusters(
+        competency_row,
+        framework,
+    )
 
-        if cookie_value:
-            parsed = urlparse(url)
-            await context.add_cookies([{
-                "name": cookie_name,
-                "value": cookie_value,
-                "domain": parsed.hostname,
-                "path": "/",
-            }])
+    report_data = {
+        "full_name": full_name,
+        "framework_version": framework.version,
+        "framework": framework.summary(),
+        "avg_score": avg_score,
+        "summary_text": summary_text,
 
-        page = await context.new_page()
+        "competencies": competencies_list,
+        "chart_labels": labels,
+        "chart_values": values,
 
-        # ✅ Superviktigt: gör detta innan goto
-        await page.emulate_media(media="screen")
+        "competency_lookup": competency_lookup,  # om du vill använda senare
 
-        # ✅ Ladda sidan EN gång, i rätt viewport + screen
-        await page.goto(url, wait_until="networkidle")
+        "b3_underbehaviors": b3_underbehaviors,
+        "b3_clusters": b3_clusters,
+        "insights": insights,
 
-        await page.evaluate("window.dispatchEvent(new Event('resize'))")
-        await page.wait_for_timeout(300)
+        "calc_explain_text": calc_explain_text,
+        "under_compare_rows": under_compare_rows,
+        "cluster_compare_rows": cluster_compare_rows,
+    }
 
-        # 1) Vänta på att canvasen finns (men krascha inte om den inte gör det)
+    # Radar chart:
+    # Om du vill ha 0..100 i radar:
+    radar_labels = [c["name"] for c in b3_clusters]
+    radar_values = [
+        float(c["pct_total"]) if c.get("pct_total") is not None else 0.0
+        for c in b3_clusters
+    ]
+
+    report_data.update({
+        "radar_labels": radar_labels,
+        "radar_values": radar_values,
+    })
+
+    norms = get_norm_table(framework)
+    if norms is not None:
+        _attach_percentiles(report_data, framework, norms, competency_row)
+
+    return report_data
+
+
+def _attach_percentiles(
+    report_data: Dict[str, Any],
+    framework: Framework,
+    norms: NormTable,
+    competency_row: np.ndarray,
+) -> None:
+    """Percentil mot normgruppen per kompetens och kluster (None där värde saknas)."""
+    comp_percentiles = norms.competency_percentiles(competency_row)[0]
+    by_competency = {name: _opt(p) for name, p in zip(framework.compiled.competencies, comp_percentiles)}
+    for u in report_data["b3_underbehaviors"]:
+        for comp in u["mapped_competencies"]:
+            comp["percentile"] = by_competency.get(comp["name"])
+
+    clusters = report_data["b3_clusters"]  # i fw.cluster_order-ordning
+    cluster_pct = np.array([c["pct_total"] if c.get("pct_total") is not None else np.nan for c in clusters])
+    for cluster, p in zip(clusters, norms.cluster_percentiles(cluster_pct)[0]):
+        cluster["percentile"] = _opt(p)
+
+    report_data["norms"] = {
+        "version": norms.version,
+        "size": norms.size,
+        "built_at": norms.built_at,
+        "competencies": by_competency,
+    }
+
+
+def _norm_version(framework: Framework) -> str:
+    """Ingår i cachenycklarna för report_data, så att en ny normtabell slår igenom direkt."""
+    norms = get_norm_table(framework)
+    return norms.version if norms is not None else ""
+
+
+# ─────────────────────────────────────────
+# Ramverk per uppladdning
+# ─────────────────────────────────────────
+#
+# Varje uppladdning visas med ett ramverk ur registret (framework.py), valt
+# i formuläret. Sessionen håller nyckeln (report_framework), sparade
+# rapporter har den i Report.framework. Råvärdena i rapportlagret är
+# ramverksoberoende, så ?framework=<nyckel> poängsätter om samma värden –
+# ingen ny uppladdning eller Excel-parsning.
+
+def _framework_or_default(key: Optional[str]) -> Framework:
+    """Ramverket key, eller default-ramverket om nyckeln saknas eller inte längre finns."""
+    if key:
         try:
-            await page.wait_for_selector("#radarChart", timeout=5000)
-        except Exception:
-            # Canvas hittades inte, fortsätt ändå
-            pass
-
-        # 2) Försök konvertera canvas -> img så att den alltid kommer med i PDF
-        await page.evaluate("""
-        () => {
-        const canvas = document.querySelector('#radarChart');
-        if (!canvas) return;
-
-        // Om canvas är 0x0, försök trigga layout
-        window.dispatchEvent(new Event('resize'));
-
-        // Försök skapa en PNG av canvas
-        let dataUrl = null;
-        try {
-            dataUrl = canvas.toDataURL('image/png');
-        } catch (e) {
-            return;
+            return get_framework(key)
+        except FrameworkError:
+            logger.warning("Ramverket %r finns inte – använder %r.", key, default_framework_key())
+    return get_framework()
+
+
+def _session_framework(request) -> Framework:
+    return _framework_or_default(request.session.get("report_framework"))
+
+
+async def _asession_framework(request) -> Framework:
+    return _framework_or_default(await request.session.aget("report_framework"))
+
+
+# ─────────────────────────────────────────
+# Batch (flera kandidater per fil)
+# ─────────────────────────────────────────
+#
+# Hela filen läses och poängsätts en gång och sparas som råvärden i
+# rapportlagret (report_store.py). Sessionen håller bara rapportens id och
+# vilken kandidat som visades senast; en kandidats fulla report_data byggs
+# först när den öppnas och cachas per (rapport, kandidat, ramverksversion).
+
+BATCH_PAGE_SIZE = 25
+REPORT_DATA_CACHE_SIZE = 128
+
+
+@lru_cache(maxsize=REPORT_DATA_CACHE_SIZE)
+def _cached_report_data(report_id: str, index: int, framework: Framework, norm_version: str) -> Optional[Dict[str, Any]]:
+    report = get_report_store().get(report_id)
+    if report is None:
+        return None
+    return _build_report_data(report.names[index], report.labels, report.row(index), framework)
+
+
+def _batch_candidate(report: StoredReport, index: int, framework: Framework) -> Optional[Dict[str, Any]]:
+    """
+    report_data för kandidat nr index (None om index är ogiltigt).
+    Dicten är delad via cachen – kopiera innan den ändras.
+    """
+    if not 0 <= index < len(report):
+        return None
+    # Råvärdena är ramverksoberoende: räknas alltid om med det valda ramverket
+    return _cached_report_data(report.id, index, framework, _norm_version(framework))
+
+
+def _batch_index(report: StoredReport, page_number: Any, framework: Framework) -> Dict[str, Any]:
+    """Paginerat kandidatindex: namn + klusterprocent, alla rader poängsatta i en matrisprodukt."""
+    fw = framework.compiled
+    X = _competency_matrix(fw, report.values, _competency_columns(framework, report.labels))
+    cluster_pct = score_matrix(fw, X).cluster_pct
+
+    page = Paginator(range(len(report)), BATCH_PAGE_SIZE).get_page(page_number)
+    indices = list(page.object_list)
+
+    # Percentiler bara för sidans rader, en searchsorted per kluster
+    norms = get_norm_table(framework)
+    percentiles = norms.cluster_percentiles(cluster_pct[indices]) if norms is not None and indices else None
+
+    rows = [
+        {
+            "index": i,
+            "full_name": report.names[i],
+            "clusters": [
+                {"pct": _opt(v), "percentile": _opt(percentiles[r, k]) if percentiles is not None else None}
+                for k, v in enumerate(cluster_pct[i])
+            ],
+        }
+        for r, i in enumerate(indices)
+    ]
+
+    return {
+        "batch_page": page,
+        "batch_rows": rows,
+        "batch_total": len(report),
+        "batch_clusters": list(framework.cluster_titles),
+    }
+
+
+def _stored_report_data(report_id: Optional[str], candidate: Any, framework: Framework) -> Optional[Dict[str, Any]]:
+    report = get_report_store().get(report_id)
+    if report is None:
+        return None
+    try:
+        return _batch_candidate(report, int(candidate), framework)
+    except (TypeError, ValueError):
+        return None
+
+
+def _requested_report_data(request) -> Optional[Dict[str, Any]]:
+    """?candidate=N väljer ur sessionens rapport, annars senast visade kandidat."""
+    candidate = request.GET.get("candidate", request.session.get("report_candidate", 0))
+    return _stored_report_data(request.session.get("report_id"), candidate, _session_framework(request))
+
+
+async def _arequested_report_data(request) -> Optional[Dict[str, Any]]:
+    """Som _requested_report_data, för async-vyer (sessionen läses med aget)."""
+    candidate = request.GET.get("candidate")
+    if candidate is None:
+        candidate = await request.session.aget("report_candidate", 0)
+    report_id = await request.session.aget("report_id")
+    framework = await _asession_framework(request)
+    return await sync_to_async(_stored_report_data, thread_sensitive=False)(report_id, candidate, framework)
+
+
+# ─────────────────────────────────────────
+# Gruppsammanställning (alla kandidater i filen)
+# ─────────────────────────────────────────
+#
+# Statistiken räknas i cohort.py över hela matrisen; här sätts den ihop med
+# ramverkets texter. Starkaste/svagaste kluster väljs som i insights för en
+# kandidat, men på gruppens medel.
+
+COHORT_CACHE_SIZE = 16
+
+
+def _build_cohort_data(report: StoredReport, framework: Framework) -> Dict[str, Any]:
+    fw = framework.compiled
+    X = _competency_matrix(fw, report.values, _competency_columns(framework, report.labels))
+    stats = cohort_stats(fw, X)
+
+    clusters = []
+    for k, name in enumerate(fw.cluster_order):
+        cluster_ui = framework.cluster(name)
+        clusters.append({
+            "name": name,
+            "title": cluster_ui.title,
+            "description": cluster_ui.description,
+            "score_5_mean": _opt(stats.cluster_mean.mean[k]),
+            "stats": stats.cluster_mean.row(k),
+            "pct": stats.cluster_pct.row(k),
+        })
+
+    underbehaviors = [
+        {
+            "cluster": beh.get("cluster"),
+            "name": beh.get("name"),
+            "weight": float(fw.ub_weights[u]),
+            "score_5": _opt(stats.under.mean[u]),
+            "stats": stats.under.row(u),
         }
-        if (!dataUrl || dataUrl.length < 50) return;
-
-        // Skapa en img och ersätt canvas visuellt
-        const img = document.createElement('img');
-        img.src = dataUrl;
-        img.alt = "Radar chart";
-        img.style.width = canvas.style.width || "100%";
-        img.style.maxWidth = "100%";
-        img.style.display = "block";
-
-        canvas.parentNode.insertBefore(img, canvas);
-        canvas.style.display = "none";
+        for u, beh in enumerate(fw.underbehaviors)
+    ]
+
+    competencies = [
+        {
+            "name": comp,
+            "label": framework.competency_labels[c],
+            "stats": stats.competencies.row(c),
         }
-        """)
+        for c, comp in enumerate(fw.competencies)
+    ]
 
-        try:
-            await page.wait_for_function(
-                "() => !document.querySelector('#radarChart') || window.__RADAR_READY__ === true",
-                timeout=8000
+    top_cluster, low_cluster = ranked(stats.cluster_mean.mean, 1)
+    top_under, low_under = ranked(stats.under.mean, TEAM_TOP_N)
+    most_natural = clusters[top_cluster[0]] if top_cluster else None
+    needs_development = clusters[low_cluster[0]] if low_cluster else None
+
+    def _one_liner(cluster: Optional[Dict[str, Any]], kind: str) -> str:
+        return framework.one_liner(cluster["name"], kind) if cluster else ""
+
+    def _questions(cluster: Optional[Dict[str, Any]], kind: str) -> List[str]:
+        return list(framework.questions(cluster["name"], kind)[:3]) if cluster else []
+
+    return {
+        "framework_version": framework.version,
+        "cohort_size": stats.size,
+        "cohort_clusters": clusters,
+        "cohort_underbehaviors": underbehaviors,
+        "cohort_competencies": competencies,
+        "cohort_insights": {
+            "most_natural": most_natural,
+            "needs_development": needs_development,
+            "top_energy": [underbehaviors[u] for u in top_under],
+            "low_energy": [underbehaviors[u] for u in low_under],
+            "most_natural_one_liner": _one_liner(most_natural, "top"),
+            "needs_development_one_liner": _one_liner(needs_development, "low"),
+            "most_natural_questions": _questions(most_natural, "top"),
+            "needs_development_questions": _questions(needs_development, "low"),
+        },
+    }
+
+
+@lru_cache(maxsize=COHORT_CACHE_SIZE)
+def _cached_cohort_data(report_id: str, framework: Framework) -> Optional[Dict[str, Any]]:
+    report = get_report_store().get(report_id)
+    if report is None:
+        return None
+    return _build_cohort_data(report, framework)
+
+
+def _stored_cohort_data(report_id: Optional[str], framework: Framework) -> Optional[Dict[str, Any]]:
+    """Sammanställning för en uppladdning (delad via cachen – kopiera innan den ändras)."""
+    if not report_id:
+        return None
+    return _cached_cohort_data(report_id, framework)
+
+
+# ─────────────────────────────────────────
+# Sparade rapporter (permalänkar)
+# ─────────────────────────────────────────
+#
+# Varje kandidat i en uppladdad fil sparas som en Report-rad. Permalänken
+# bygger om rapporten ur den sparade vektorn – ingen ny uppladdning eller
+# Excel-parsning behövs för att öppna eller rendera om den senare.
+
+def _save_reports(report: StoredReport, framework: Framework) -> None:
+    """
+    En Report per kandidat och ramverk. Befintliga rader ändras aldrig – en
+    permalänk visar alltid det den visade när den skapades. Samma fil igen med
+    samma ramverk (upload_id, nyckel, version) skapar inga dubbletter.
+    """
+    Report.objects.bulk_create(
+        [
+            Report(
+                full_name=name,
+                competency_values=_report_values(report.labels, report.row(i)),
+                framework=framework.key,
+                framework_version=framework.compiled.version,
+                upload_id=report.id,
+                row_index=i,
             )
-        except Exception:
-            pass
+            for i, name in enumerate(report.names)
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
 
 
-        pdf_bytes = await page.pdf(
-            format="A4",
-            print_background=True,
-            margin={"top": "0", "right": "0", "bottom": "0", "left": "0"},
-            prefer_css_page_size=True,
-            scale=1,  # ✅ stoppa auto-krympning
+def _saved_row(saved: Report) -> Tuple[Tuple[str, ...], List[Optional[float]]]:
+    """Report.competency_values -> (header, rad) för _build_report_data."""
+    return tuple(saved.competency_values), list(saved.competency_values.values())
+
+
+def _report_permalink(upload_id: str, index: int, framework: Framework) -> Optional[str]:
+    """Permalänken för kandidaten med just det här ramverket, om uppladdningen sparades med det."""
+    pk = (
+        Report.objects.filter(
+            upload_id=upload_id,
+            framework=framework.key,
+            framework_version=framework.compiled.version,
+            row_index=index,
         )
+        .values_list("pk", flat=True)
+        .first()
+    )
+    return reverse("report_permalink", args=[pk]) if pk else None
 
-        await browser.close()
-        return pdf_bytes
+
+@lru_cache(maxsize=REPORT_DATA_CACHE_SIZE)
+def _cached_saved_report_data(report_pk: str, framework: Framework, norm_version: str) -> Optional[Dict[str, Any]]:
+    saved = Report.objects.filter(pk=report_pk).only("full_name", "competency_values").first()
+    if saved is None:
+        return None
+    return _build_report_data(saved.full_name, *_saved_row(saved), framework)
+
+
+def _saved_report_data(report_pk: Any) -> Optional[Dict[str, Any]]:
+    """report_data för en sparad rapport, med dess ramverk (delad via cachen – kopiera innan den ändras)."""
+    key = Report.objects.filter(pk=report_pk).values_list("framework", flat=True).first()
+    if key is None:
+        return None
+    framework = _framework_or_default(key)
+    return _cached_saved_report_data(str(report_pk), framework, _norm_version(framework))
 
 
 # ─────────────────────────────────────────
 # Views
 # ─────────────────────────────────────────
+#
+# upload_view och report_pdf_download är async: Excel-parsning och
+# poängsättning körs i trådpoolen, PDF-rendering väntar på browser-poolen
+# utan att hålla en tråd. Under ASGI (se Procfile) kan en process då ha
+# många uppladdningar och renderingar i luften samtidigt.
+
+_render = sync_to_async(render)
 
-def upload_view(request):
+
+@track_view("upload")
+async def upload_view(request):
     """
     En sida: upload + rapport under.
-    Sparar report_data i session.
+    Råvärdena sparas i rapportlagret, sessionen får bara rapportens id. Filer med
+    flera rader visas med ett kandidatindex (?page=N), där ?candidate=N öppnar en kandidat.
+    ?framework=<nyckel> visar uppladdningen med ett annat ramverk.
     """
-    context: Dict[str, Any] = {"form": ExcelUploadForm()}
+    framework = await _asession_framework(request)
+    context: Dict[str, Any] = {"form": ExcelUploadForm(initial={"framework": framework.key})}
     context["show_mapping"] = True
 
+    store = get_report_store()
+    timer = stage_timer(request)
+    report: Optional[StoredReport] = None
+    report_data: Optional[Dict[str, Any]] = None
+    candidate_index = 0
+    show_batch = request.method == "POST" or any(k in request.GET for k in ("candidate", "page", "framework"))
+
     if request.method == "POST":
-        form = ExcelUploadForm(request.POST, request.FILES)
+        with timer.stage("read"):  # multipart-parsning av uppladdningen
+            form = ExcelUploadForm(request.POST, request.FILES)
+            valid = form.is_valid()
         context["form"] = form
 
-        if not form.is_valid():
+        if not valid:
+            metrics.inc("reports_uploads_total", result="error")
             context["error"] = "Något blev fel med filuppladdningen."
-            return render(request, "reports/upload.html", context)
+            return await _render(request, "reports/upload.html", context)
 
         excel_file = form.cleaned_data["file"]
-        df = pd.read_excel(excel_file)
+        metrics.observe("reports_upload_bytes", excel_file.size)
+        try:
+            # Header + kompetenskolumner -> N × L-matris
+            with timer.stage("parse"):
+                names, labels, values = await sync_to_async(read_candidates, thread_sensitive=False)(excel_file)
+        except ExcelIngestError as e:
+            metrics.inc("reports_uploads_total", result="error")
+            context["error"] = str(e)
+            return await _render(request, "reports/upload.html", context)
+        metrics.inc("reports_uploads_total", result="ok")
+        metrics.observe("reports_upload_rows", len(names))
+
+        framework = _framework_or_default(form.cleaned_data.get("framework"))
+        with timer.stage("store"):
+            report = await sync_to_async(store.put, thread_sensitive=False)(
+                names, labels, values, framework.compiled.version
+            )
+            await sync_to_async(_save_reports)(report, framework)
+            await request.session.aset("report_id", report.id)
+            await request.session.aset("report_framework", framework.key)
+        with timer.stage("score"):
+            report_data = await sync_to_async(_batch_candidate, thread_sensitive=False)(report, 0, framework)
+
+    elif show_batch:
+        with timer.stage("load"):
+            report_id = await request.session.aget("report_id")
+            report = await sync_to_async(store.get, thread_sensitive=False)(report_id)
+        if report is not None and "framework" in request.GET:
+            try:
+                selected = get_framework(request.GET["framework"])
+            except FrameworkError:
+                context["error"] = "Ramverket finns inte."
+            else:
+                if selected.key != framework.key:
+                    # Bara sessionen ändras – sparade rapporter behåller sitt ramverk
+                    framework = selected
+                    await request.session.aset("report_framework", framework.key)
+                    context["form"] = ExcelUploadForm(initial={"framework": framework.key})
+        if report is not None:
+            candidate = request.GET.get("candidate")
+            if candidate is None and ("page" in request.GET or "framework" in request.GET):
+                # Bläddring i indexet eller byte av ramverk: samma kandidat som förut
+                candidate = await request.session.aget("report_candidate", 0)
+            try:
+                candidate_index = int(candidate or 0)
+            except (TypeError, ValueError):
+                candidate_index = 0
+            with timer.stage("score"):
+                report_data = await sync_to_async(_batch_candidate, thread_sensitive=False)(
+                    report, candidate_index, framework
+                )
+            if report_data is None:
+                context["error"] = "Kandidaten finns inte i den uppladdade filen."
+
+    if report is not None and show_batch and len(report) > 1:
+        with timer.stage("index"):
+            batch_index = await sync_to_async(_batch_index, thread_sensitive=False)(
+                report, request.GET.get("page", 1), framework
+            )
+        context.update(batch_index)
+        context["candidate_index"] = candidate_index
+
+    if report_data is not None:
+        # Skriv bara när något ändrats – annars sparas sessionen om i onödan
+        if await request.session.aget("report_candidate") != candidate_index:
+            await request.session.aset("report_candidate", candidate_index)
+        context["pdf_jobs"] = getattr(settings, "REPORT_PDF_JOBS", False)
+        context["pdf_download_url"] = reverse("report_pdf_download")
+        context["report_permalink"] = await sync_to_async(_report_permalink)(report.id, candidate_index, framework)
+        context["frameworks"] = available_frameworks()
+        context["current_framework"] = framework
+        context["column_resolution"] = resolve_columns(
+            framework.compiled.competencies, tuple(report.labels), framework.aliases
+        )
+        context.update(report_context(report_data, show_mapping=True))
+
+    with timer.stage("render"):
+        return await _render(request, "reports/upload.html", context)
+
 
-        if df.empty:
-            context["error"] = "Excel-filen verkar vara tom."
-            return render(request, "reports/upload.html", context)
+@track_view("pdf_page")
+def report_pdf_page(request):
+    """
+    Ren HTML-sida för PDF (utan upload-form).
+    Denna renderas av Playwright.
+    """
+    timer = stage_timer(request)
+    with timer.stage("load"):
+        report_data = _requested_report_data(request)
+    if not report_data:
+        return redirect("report_upload")
 
-        row = df.iloc[0]
-        first_name = row.get("First Name", "")
-        last_name = row.get("Last Name", "")
-        full_name = f"{first_name} {last_name}".strip() or "Kandidaten"
+    show_mapping = request.GET.get("mapping", "1") != "0"
 
-        competency_values = _extract_competency_values(df)
+    with timer.stage("render"):
+        return render(request, "reports/report_pdf.html", report_context(report_data, show_mapping))
 
-        # (valfritt att ha kvar) enkel lookup om du vill, men du behöver inte för underbeteenden nu
-        def _norm_key(s: str) -> str:
-            return (s or "").strip().lower().replace("&", "and")
 
-        competency_lookup = {_norm_key(k): float(v) for k, v in competency_values.items()}
+@track_view("pdf_download")
+async def report_pdf_download(request):
+    """
+    Laddar ner PDF via vald renderare (settings.REPORT_PDF_BACKEND eller ?backend=chromium|native).
+    Stödjer ?mapping=0 för att exkludera visuella mappningen.
+    """
+    with stage_timer(request).stage("load"):
+        report_data = await _arequested_report_data(request)
+    if not report_data:
+        return redirect("report_upload")
+    return await _pdf_response(request, report_data)
 
-        labels = list(competency_values.keys())
-        values = list(competency_values.values())
-        avg_score = (sum(values) / len(values)) if values else None
 
-        competencies_list = [{
-            "name": k,
-            "score_5": float(v),
-            "score_5_rounded": int(round(float(v))),
-        } for k, v in competency_values.items()]
+async def _pdf_response(request, report_data: Dict[str, Any]) -> HttpResponse:
+    """PDF-svar för report_data: ETag/304, cache, annars rendering."""
+    mapping = request.GET.get("mapping", "1")  # "1" eller "0"
+    show_mapping = mapping != "0"
+
+    renderer = get_renderer(request.GET.get("backend"))
+    timer = stage_timer(request)
+
+    # Samma rapport + flagga + backend + templateversion = samma PDF
+    with timer.stage("key"):
+        key = pdf_cache_key(report_data, show_mapping, renderer.name)
+    etag = quote_etag(key)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        metrics.inc("reports_pdf_cache_total", result="not_modified")
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    cache = get_pdf_cache()
+    with timer.stage("cache"):
+        pdf_bytes = await sync_to_async(cache.get, thread_sensitive=False)(key) if cache is not None else None
+    metrics.inc("reports_pdf_cache_total", result="hit" if pdf_bytes is not None else "miss")
+    if pdf_bytes is None and cache is None:
+        with timer.stage("render"), metrics.in_flight("reports_pdf_renders_in_flight", backend=renderer.name), \
+                metrics.timed("reports_pdf_render_seconds", backend=renderer.name):
+            pdf_bytes = await renderer.arender(report_data, show_mapping=show_mapping, request=request)
+    elif pdf_bytes is None:
+        # En rendering fyller båda varianterna – nästa klick (med/utan mappning) blir en cacheträff
+        with timer.stage("render"), metrics.in_flight("reports_pdf_renders_in_flight", backend=renderer.name), \
+                metrics.timed("reports_pdf_render_seconds", backend=renderer.name):
+            variants = await renderer.arender_both(report_data, request=request)
+        with timer.stage("cache_put"):
+            for variant, variant_bytes in variants.items():
+                variant_key = key if variant == show_mapping else pdf_cache_key(report_data, variant, renderer.name)
+                await sync_to_async(cache.put, thread_sensitive=False)(variant_key, variant_bytes)
+        pdf_bytes = variants[show_mapping]
+
+    filename = "rapport.pdf" if show_mapping else "rapport_utan_mappning.pdf"
 
-        if avg_score is not None:
-            if avg_score >= 3.5:
-                summary_text = "Ditt genomsnittliga resultat ligger på en hög nivå."
-            elif avg_score >= 2.5:
-                summary_text = "Ditt genomsnittliga resultat ligger på en medelnivå."
-            else:
-                summary_text = "Ditt genomsnittliga resultat ligger på en lägre nivå."
-        else:
-            summary_text = "Inga kompetensvärden hittades i filen."
-
-        (
-            b3_underbehaviors,
-            b3_clusters,
-            calc_explain_text,
-            under_compare_rows,
-            cluster_compare_rows,
-            insights,
-        ) = calculate_b3_underbehaviors_and_clusters(
-            competency_values,
-            B3_UNDERBEHAVIORS
-        )
+    response = HttpResponse(pdf_bytes, content_type="application/pdf")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@track_view("cohort")
+async def report_cohort(request):
+    """Gruppsammanställning för alla kandidater i sessionens uppladdning."""
+    report_id = await request.session.aget("report_id")
+    framework = await _asession_framework(request)
+    with stage_timer(request).stage("cohort"):
+        cohort = await sync_to_async(_stored_cohort_data, thread_sensitive=False)(report_id, framework)
+    if cohort is None:
+        return redirect("report_upload")
+    return await _render(request, "reports/cohort.html", cohort)
 
-        report_data = {
-            "full_name": full_name,
-            "avg_score": avg_score,
-            "summary_text": summary_text,
 
-            "competencies": competencies_list,
-            "chart_labels": labels,
-            "chart_values": values,
+# ── Permalänkar ─────────────────────────
 
-            "competency_lookup": competency_lookup,  # om du vill använda senare
+@track_view("permalink")
+async def report_permalink(request, report_id):
+    """En sparad rapport, utan uppladdning (samma sida som efter upload)."""
+    report_data = await sync_to_async(_saved_report_data)(report_id)
+    if report_data is None:
+        raise Http404("Rapporten finns inte.")
 
-            "b3_underbehaviors": b3_underbehaviors,
-            "b3_clusters": b3_clusters,
-            "insights": insights,
+    context: Dict[str, Any] = {"form": ExcelUploadForm()}
+    context.update(report_context(report_data, show_mapping=True))
+    context["pdf_download_url"] = reverse("report_permalink_pdf", args=[report_id])
+    context["report_permalink"] = request.path
+    return await _render(request, "reports/upload.html", context)
 
-            "calc_explain_text": calc_explain_text,
-            "under_compare_rows": under_compare_rows,
-            "cluster_compare_rows": cluster_compare_rows,
-        }
 
-        # Radar chart:
-        # Om du vill ha 0..100 i radar:
-        radar_labels = [c["name"] for c in b3_clusters]
-        radar_values = [
-            float(c["pct_total"]) if c.get("pct_total") is not None else 0.0
-            for c in b3_clusters
-        ]
+@track_view("permalink_pdf")
+async def report_permalink_pdf(request, report_id):
+    """PDF för en sparad rapport. Samma parametrar som report_pdf_download."""
+    report_data = await sync_to_async(_saved_report_data)(report_id)
+    if report_data is None:
+        raise Http404("Rapporten finns inte.")
+    return await _pdf_response(request, report_data)
 
-        report_data.update({
-            "radar_labels": radar_labels,
-            "radar_values": radar_values,
-        })
 
-        request.session["report_data"] = report_data
-        context.update(report_data)
-        context["show_mapping"] = True
+# ── Bulk-export (ZIP) ───────────────────
 
-    return render(request, "reports/upload.html", context)
+def _bulk_entries(
+    report_ids: Sequence[str], upload_report_id: Optional[str], upload_framework: Framework
+) -> Optional[List[BulkEntry]]:
+    """
+    (filnamn, report_data-byggare) per rapport. Med report_ids: de sparade
+    rapporterna i angiven ordning (okända id hoppas över), var och en med sitt
+    ramverk. Annars alla kandidater i sessionens uppladdning med upload_framework.
+    None om det inte finns något att exportera.
+    """
+    if report_ids:
+        try:
+            pks = list(dict.fromkeys(uuid.UUID(pk) for pk in report_ids))
+        except ValueError:
+            return None
+        saved = {
+            r.pk: r for r in Report.objects.filter(pk__in=pks).only("full_name", "competency_values", "framework")
+        }
+        # Ett ramverk per nyckel för hela exporten, även om en fil läses om under tiden
+        frameworks = {key: _framework_or_default(key) for key in {saved[pk].framework for pk in saved}}
+        rows = [
+            (saved[pk].full_name, *_saved_row(saved[pk]), frameworks[saved[pk].framework])
+            for pk in pks if pk in saved
+        ]
+    else:
+        report = get_report_store().get(upload_report_id)
+        if report is None:
+            return None
+        rows = [(name, report.labels, report.row(i), upload_framework) for i, name in enumerate(report.names)]
 
+    return [
+        (bulk_filename(position, len(rows), name), partial(_build_report_data, name, labels, row, framework))
+        for position, (name, labels, row, framework) in enumerate(rows, start=1)
+    ] or None
 
 
-def report_pdf_page(request):
+@track_view("pdf_bulk")
+async def report_pdf_bulk(request):
     """
-    Ren HTML-sida för PDF (utan upload-form).
-    Denna renderas av Playwright.
+    Alla rapporter som en ZIP, strömmad medan PDF:erna renderas.
+    ?id=<uuid> (kan upprepas) väljer sparade rapporter, annars tas alla
+    kandidater i sessionens uppladdning. ?mapping=0 och ?backend= som report_pdf_download.
     """
-    report_data = request.session.get("report_data")
-    if not report_data:
+    report_ids = request.GET.getlist("id")
+    upload_report_id = None if report_ids else await request.session.aget("report_id")
+    framework = await _asession_framework(request)
+    entries = await sync_to_async(_bulk_entries)(report_ids, upload_report_id, framework)
+    if not entries:
+        if report_ids:
+            raise Http404("Rapporterna finns inte.")
         return redirect("report_upload")
 
+    limit = getattr(settings, "REPORT_BULK_MAX_REPORTS", 1000)
+    if len(entries) > limit:
+        return HttpResponse(
+            f"För många rapporter för en export ({len(entries)}, max {limit}).\n",
+            status=400,
+            content_type="text/plain; charset=utf-8",
+        )
+
     show_mapping = request.GET.get("mapping", "1") != "0"
+    renderer = get_renderer(request.GET.get("backend"))
+    filename = "rapporter.zip" if show_mapping else "rapporter_utan_mappning.zip"
+
+    response = StreamingHttpResponse(stream_pdf_zip(entries, renderer, show_mapping), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
+# ── Metrics ─────────────────────────────
+
+def metrics_view(request):
+    """Prometheus-scrape för hela maskinen (alla workers). Kräver REPORT_METRICS_TOKEN om den är satt."""
+    if not getattr(settings, "REPORT_METRICS", False):
+        raise Http404()
+    token = getattr(settings, "REPORT_METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    return HttpResponse(metrics.render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
-    ctx = dict(report_data)
-    ctx["show_mapping"] = show_mapping
 
-    return render(request, "reports/report_pdf.html", ctx)
+# ── PDF i bakgrunden (jobbkö) ───────────
 
+def _job_payload(job: PdfJob) -> Dict[str, Any]:
+    return {
+        "id": str(job.id),
+        "status": job.status,
+        "error": job.error or None,
+        "status_url": reverse("report_pdf_job_status", args=[job.id]),
+        "download_url": reverse("report_pdf_job_download", args=[job.id]) if job.status == PdfJob.DONE else None,
+    }
+
+
+def _session_job(request, job_id) -> Optional[PdfJob]:
+    """Jobbet, men bara om det skapades av den här sessionen."""
+    session_key = request.session.session_key
+    if not session_key:
+        return None
+    return PdfJob.objects.filter(id=job_id, session_key=session_key).first()
 
-def report_pdf_download(request):
+
+@require_POST
+def report_pdf_job_create(request):
     """
-    Laddar ner PDF (printar report_pdf_page).
-    Stödjer ?mapping=0 för att exkludera visuella mappningen.
+    Lägger en PDF-rendering i kön och svarar direkt (202) med status- och nedladdnings-URL.
+    Samma parametrar som report_pdf_download: ?mapping=0, ?backend=, ?candidate=.
     """
-    report_data = request.session.get("report_data")
+    report_data = _requested_report_data(request)
     if not report_data:
-        return redirect("report_upload")
+        return JsonResponse({"error": "Ingen rapport i sessionen."}, status=400)
+
+    if not request.session.session_key:
+        request.session.save()
+
+    job = enqueue_pdf_job(
+        report_data,
+        show_mapping=request.GET.get("mapping", "1") != "0",
+        backend=request.GET.get("backend"),
+        session_key=request.session.session_key,
+    )
+    return JsonResponse(_job_payload(job), status=202)
+
+
+def report_pdf_job_status(request, job_id):
+    job = _session_job(request, job_id)
+    if job is None:
+        raise Http404("Okänt PDF-jobb.")
+    return JsonResponse(_job_payload(job))
 
-    mapping = request.GET.get("mapping", "1")  # "1" eller "0"
-    url = request.build_absolute_uri(reverse("report_pdf_page"))
-    if mapping == "0":
-        url += "?mapping=0"
 
-    cookie_name = settings.SESSION_COOKIE_NAME
-    cookie_value = request.COOKIES.get(cookie_name)
+def report_pdf_job_download(request, job_id):
+    job = _session_job(request, job_id)
+    if job is None:
+        raise Http404("Okänt PDF-jobb.")
+    if job.status != PdfJob.DONE:
+        return JsonResponse(_job_payload(job), status=409)
 
-    pdf_bytes = asyncio.run(_render_pdf_async(url, cookie_name, cookie_value))
+    pdf_bytes = read_job_result(job)
+    if pdf_bytes is None:
+        raise Http404("PDF:en finns inte längre, skapa en ny.")
 
-    filename = "rapport.pdf" if mapping != "0" else "rapport_utan_mappning.pdf"
+    filename = "rapport.pdf" if job.show_mapping else "rapport_utan_mappning.pdf"
 
     response = HttpResponse(pdf_bytes, content_type="application/pdf")
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
\ No newline at end of file
+    response["ETag"] = quote_etag(job.cache_key)
+    return response
@@ -75,6 +75,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'reporttool.wsgi.application'
+ASGI_APPLICATION = 'reporttool.asgi.application'  # produktion kör ASGI (se Procfile)
 
 
 # Database
@@ -141,4 +142,94 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     }
-}
\ No newline at end of file
+}
+
+# PDF-rendering (Playwright/Chromium)
+# Antal varma browsers per worker-process och hur många PDF:er
+# en browser får rendera innan den startas om (håller nere minnesläckor).
+REPORT_PDF_POOL_SIZE = int(os.environ.get("REPORT_PDF_POOL_SIZE", "2"))
+REPORT_PDF_POOL_MAX_USES = int(os.environ.get("REPORT_PDF_POOL_MAX_USES", "50"))
+REPORT_PDF_TIMEOUT = 60  # sekunder
+REPORT_PDF_READY_TIMEOUT = 10  # sekunder att vänta på window.__REPORT_READY__
+# Offline-läge: Chromium får bara hämta våra egna statiska filer (från minnet),
+# alla externa anrop avbryts. Stäng av om rapporten behöver externa resurser.
+REPORT_PDF_OFFLINE = True
+
+# Vilken PDF-renderare som används som standard: "chromium" (Playwright,
+# pixelperfekt mot HTML-vyn) eller "native" (reportlab, ingen browser).
+# Kan överstyras per nedladdning med ?backend=.
+REPORT_PDF_BACKEND = os.environ.get("REPORT_PDF_BACKEND", "chromium")
+
+# PDF-cache på disk (delas av alla workers). 0 = avstängd.
+REPORT_PDF_CACHE_DIR = os.environ.get("REPORT_PDF_CACHE_DIR", "")
+REPORT_PDF_CACHE_MAX_BYTES = int(os.environ.get("REPORT_PDF_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+REPORT_PDF_CACHE_VERSION = "1"  # höj för att ogiltigförklara alla cachade PDF:er
+
+# PDF-jobbkö: med REPORT_PDF_JOBS på skapar knapparna ett jobb i stället för att
+# rendera i webbprocessen. `python manage.py pdf_worker` (startas bredvid
+# gunicorn i Procfile, eftersom kön ligger i den lokala SQLite-databasen)
+# renderar högst REPORT_PDF_JOB_CONCURRENCY åt gången.
+REPORT_PDF_JOBS = os.environ.get("REPORT_PDF_JOBS", "0") == "1"
+REPORT_PDF_JOB_CONCURRENCY = int(os.environ.get("REPORT_PDF_JOB_CONCURRENCY", "2"))
+REPORT_PDF_JOB_DIR = os.environ.get("REPORT_PDF_JOB_DIR", "")
+REPORT_PDF_JOB_TTL = 24 * 3600  # sekunder innan färdiga jobb och deras filer städas bort
+# Workern markerar sina pågående jobb var REPORT_PDF_JOB_HEARTBEAT:e sekund. Ett
+# jobb utan markering på REPORT_PDF_JOB_STALE_AFTER sekunder (workern dog) läggs
+# tillbaka i kön – högst REPORT_PDF_JOB_MAX_ATTEMPTS försök, sedan misslyckat.
+REPORT_PDF_JOB_HEARTBEAT = int(os.environ.get("REPORT_PDF_JOB_HEARTBEAT", "10"))
+REPORT_PDF_JOB_STALE_AFTER = int(os.environ.get("REPORT_PDF_JOB_STALE_AFTER", "60"))
+REPORT_PDF_JOB_MAX_ATTEMPTS = int(os.environ.get("REPORT_PDF_JOB_MAX_ATTEMPTS", "3"))
+
+# Ramverk (underbeteenden, kluster, vikter, texter): en YAML-fil per ramverk i
+# katalogen, nyckeln är filnamnet. Tom katalog = de medföljande i reports/frameworks/.
+# Uppladdningen väljer ramverk; REPORT_FRAMEWORK_DEFAULT används annars.
+# Filerna läses om automatiskt när de ändras.
+REPORT_FRAMEWORK_DIR = os.environ.get("REPORT_FRAMEWORK_DIR", "")
+REPORT_FRAMEWORK_DEFAULT = os.environ.get("REPORT_FRAMEWORK_DEFAULT", "b3")
+REPORT_FRAMEWORK_CACHE_SIZE = int(os.environ.get("REPORT_FRAMEWORK_CACHE_SIZE", "8"))
+
+# Normtabeller (.npz från `python manage.py build_norms --framework <nyckel>`),
+# en per ramverk och poängversion: <nyckel>-<version>.npz. Tom = inga percentiler.
+# Filerna läses om automatiskt när de byts ut.
+REPORT_NORM_DIR = os.environ.get("REPORT_NORM_DIR", "")
+
+# Bulk-export (alla kandidater som en ZIP): så många PDF:er renderas samtidigt
+# per worker-process. Native-renderaren får lika många egna processer (var och en
+# en hel Django-import) – räkna workers × parallellism när minnet dimensioneras.
+# Processerna stängs efter REPORT_BULK_PROCESS_IDLE sekunder utan export.
+REPORT_BULK_PARALLELISM = int(os.environ.get("REPORT_BULK_PARALLELISM", "2"))
+REPORT_BULK_PROCESS_IDLE = int(os.environ.get("REPORT_BULK_PROCESS_IDLE", "60"))
+REPORT_BULK_MAX_REPORTS = int(os.environ.get("REPORT_BULK_MAX_REPORTS", "1000"))
+
+# Rapportlager: uppladdade filer sparas som råvärden på disk (delas av alla
+# workers) och sessionen håller bara rapportens id. Poster som inte använts
+# på REPORT_STORE_TTL sekunder städas bort.
+REPORT_STORE_DIR = os.environ.get("REPORT_STORE_DIR", "")
+REPORT_STORE_TTL = 7 * 24 * 3600
+REPORT_STORE_MEMORY_ITEMS = 32  # senast använda rapporter som hålls tolkade i minnet per process
+
+# Metrics: /metrics i Prometheus-format. Varje process skriver sina räknare
+# till en fil i REPORT_METRICS_DIR (delas av alla workers + pdf_worker), och
+# scrape summerar dem. Sätt REPORT_METRICS_TOKEN för att kräva
+# "Authorization: Bearer <token>". Filen skrivs i bakgrunden högst en gång per
+# REPORT_METRICS_FLUSH_INTERVAL sekunder (andra workers kan ligga så mycket efter).
+REPORT_METRICS = os.environ.get("REPORT_METRICS", "0") == "1"
+REPORT_METRICS_DIR = os.environ.get("REPORT_METRICS_DIR", "")
+REPORT_METRICS_FLUSH_INTERVAL = float(os.environ.get("REPORT_METRICS_FLUSH_INTERVAL", "1.0"))
+REPORT_METRICS_TOKEN = os.environ.get("REPORT_METRICS_TOKEN", "")
+
+# Tidtagning per steg: med REPORT_TIMING=1 får varje svar en Server-Timing-header
+# (parse, score, render, launch, goto, pdf, session …) och en loggrad per request
+# på loggern "reports.timing". Av = middleware läggs inte in alls.
+REPORT_TIMING = os.environ.get("REPORT_TIMING", "0") == "1"
+if REPORT_TIMING:
+    MIDDLEWARE = ["reports.middleware.ServerTimingMiddleware"] + [
+        "reports.middleware.TimedSessionMiddleware" if m == "django.contrib.sessions.middleware.SessionMiddleware" else m
+        for m in MIDDLEWARE
+    ]
+    LOGGING = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {"console": {"class": "logging.StreamHandler"}},
+        "loggers": {"reports.timing": {"handlers": ["console"], "level": "INFO", "propagate": False}},
+    }